@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import deque
+
+# классы запросов: EXEMPT не ограничивается, NORMAL обслуживается раньше HEAVY
+EXEMPT = 0
+NORMAL = 1
+HEAVY = 2
+
+
+class _Waiter:
+    __slots__ = ("admitted", "cond")
+
+    def __init__(self, lock: threading.Lock) -> None:
+        self.cond = threading.Condition(lock)
+        self.admitted = False
+
+
+class AdmissionController:
+    """
+    Bounds the requests a server works on at once.
+
+    At most max_in_flight requests run; up to max_queue more wait for a slot, each for
+    at most queue_timeout seconds. A request that finds the queue full, or is still
+    waiting at its deadline, is rejected at once (admit() returns False, the server
+    answers 503 with Retry-After: retry_after), so under overload latency stays close
+    to queue_timeout instead of growing with the backlog.
+
+    EXEMPT requests (health checks) skip the limit entirely. HEAVY ones (history scans)
+    take at most max_heavy of the slots and are let in only when no NORMAL request is
+    waiting, so a burst of scans cannot starve conversions. Within a class the queue is FIFO.
+    """
+    def __init__(
+        self,
+        max_in_flight: int,
+        max_queue: int | None = None,
+        queue_timeout: float = 0.5,
+        max_heavy: int | None = None,
+        retry_after: int = 1,
+    ) -> None:
+        if max_in_flight < 1:
+            raise ValueError("max_in_flight must be >= 1")
+        if max_queue is not None and max_queue < 0:
+            raise ValueError("max_queue must be >= 0")
+        if queue_timeout < 0:
+            raise ValueError("queue_timeout must be >= 0")
+        if max_heavy is not None and not 1 <= max_heavy <= max_in_flight:
+            raise ValueError("max_heavy must be between 1 and max_in_flight")
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_in_flight if max_queue is None else max_queue
+        self.queue_timeout = queue_timeout
+        self.max_heavy = max(1, max_in_flight // 2) if max_heavy is None else max_heavy
+        self.retry_after = retry_after
+        self.in_flight = 0
+        self.heavy_in_flight = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+        self._queues: dict[int, deque[_Waiter]] = {NORMAL: deque(), HEAVY: deque()}
+
+    @property
+    def queued(self) -> int:
+        return len(self._queues[NORMAL]) + len(self._queues[HEAVY])
+
+    def _fits(self, priority: int) -> bool:
+        return self.in_flight < self.max_in_flight and (priority != HEAVY or self.heavy_in_flight < self.max_heavy)
+
+    def _start(self, priority: int) -> None:
+        self.in_flight += 1
+        if priority == HEAVY:
+            self.heavy_in_flight += 1
+
+    def admit(self, priority: int = NORMAL) -> bool:
+        """Takes a slot for a request, waiting in the queue if needed; False if the request must be rejected."""
+        if priority == EXEMPT:
+            return True
+        with self._lock:
+            # без очереди только если никто с тем же или более высоким приоритетом не ждёт
+            ahead = self._queues[NORMAL] if priority == NORMAL else self.queued
+            if not ahead and self._fits(priority):
+                self._start(priority)
+                return True
+            if self.queued >= self.max_queue or self.queue_timeout == 0:
+                self.rejected += 1
+                return False
+            waiter = _Waiter(self._lock)
+            queue = self._queues[priority]
+            queue.append(waiter)
+            deadline = time.monotonic() + self.queue_timeout
+            while not waiter.admitted:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    queue.remove(waiter)
+                    self.rejected += 1
+                    return False
+                waiter.cond.wait(remaining)
+            return True
+
+    def release(self, priority: int = NORMAL) -> None:
+        """Frees the slot taken by admit() and hands it to the next waiting request."""
+        if priority == EXEMPT:
+            return
+        with self._lock:
+            self.in_flight -= 1
+            if priority == HEAVY:
+                self.heavy_in_flight -= 1
+            for cls in (NORMAL, HEAVY):
+                queue = self._queues[cls]
+                if queue and self._fits(cls):
+                    waiter = queue.popleft()
+                    self._start(cls)
+                    waiter.admitted = True
+                    waiter.cond.notify()
+                    return
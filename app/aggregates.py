@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+from datetime import UTC, datetime
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from app.operations import Columns
+
+# размер корзины в секундах и сколько последних корзин хранить
+BUCKETS = {
+    "minute": (60, 24 * 60),
+    "hour": (3600, 90 * 24),
+    "day": (86400, 10 * 366),
+}
+
+# [count, sum_amount, sum_result, min_rate, max_rate]
+Stats = list
+PairStats = dict[tuple[str, str], Stats]
+
+
+def _merge(target: PairStats, pair: tuple[str, str], s: Stats) -> None:
+    t = target.get(pair)
+    if t is None:
+        target[pair] = list(s)
+        return
+    t[0] += s[0]
+    t[1] += s[1]
+    t[2] += s[2]
+    t[3] = min(t[3], s[3])
+    t[4] = max(t[4], s[4])
+
+
+def _merged(*parts: PairStats) -> PairStats:
+    out: PairStats = {}
+    for part in parts:
+        for pair, s in part.items():
+            _merge(out, pair, s)
+    return out
+
+
+def _pairs_json(stats: PairStats) -> list[dict]:
+    return [
+        {
+            "from": pair[0],
+            "to": pair[1],
+            "count": s[0],
+            "sum_amount": s[1],
+            "sum_result": s[2],
+            "min_rate": s[3],
+            "max_rate": s[4],
+        }
+        for pair, s in sorted(stats.items())
+    ]
+
+
+class Aggregates:
+    """
+    Per currency pair totals (count, sum of amount and result, min/max rate), overall and
+    in minute/hour/day buckets. A query costs O(pairs x buckets), not O(operations).
+
+    add() only updates the bucket of the current minute. When the minute changes, that
+    bucket is folded into the totals and its hour and day buckets; queries fold the open
+    minute on the fly. Records with an older timestamp than the current minute (clock
+    steps, racing threads) are folded right away.
+
+    They cover operations added since the start (or since the history was recovered)
+    and the last clear. Records evicted by retention stay counted: min/max cannot be undone.
+    Only the newest buckets are kept, see BUCKETS.
+    """
+    def __init__(self) -> None:
+        self._totals: PairStats = {}
+        self._buckets: dict[str, OrderedDict[int, PairStats]] = {name: OrderedDict() for name in BUCKETS}
+        self._minute = -1  # текущая минута (от эпохи) и её ещё не свёрнутая корзина
+        self._current: PairStats = {}
+
+    def add(
+        self, from_currency: str, to_currency: str, amount: float, rate: float, result: float, ts_micros: int
+    ) -> None:
+        minute = ts_micros // 60_000_000
+        if minute != self._minute:
+            self._add_stats(minute, (from_currency, to_currency), [1, amount, result, rate, rate])
+            return
+        s = self._current.get((from_currency, to_currency))
+        if s is None:
+            self._current[(from_currency, to_currency)] = [1, amount, result, rate, rate]
+            return
+        s[0] += 1
+        s[1] += amount
+        s[2] += result
+        if rate < s[3]:
+            s[3] = rate
+        elif rate > s[4]:
+            s[4] = rate
+
+    def add_columns(self, cols: Columns) -> None:
+        """Adds every record of `cols`, e.g. a history recovered from the journal."""
+        # сначала группируем по (минута, пара) на индексах, строки пар собираем в конце
+        grouped: dict[tuple[int, int, int], Stats] = {}
+        rows = zip(cols.ts, cols.from_idx, cols.to_idx, cols.amount, cols.rate, cols.result)
+        for ts_micros, from_idx, to_idx, amount, rate, result in rows:
+            key = (ts_micros // 60_000_000, from_idx, to_idx)
+            s = grouped.get(key)
+            if s is None:
+                grouped[key] = [1, amount, result, rate, rate]
+                continue
+            s[0] += 1
+            s[1] += amount
+            s[2] += result
+            if rate < s[3]:
+                s[3] = rate
+            elif rate > s[4]:
+                s[4] = rate
+        codes = cols.codes
+        for (minute, from_idx, to_idx), s in sorted(grouped.items()):
+            self._add_stats(minute, (codes[from_idx], codes[to_idx]), s)
+
+    def _add_stats(self, minute: int, pair: tuple[str, str], s: Stats) -> None:
+        if minute > self._minute:
+            if self._minute >= 0:
+                self._fold(self._minute, self._current)
+            self._minute = minute
+            self._current = self._bucket("minute", minute * 60)
+            # корзины, куда потом свернётся эта минута, видны в запросах уже сейчас
+            self._bucket("hour", minute * 60)
+            self._bucket("day", minute * 60)
+            _merge(self._current, pair, s)
+        elif minute == self._minute:
+            _merge(self._current, pair, s)
+        else:
+            _merge(self._bucket("minute", minute * 60), pair, s)
+            self._fold(minute, {pair: s})
+
+    def _fold(self, minute: int, stats: PairStats) -> None:
+        """Adds a closed minute to the totals and to its hour and day buckets."""
+        seconds = minute * 60
+        for target in (self._totals, self._bucket("hour", seconds), self._bucket("day", seconds)):
+            for pair, s in stats.items():
+                _merge(target, pair, s)
+
+    def _bucket(self, name: str, seconds: int) -> PairStats:
+        size, keep = BUCKETS[name]
+        buckets = self._buckets[name]
+        start = seconds - seconds % size
+        stats = buckets.get(start)
+        if stats is None:
+            stats = buckets[start] = {}
+            if len(buckets) > keep:
+                buckets.popitem(last=False)
+        return stats
+
+    def clear(self) -> None:
+        self._totals.clear()
+        for buckets in self._buckets.values():
+            buckets.clear()
+        self._minute = -1
+        self._current = {}
+
+    def totals(self) -> list[dict]:
+        return _pairs_json(_merged(self._totals, self._current))
+
+    def buckets(self, name: str) -> list[dict]:
+        """Buckets of the given size (a key of BUCKETS), oldest first."""
+        size, _ = BUCKETS[name]
+        buckets = self._buckets[name]
+        # открытая минута уже лежит в своей минутной корзине, в часовую и дневную её добавляем здесь
+        open_start = self._minute * 60 - self._minute * 60 % size if name != "minute" and self._current else None
+        out = []
+        for start in sorted(buckets):
+            stats = _merged(buckets[start], self._current) if start == open_start else buckets[start]
+            out.append({"start": datetime.fromtimestamp(start, UTC).isoformat(), "pairs": _pairs_json(stats)})
+        return out
@@ -0,0 +1,190 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import io
+
+from app.converter import ENGINES
+from app.money import ROUNDING
+from app.operations import STORAGES
+from app.rates import InvalidRatesFileError
+from app.server import AppState, Handler
+
+# ограничения на заголовки, как у http.server
+MAX_HEAD_BYTES = 64 * 1024
+# тело больше этого не читаем: 413 и закрываем соединение
+MAX_BODY_BYTES = 1024 * 1024
+
+_TOO_LARGE = (
+    b"HTTP/1.1 413 Payload Too Large\r\nContent-Type: application/json; charset=utf-8\r\n"
+    b"Content-Length: %d\r\nConnection: close\r\n\r\n%s"
+)
+_TOO_LARGE_BODY = b'{"error":"payload_too_large","message":"request body is larger than %d bytes"}' % MAX_BODY_BYTES
+
+
+class _BufferedHandler(Handler):
+    """
+    Runs the regular Handler on an already received request.
+    The request is read from memory and the response is collected in memory,
+    so routing and response bytes stay exactly the same as in app.server.
+    """
+    protocol_version = "HTTP/1.1"
+
+    def __init__(self, raw_request: bytes, client_address: tuple) -> None:
+        # BaseRequestHandler.__init__ работает с сокетом, здесь его нет
+        self.rfile = io.BytesIO(raw_request)
+        self.wfile = io.BytesIO()
+        self.client_address = client_address
+        self.server = None
+        self.request = None
+        self.close_connection = True
+        self.handle_one_request()
+
+
+def _content_length(head: bytes) -> int | None:
+    """Returns Content-Length from a raw request head, 0 if absent, None if invalid."""
+    for line in head.split(b"\r\n")[1:]:
+        name, sep, value = line.partition(b":")
+        if sep and name.strip().lower() == b"content-length":
+            try:
+                length = int(value.strip())
+            except ValueError:
+                return None
+            return length if length >= 0 else None
+    return 0
+
+
+class AsyncHTTPServer:
+    """
+    asyncio front end serving the same routes as app.server.Handler.
+    Keeps HTTP/1.1 connections open between requests; an idle connection costs
+    a suspended coroutine instead of a thread. The head and the body of a request must
+    each arrive within idle_timeout seconds; bodies over MAX_BODY_BYTES get 413.
+    """
+    def __init__(self, state: AppState, idle_timeout: float = 60.0) -> None:
+        self.handler_class = type("AsyncBoundHandler", (_BufferedHandler,), {"state": state})
+        self.idle_timeout = idle_timeout
+
+    async def start(self, host: str = "0.0.0.0", port: int = 8008, backlog: int = 1024) -> asyncio.Server:
+        return await asyncio.start_server(
+            self._handle_connection, host, port, backlog=backlog, limit=MAX_HEAD_BYTES
+        )
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        peer = writer.get_extra_info("peername") or ("", 0)
+        try:
+            while True:
+                try:
+                    head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), self.idle_timeout)
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, TimeoutError):
+                    return
+
+                length = _content_length(head)
+                if length is not None and length > MAX_BODY_BYTES:
+                    writer.write(_TOO_LARGE % (len(_TOO_LARGE_BODY), _TOO_LARGE_BODY))
+                    await writer.drain()
+                    return
+                try:
+                    body = await asyncio.wait_for(reader.readexactly(length), self.idle_timeout) if length else b""
+                except TimeoutError:
+                    return
+
+                handler = self.handler_class(head + body, peer)
+                writer.write(handler.wfile.getvalue())
+                await writer.drain()
+
+                # без корректной длины тела не понять, где начинается следующий запрос
+                if handler.close_connection or length is None:
+                    return
+        except (ConnectionError, asyncio.IncompleteReadError):
+            return
+        finally:
+            writer.close()
+
+
+async def _serve(host: str, port: int, state: AppState, idle_timeout: float) -> None:
+    server = await AsyncHTTPServer(state, idle_timeout=idle_timeout).start(host, port)
+    print(f"Async server running on http://{host}:{port}")
+    async with server:
+        await server.serve_forever()
+
+
+def run_async_server(
+    host: str = "0.0.0.0",
+    port: int = 8008,
+    rates_path: str = "data/rates.csv",
+    idle_timeout: float = 60.0,
+    journal_dir: str | None = None,
+    journal_sync: bool = False,
+    storage: str = "list",
+    watch_rates: float = 0.0,
+    rates_history_path: str | None = None,
+    rates_cache_path: str | None = None,
+    max_records: int | None = None,
+    max_age: float | None = None,
+    engine: str = "float",
+    rounding: str = "half_up",
+) -> None:
+    """
+    The journal is always asynchronous here (fsync in the background, the last few ms may be
+    lost on a crash): waiting for the commit would block the event loop. journal_sync=True is
+    rejected rather than silently downgraded; use app.server for synchronous commits.
+    """
+    if journal_sync:
+        raise ValueError("the asyncio server supports only an asynchronous journal; use app.server for --journal-sync")
+    state = AppState(
+        rates_path,
+        journal_dir=journal_dir,
+        journal_sync=False,
+        storage=storage,
+        watch_rates=watch_rates,
+        rates_history_path=rates_history_path,
+        rates_cache_path=rates_cache_path,
+        max_records=max_records,
+        max_age=max_age,
+        engine=engine,
+        rounding=rounding,
+    )
+    try:
+        asyncio.run(_serve(host, port, state, idle_timeout))
+    finally:
+        state.close()
+
+
+def _parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Currency converter HTTP server (asyncio)")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8008)
+    parser.add_argument("--rates", default="data/rates.csv", help="path to rates CSV")
+    parser.add_argument("--idle-timeout", type=float, default=60.0, help="seconds to keep an idle connection")
+    parser.add_argument(
+        "--journal", metavar="DIR",
+        help="keep the operation history on disk in DIR; commits are asynchronous (not after fsync)",
+    )
+    parser.add_argument("--journal-sync", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--storage", choices=sorted(STORAGES), default="list", help="in-memory history layout")
+    parser.add_argument("--watch-rates", type=float, default=0.0, metavar="SECONDS", help="poll the rates file")
+    parser.add_argument("--rates-history", metavar="CSV", help="dated rates for as_of conversions")
+    parser.add_argument("--rates-cache", metavar="PATH", help="binary cache of the parsed rates file")
+    parser.add_argument("--max-records", type=int, metavar="N", help="keep only the newest N operations")
+    parser.add_argument("--max-age", type=float, metavar="SECONDS", help="drop operations older than SECONDS")
+    parser.add_argument("--engine", choices=ENGINES, default="float", help="conversion arithmetic")
+    parser.add_argument("--rounding", choices=sorted(ROUNDING), default="half_up", help="rounding of --engine fixed")
+    args = parser.parse_args(argv)
+    if args.journal_sync:
+        parser.error("--journal-sync is not supported: fsync waits would block the event loop, use app.server")
+    return args
+
+
+if __name__ == "__main__":  # pragma: no cover - точка входа
+    args = _parse_args()
+    try:
+        run_async_server(
+            args.host, args.port, args.rates, idle_timeout=args.idle_timeout, journal_dir=args.journal,
+            storage=args.storage, watch_rates=args.watch_rates, rates_history_path=args.rates_history,
+            rates_cache_path=args.rates_cache, max_records=args.max_records, max_age=args.max_age,
+            engine=args.engine, rounding=args.rounding,
+        )
+    except InvalidRatesFileError as e:
+        print(f"Failed to start server: {e}")
+        raise
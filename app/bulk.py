@@ -0,0 +1,234 @@
+from __future__ import annotations
+
+import csv
+import io
+import json
+import math
+import time
+from collections import deque
+from collections.abc import Iterator
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass
+from itertools import islice
+from typing import IO
+
+from app.converter import ConversionError, CurrencyConverter, InvalidAmountError
+from app.rates import CsvRatesLoader, RatesError
+
+FORMATS = ("csv", "ndjson")
+INPUT_COLUMNS = ("from", "to", "amount")
+CSV_COLUMNS = ("row", "from", "to", "amount", "rate", "result", "error", "message")
+
+
+class BulkError(Exception):
+    """Base exception for bulk conversion issues."""
+
+
+class InvalidInputError(BulkError):
+    pass
+
+
+@dataclass
+class BulkStats:
+    rows: int = 0
+    errors: int = 0
+    seconds: float = 0.0
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds > 0 else 0.0
+
+
+def format_of(path: str, default: str = "csv") -> str:
+    """Format by file extension (.csv, .ndjson/.jsonl), `default` for stdin/stdout and others."""
+    lower = path.lower()
+    if lower.endswith((".ndjson", ".jsonl")):
+        return "ndjson"
+    if lower.endswith(".csv"):
+        return "csv"
+    return default
+
+
+def _lines(stream: IO[str]) -> Iterator[str]:
+    try:
+        yield from stream
+    except UnicodeDecodeError:
+        # позиция в e относится к буферу декодера, а не к файлу
+        raise InvalidInputError("input is not valid UTF-8") from None
+
+
+def _records(stream: IO[str], fmt: str) -> tuple[tuple[int, int, int] | None, Iterator]:
+    """
+    Column positions of from/to/amount (CSV only) and an iterator of raw records:
+    lists of fields for CSV, lines for NDJSON. Raises InvalidInputError for a bad header
+    and, while reading, for input that cannot be decoded.
+    """
+    stream = _lines(stream)
+    if fmt == "ndjson":
+        return None, iter(stream)
+    reader = csv.reader(stream)
+    header = [name.strip().lower() for name in next(reader, [])]
+    missing = [name for name in INPUT_COLUMNS if name not in header]
+    if missing:
+        raise InvalidInputError(f"CSV header must have columns {', '.join(INPUT_COLUMNS)}; missing: {', '.join(missing)}")
+    return (header.index("from"), header.index("to"), header.index("amount")), reader
+
+
+def _parse_csv(columns: tuple[int, int, int], row: list[str]) -> tuple[object, object, object]:
+    i_from, i_to, i_amount = columns
+    try:
+        from_currency, to_currency, text = row[i_from], row[i_to], row[i_amount]
+    except IndexError:
+        raise InvalidInputError(f"row has {len(row)} fields") from None
+    try:
+        amount = float(text)
+    except ValueError:
+        raise InvalidAmountError("Amount must be a number") from None
+    if not math.isfinite(amount):
+        raise InvalidAmountError("Amount must be a number")
+    return amount, from_currency, to_currency
+
+
+def _parse_ndjson(line: str) -> tuple[object, object, object]:
+    try:
+        obj = json.loads(line)
+    except ValueError as e:
+        raise InvalidInputError(f"invalid JSON: {e}") from None
+    if not isinstance(obj, dict):
+        raise InvalidInputError("row must be an object")
+    try:
+        return obj["amount"], obj["from"], obj["to"]
+    except KeyError as e:
+        raise InvalidInputError(f"missing field: {e.args[0]}") from None
+
+
+def _error_code(error: Exception) -> str:
+    return "not_found" if isinstance(error, RatesError) else "bad_request"
+
+
+def convert_chunk(
+    converter: CurrencyConverter,
+    columns: tuple[int, int, int] | None,
+    first_row: int,
+    records: list,
+    out_fmt: str,
+) -> tuple[str, int, int]:
+    """
+    Converts one chunk of raw records (numbered from first_row) with convert_many;
+    columns as returned by _records, None for NDJSON.
+    Returns the output text for the chunk, the number of rows and of failed rows.
+    """
+    rows: list[int] = []
+    results: list = []  # результат, ошибка разбора или None, если строку нужно конвертировать
+    items = []
+    for row, record in enumerate(records, first_row):
+        # пустые строки пропускаются, но номер строки занимают
+        if not (record.strip() if columns is None else "".join(record).strip()):
+            continue
+        rows.append(row)
+        try:
+            items.append(_parse_ndjson(record) if columns is None else _parse_csv(columns, record))
+            results.append(None)
+        except (BulkError, ConversionError) as e:
+            results.append(e)
+
+    converted = iter(converter.convert_many(items))
+    errors = 0
+    out = io.StringIO()
+    writer = csv.writer(out, lineterminator="\n") if out_fmt == "csv" else None
+    for row, res in zip(rows, results):
+        if res is None:
+            res = next(converted)
+        if isinstance(res, (BulkError, ConversionError, RatesError)):
+            errors += 1
+            if writer is not None:
+                writer.writerow((row, "", "", "", "", "", _error_code(res), str(res)))
+            else:
+                out.write(json.dumps({"row": row, "error": _error_code(res), "message": str(res)}, ensure_ascii=False))
+                out.write("\n")
+        elif writer is not None:
+            writer.writerow((row, res.from_currency, res.to_currency, res.amount, res.rate, res.result, "", ""))
+        else:
+            out.write(json.dumps({
+                "row": row, "from": res.from_currency, "to": res.to_currency,
+                "amount": res.amount, "rate": res.rate, "result": res.result,
+            }, ensure_ascii=False))
+            out.write("\n")
+    return out.getvalue(), len(rows), errors
+
+
+# конвертер процесса пула, создаётся один раз в initializer
+_worker_converter: CurrencyConverter | None = None
+
+
+def _init_worker(rates_path: str, engine: str, rounding: str) -> None:
+    global _worker_converter
+    _worker_converter = CurrencyConverter(CsvRatesLoader(rates_path).load(), engine=engine, rounding=rounding)
+
+
+def _convert_in_worker(
+    columns: tuple[int, int, int] | None, first_row: int, records: list, out_fmt: str
+) -> tuple[str, int, int]:
+    return convert_chunk(_worker_converter, columns, first_row, records, out_fmt)
+
+
+def convert_stream(
+    source: IO[str],
+    target: IO[str],
+    converter: CurrencyConverter,
+    in_fmt: str = "csv",
+    out_fmt: str | None = None,
+    chunk_size: int = 10_000,
+    processes: int = 1,
+    rates_path: str | None = None,
+) -> BulkStats:
+    """
+    Reads rows of from,to,amount from `source` (CSV with a header, or NDJSON), converts them
+    chunk by chunk and writes one output row per input row to `target`, in input order:
+    the result, or the error for that row (as in POST /operations/batch). Rows are numbered
+    from 1, not counting the CSV header; blank lines are skipped but counted.
+
+    With processes > 1 chunks go to a process pool (each worker loads rates_path itself);
+    at most 2 x processes chunks are in flight and the output is written as soon as the
+    oldest one is done, so memory depends on chunk_size, not on the input size.
+    """
+    if in_fmt not in FORMATS or (out_fmt or in_fmt) not in FORMATS:
+        raise ValueError(f"format must be one of: {', '.join(FORMATS)}")
+    out_fmt = out_fmt or in_fmt
+    if chunk_size < 1 or processes < 1:
+        raise ValueError("chunk_size and processes must be >= 1")
+
+    started = time.perf_counter()
+    stats = BulkStats()
+    columns, records = _records(source, in_fmt)
+    if out_fmt == "csv":
+        target.write(",".join(CSV_COLUMNS) + "\n")
+    first_row = 1  # номер записи во входе, заголовок CSV не считается
+
+    def write(done: tuple[str, int, int]) -> None:
+        text, rows, errors = done
+        target.write(text)
+        stats.rows += rows
+        stats.errors += errors
+
+    chunks = iter(lambda: list(islice(records, chunk_size)), [])
+    if processes == 1:
+        for chunk in chunks:
+            write(convert_chunk(converter, columns, first_row, chunk, out_fmt))
+            first_row += len(chunk)
+    else:
+        if rates_path is None:
+            raise ValueError("rates_path is required with processes > 1")
+        initargs = (rates_path, converter.engine, converter.rounding)
+        with ProcessPoolExecutor(processes, initializer=_init_worker, initargs=initargs) as pool:
+            pending: deque[Future] = deque()
+            for chunk in chunks:
+                pending.append(pool.submit(_convert_in_worker, columns, first_row, chunk, out_fmt))
+                first_row += len(chunk)
+                if len(pending) >= 2 * processes:
+                    write(pending.popleft().result())
+            while pending:
+                write(pending.popleft().result())
+
+    stats.seconds = time.perf_counter() - started
+    return stats
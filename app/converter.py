@@ -1,8 +1,18 @@
 from __future__ import annotations
 
+import math
+from collections.abc import Iterable
 from dataclasses import dataclass
+from datetime import date
 
-from app.rates import Rates
+from app.money import FixedPointEngine
+from app.rates import (
+    RateHistory,
+    RateNotAvailableError,
+    Rates,
+    RatesError,
+    normalize_code,
+)
 
 
 class ConversionError(Exception):
@@ -13,6 +23,10 @@ class InvalidAmountError(ConversionError):
     pass
 
 
+# арифметика конвертаций: float и round() или целые числа (app.money)
+ENGINES = ("float", "fixed")
+
+
 @dataclass(frozen=True)
 class ConversionResult:
     from_currency: str
@@ -23,10 +37,39 @@ class ConversionResult:
 
 
 class CurrencyConverter:
-    def __init__(self, rates: Rates) -> None:
+    """
+    Converts amounts with the current Rates snapshot.
+    The snapshot can be replaced at runtime with set_rates(); every call reads it
+    once, so a conversion (or a whole batch) uses either the old rates or the new ones.
+    With a RateHistory, convert(..., as_of=day) uses the rates published on that day.
+
+    engine="fixed" computes rate and result with FixedPointEngine (integers, the given
+    rounding mode) instead of float arithmetic and round(); results are still floats,
+    the nearest ones to the exact decimals. rounding applies to the fixed engine only.
+    """
+    def __init__(
+        self, rates: Rates, history: RateHistory | None = None, engine: str = "float", rounding: str = "half_up"
+    ) -> None:
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown engine: {engine!r}, expected one of {list(ENGINES)}")
+        self._rates = rates
+        self.history = history
+        self.engine = engine
+        self.rounding = rounding
+        self._money = FixedPointEngine(rounding) if engine == "fixed" else None
+
+    @property
+    def rates(self) -> Rates:
+        return self._rates
+
+    def set_rates(self, rates: Rates) -> None:
+        """Replaces the rates snapshot used by subsequent conversions."""
+        _ = rates.table  # таблица строится здесь, а не в первом запросе после замены
         self._rates = rates
 
-    def convert(self, amount: float, from_currency: str, to_currency: str) -> ConversionResult:
+    def convert(
+        self, amount: float, from_currency: str, to_currency: str, as_of: date | None = None
+    ) -> ConversionResult:
         if not isinstance(amount, (int, float)):
             raise InvalidAmountError("Amount must be a number")
 
@@ -34,25 +77,135 @@ class CurrencyConverter:
         if amount <= 0:
             raise InvalidAmountError("Amount must be > 0")
 
-        f = self._rates.normalize(from_currency)
-        t = self._rates.normalize(to_currency)
-
-        # 1 FROM -> RUB -> TO
-        rate_from = self._rates.get_rate_to_rub(f)  # raises UnknownCurrencyError
-        rate_to = self._rates.get_rate_to_rub(t)    # raises UnknownCurrencyError
-
-        # rate of (1 FROM) in TO:
-        rate = rate_from / rate_to
-        result = amount * rate
-
-        # округлим до 2 знаков (как для денег)
-        result_rounded = round(result, 2)
-        rate_rounded = round(rate, 6)
+        rates = self._rates
+        if as_of is None:
+            f, t, rate, rate_rounded = self._pair(rates, from_currency, to_currency)
+        else:
+            f, t, rate, rate_rounded = self._history_pair(as_of, from_currency, to_currency)
+
+        money = self._money
+        if money is not None:
+            if not math.isfinite(amount):
+                raise InvalidAmountError("Amount must be a finite number")
+            if as_of is None:
+                scaled = money.rate(rates.rate_to_rub[f], rates.rate_to_rub[t])
+            else:
+                scaled = money.rate(self.history.rate_to_rub(f, as_of), self.history.rate_to_rub(t, as_of))
+            return ConversionResult(
+                from_currency=f,
+                to_currency=t,
+                amount=amount,
+                rate=scaled / money.rate_scale,
+                result=money.convert(amount, scaled) / money.minor_scale,
+            )
 
         return ConversionResult(
             from_currency=f,
             to_currency=t,
             amount=amount,
             rate=rate_rounded,
-            result=result_rounded,
+            # округлим до 2 знаков (как для денег)
+            result=round(amount * rate, 2),
         )
+
+    @staticmethod
+    def _pair(rates: Rates, from_currency: str, to_currency: str) -> tuple[str, str, float, float]:
+        """(from, to, rate, rate rounded to 6 digits) for 1 FROM in TO, via RUB."""
+        table = rates.table
+        try:
+            i = table.index.get(from_currency)
+            j = table.index.get(to_currency)
+        except TypeError:  # нехешируемый код, ошибку даст normalize
+            i = j = None
+        if i is not None and j is not None:
+            # быстрый путь: коды уже нормализованы
+            return table.pair(i, j)
+
+        f = rates.normalize(from_currency)
+        t = rates.normalize(to_currency)
+        # raises UnknownCurrencyError
+        return table.pair(table.id_of(f), table.id_of(t))
+
+    def _history_pair(self, as_of: date, from_currency: str, to_currency: str) -> tuple[str, str, float, float]:
+        if self.history is None:
+            raise RateNotAvailableError("No rates history loaded")
+        f = normalize_code(from_currency)
+        t = normalize_code(to_currency)
+        rate = self.history.rate_to_rub(f, as_of) / self.history.rate_to_rub(t, as_of)
+        return f, t, rate, round(rate, 6)
+
+    def convert_many(
+        self, items: Iterable[tuple[float, str, str]]
+    ) -> list[ConversionResult | ConversionError | RatesError]:
+        """
+        Converts a batch of (amount, from_currency, to_currency) items.
+        Returns one entry per item, in order: a ConversionResult, or the exception
+        that convert() would raise for that item (InvalidAmountError / UnknownCurrencyError).
+        Codes and the pair rate are resolved once per distinct pair in the batch.
+        With the fixed engine the amounts of each pair are converted together (convert_many).
+        """
+        rates = self._rates
+        money = self._money
+        pairs: dict[tuple[object, object], tuple[str, str, float, float] | RatesError] = {}
+        out: list[ConversionResult | ConversionError | RatesError | float] = []
+        # для fixed: пара -> позиции её сумм в out, результаты считаются в конце
+        groups: dict[tuple[str, str], list[int]] = {}
+
+        for amount, from_currency, to_currency in items:
+            if not isinstance(amount, (int, float)):
+                out.append(InvalidAmountError("Amount must be a number"))
+                continue
+            amount = float(amount)
+            if amount <= 0:
+                out.append(InvalidAmountError("Amount must be > 0"))
+                continue
+
+            key = (from_currency, to_currency)
+            try:
+                pair = pairs[key]
+            except KeyError:
+                pair = pairs[key] = self._resolve_pair(rates, from_currency, to_currency)
+            except TypeError:  # unhashable code, e.g. a list from JSON
+                pair = self._resolve_pair(rates, from_currency, to_currency)
+
+            if isinstance(pair, RatesError):
+                out.append(pair)
+                continue
+
+            f, t, rate, rate_rounded = pair
+            if money is not None:
+                if not math.isfinite(amount):
+                    out.append(InvalidAmountError("Amount must be a finite number"))
+                    continue
+                groups.setdefault((f, t), []).append(len(out))
+                out.append(amount)
+                continue
+            out.append(
+                ConversionResult(
+                    from_currency=f,
+                    to_currency=t,
+                    amount=amount,
+                    rate=rate_rounded,
+                    result=round(amount * rate, 2),
+                )
+            )
+
+        for (f, t), positions in groups.items():
+            scaled = money.rate(rates.rate_to_rub[f], rates.rate_to_rub[t])
+            rate = scaled / money.rate_scale
+            if len(positions) == 1:
+                i = positions[0]
+                out[i] = ConversionResult(f, t, out[i], rate, money.convert(out[i], scaled) / money.minor_scale)
+                continue
+            results = money.convert_many([out[i] for i in positions], scaled)
+            for i, minor in zip(positions, results):
+                out[i] = ConversionResult(f, t, out[i], rate, minor / money.minor_scale)
+        return out
+
+    def _resolve_pair(
+        self, rates: Rates, from_currency: str, to_currency: str
+    ) -> tuple[str, str, float, float] | RatesError:
+        try:
+            return self._pair(rates, from_currency, to_currency)
+        except RatesError as e:
+            return e
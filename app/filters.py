@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+from datetime import UTC, datetime, timedelta
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=UTC)
+_MICROSECOND = timedelta(microseconds=1)
+
+# параметры GET /operations -> аргументы OperationLog.query
+FILTER_PARAMS = {
+    "from": "from_currency",
+    "to": "to_currency",
+    "since": "since",
+    "until": "until",
+    "min_amount": "min_amount",
+}
+
+
+def query_time(value: str, name: str) -> int:
+    """ISO date or datetime of a query parameter -> epoch microseconds; without an offset it is UTC."""
+    try:
+        dt = datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"{name} must be an ISO date or datetime") from None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=UTC)
+    return (dt - _EPOCH) // _MICROSECOND
+
+
+def operation_filters(qs: dict[str, list[str]]) -> dict:
+    """Keyword arguments for OperationLog.query from the query string; ValueError on a bad value."""
+    filters: dict = {}
+    for name, arg in FILTER_PARAMS.items():
+        if name not in qs:
+            continue
+        value = qs[name][0].strip()
+        if name in ("from", "to"):
+            if not value:
+                raise ValueError(f"{name} must be a currency code")
+            filters[arg] = value.upper()
+        elif name in ("since", "until"):
+            filters[arg] = query_time(value, name)
+        else:
+            try:
+                filters[arg] = float(value)
+            except ValueError:
+                raise ValueError(f"{name} must be a number") from None
+    return filters
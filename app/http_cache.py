@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+import threading
+import zlib
+from collections import OrderedDict
+from operator import itemgetter
+from urllib.parse import parse_qsl, urlencode
+
+
+def cache_key(path: str, query: str) -> str:
+    """
+    Request target with the query parameters sorted by name, so the same representation
+    gets the same key however the client ordered them. Values of a repeated parameter keep
+    their order: the server reads the first one.
+    """
+    if not query:
+        return path
+    params = sorted(parse_qsl(query, keep_blank_values=True), key=itemgetter(0))
+    return f"{path}?{urlencode(params)}"
+
+
+def etag(version: int, key: str) -> str:
+    """ETag of the representation `key` (see cache_key) at OperationLog.version() `version`."""
+    return f'"{version:x}-{zlib.crc32(key.encode("utf-8")):08x}"'
+
+
+def etag_matches(if_none_match: str | None, tag: str) -> bool:
+    """If-None-Match contains `tag` (weak comparison) or is `*`."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(candidate.strip().removeprefix("W/") == tag for candidate in if_none_match.split(","))
+
+
+class ResponseCache:
+    """
+    Encoded GET responses keyed by cache_key, each valid for one OperationLog.version().
+    A stale entry is simply never served: any add/clear bumps the version.
+    Bounded by entry count and total bytes, least recently used entries go first.
+    """
+    def __init__(self, max_entries: int = 256, max_bytes: int = 32 * 1024 * 1024) -> None:
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[str, tuple[int, bytes]] = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str, version: int) -> bytes | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != version:
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key: str, version: int, body: bytes) -> None:
+        if len(body) > self.max_bytes // 4:
+            return  # вся история целиком вытеснила бы остальные ответы
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._size -= len(old[1])
+            self._entries[key] = (version, body)
+            self._size += len(body)
+            while len(self._entries) > self.max_entries or self._size > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._size -= len(evicted)
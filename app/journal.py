@@ -0,0 +1,490 @@
+from __future__ import annotations
+
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+import zlib
+from array import array
+from collections.abc import Callable, Iterable
+from pathlib import Path
+
+from app.operations import (
+    ColumnarStore,
+    Columns,
+    ListStore,
+    Operation,
+    OperationLogError,
+    micros_to_ts,
+    ts_to_micros,
+    uuid_bytes,
+    uuid_str,
+)
+
+SNAPSHOT_NAME = "operations.snapshot"
+JOURNAL_NAME = "operations.journal"
+# журнал, который сейчас сворачивается в снимок
+PREV_JOURNAL_NAME = "operations.journal.prev"
+
+# журнал больше этого (около 260 тысяч операций) сворачивается в новый снимок в фоне
+COMPACT_BYTES = 16 * 1024 * 1024
+
+_SNAPSHOT_MAGIC = b"CCSNAP02"
+_JOURNAL_MAGIC = b"CCJRNL01"
+
+# magic, generation, operation count, currency count, id index size
+_SNAPSHOT_HEAD = struct.Struct("<8sQQIQ")
+# magic, generation
+_JOURNAL_HEAD = struct.Struct("<8sQ")
+# payload length, crc32 of payload
+_RECORD_HEAD = struct.Struct("<II")
+# id, ts (epoch microseconds), amount, rate, result, len(from), len(to)
+_ADD_BODY = struct.Struct("<16sqdddHH")
+# number of the oldest records evicted by retention
+_DROP_BODY = struct.Struct("<Q")
+_CRC = struct.Struct("<I")
+
+_KIND_ADD = b"A"
+_KIND_CLEAR = b"C"
+_KIND_DROP = b"D"
+
+
+class JournalError(OperationLogError):
+    pass
+
+
+def _native(arr: array) -> array:
+    # файлы всегда little-endian
+    if sys.byteorder != "little":  # pragma: no cover
+        arr.byteswap()
+    return arr
+
+
+def _encode_add(op: Operation) -> bytes:
+    f = op.from_currency.encode("utf-8")
+    t = op.to_currency.encode("utf-8")
+    payload = b"".join((
+        _KIND_ADD,
+        _ADD_BODY.pack(uuid_bytes(op.id), ts_to_micros(op.ts), op.amount, op.rate, op.result, len(f), len(t)),
+        f,
+        t,
+    ))
+    return _RECORD_HEAD.pack(len(payload), zlib.crc32(payload)) + payload
+
+
+def _encode_clear() -> bytes:
+    return _RECORD_HEAD.pack(1, zlib.crc32(_KIND_CLEAR)) + _KIND_CLEAR
+
+
+def _encode_drop(n: int) -> bytes:
+    payload = _KIND_DROP + _DROP_BODY.pack(n)
+    return _RECORD_HEAD.pack(len(payload), zlib.crc32(payload)) + payload
+
+
+def _fsync_dir(directory: Path) -> None:
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def write_snapshot(path: Path, generation: int, cols: Columns) -> None:
+    """
+    Writes a columnar snapshot atomically (temp file + rename): header, currency
+    table, one column per field, the id index if there is one, crc32 of everything.
+    """
+    slots = cols.slots if cols.slots is not None else array("q")
+    parts = [_SNAPSHOT_HEAD.pack(_SNAPSHOT_MAGIC, generation, len(cols), len(cols.codes), len(slots))]
+    for code in cols.codes:
+        raw = code.encode("utf-8")
+        parts.append(struct.pack("<H", len(raw)) + raw)
+    parts.append(cols.ids)
+    for col in (cols.ts, cols.from_idx, cols.to_idx, cols.amount, cols.rate, cols.result, slots):
+        if sys.byteorder != "little":  # pragma: no cover
+            col = array(col.typecode, col)
+            col.byteswap()
+        parts.append(col)
+    crc = 0
+    for part in parts:
+        crc = zlib.crc32(part, crc)
+    parts.append(_CRC.pack(crc))
+
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    with tmp.open("wb") as f:
+        for part in parts:
+            f.write(part)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    _fsync_dir(path.parent)
+
+
+def read_snapshot(path: Path) -> tuple[int, Columns | None]:
+    """Returns (generation, columns) from a snapshot; (0, None) if there is none."""
+    if not path.exists() or path.stat().st_size == 0:
+        return 0, None
+
+    with path.open("rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm, memoryview(mm) as view:
+        return _parse_snapshot(view, path)
+
+
+def _parse_snapshot(view: memoryview, path: Path) -> tuple[int, Columns]:
+    if len(view) < _SNAPSHOT_HEAD.size + _CRC.size:
+        raise JournalError(f"Snapshot is truncated: {path}")
+    magic, generation, count, ncodes, nslots = _SNAPSHOT_HEAD.unpack_from(view, 0)
+    if magic != _SNAPSHOT_MAGIC:
+        raise JournalError(f"Not a snapshot file: {path}")
+    (crc,) = _CRC.unpack_from(view, len(view) - _CRC.size)
+    if zlib.crc32(view[:-_CRC.size]) != crc:
+        raise JournalError(f"Snapshot checksum mismatch: {path}")
+
+    pos = _SNAPSHOT_HEAD.size
+    codes = []
+    for _ in range(ncodes):
+        (size,) = struct.unpack_from("<H", view, pos)
+        codes.append(str(view[pos + 2:pos + 2 + size], "utf-8"))
+        pos += 2 + size
+
+    ids = view[pos:pos + 16 * count].tobytes()
+    pos += 16 * count
+    columns = []
+    for typecode, n in (("q", count), ("H", count), ("H", count), ("d", count), ("d", count), ("d", count), ("q", nslots)):
+        col = array(typecode)
+        end = pos + col.itemsize * n
+        col.frombytes(view[pos:end])
+        columns.append(_native(col))
+        pos = end
+    ts, from_idx, to_idx, amount, rate, result, slots = columns
+
+    return generation, Columns(
+        codes=codes,
+        ids=ids,
+        ts=ts,
+        from_idx=from_idx,
+        to_idx=to_idx,
+        amount=amount,
+        rate=rate,
+        result=result,
+        slots=slots if nslots else None,
+    )
+
+
+def read_journal(path: Path) -> tuple[int, list[tuple[Operation, bytes, int] | int | None], int]:
+    """
+    Returns (generation, records, valid length) of a journal file.
+    A record is (operation, raw id, ts in microseconds), None for clear() or the number of the oldest
+    records evicted by retention. Reading stops at the first
+    torn or corrupted record: everything after it was never acknowledged as durable.
+    """
+    if not path.exists() or path.stat().st_size < _JOURNAL_HEAD.size:
+        return 0, [], 0
+
+    with path.open("rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm, memoryview(mm) as view:
+        return _parse_journal(view, path)
+
+
+def _parse_journal(view: memoryview, path: Path) -> tuple[int, list[tuple[Operation, bytes, int] | int | None], int]:
+    magic, generation = _JOURNAL_HEAD.unpack_from(view, 0)
+    if magic != _JOURNAL_MAGIC:
+        raise JournalError(f"Not a journal file: {path}")
+
+    records: list[tuple[Operation, bytes, int] | int | None] = []
+    pos = _JOURNAL_HEAD.size
+    end = len(view)
+    while pos + _RECORD_HEAD.size <= end:
+        size, crc = _RECORD_HEAD.unpack_from(view, pos)
+        start = pos + _RECORD_HEAD.size
+        if size == 0 or start + size > end:
+            break
+        payload = view[start:start + size].tobytes()
+        if zlib.crc32(payload) != crc:
+            break
+        kind = payload[:1]
+        if kind == _KIND_CLEAR:
+            records.append(None)
+        elif kind == _KIND_DROP:
+            records.append(_DROP_BODY.unpack_from(payload, 1)[0])
+        else:
+            raw_id, ts, amount, rate, result, flen, tlen = _ADD_BODY.unpack_from(payload, 1)
+            body = 1 + _ADD_BODY.size
+            op = Operation(
+                id=uuid_str(raw_id),
+                ts=micros_to_ts(ts),
+                from_currency=payload[body:body + flen].decode("utf-8"),
+                to_currency=payload[body + flen:body + flen + tlen].decode("utf-8"),
+                amount=amount,
+                rate=rate,
+                result=result,
+            )
+            records.append((op, raw_id, ts))
+        pos = start + size
+    return generation, records, pos
+
+
+def _replay(store: ListStore | ColumnarStore, records: list[tuple[Operation, bytes, int] | int | None]) -> None:
+    for rec in records:
+        if rec is None:
+            store.clear()
+        elif isinstance(rec, int):
+            store.drop_oldest(rec)
+        else:
+            store.append(*rec)
+
+
+class Journal:
+    """
+    Durable storage for OperationLog: a columnar snapshot plus an append-only journal
+    of changes made since that snapshot, both in `directory`.
+
+    append*() only queue encoded records; a background writer thread writes
+    everything queued so far with one write() and one fsync() (group commit).
+    commit(seq) blocks until the record is durable when `synchronous` is set;
+    otherwise records reach the disk shortly after, in the background.
+    commit_interval adds a short pause before each commit so that more records
+    share one fsync.
+
+    Once the journal grows past compact_bytes, the writer thread renames it to
+    operations.journal.prev, starts a new one and a compactor thread folds the
+    snapshot and the old journal into a new snapshot, so the tail to replay on
+    startup stays bounded while commits go on. None turns this off.
+
+    Snapshot and journals carry a generation number: the journal with generation
+    N + 1 holds changes made after the snapshot with generation N. A journal whose
+    generation is not newer than the snapshot is already part of it and is ignored,
+    which keeps recovery correct if the process dies in the middle of a compaction.
+    """
+    def __init__(
+        self,
+        directory: str | Path,
+        commit_interval: float = 0.0,
+        synchronous: bool = True,
+        compact_bytes: int | None = COMPACT_BYTES,
+    ) -> None:
+        self.directory = Path(directory)
+        self.commit_interval = commit_interval
+        self.synchronous = synchronous
+        self.compact_bytes = compact_bytes
+        self.snapshot_path = self.directory / SNAPSHOT_NAME
+        self.journal_path = self.directory / JOURNAL_NAME
+        self.prev_path = self.directory / PREV_JOURNAL_NAME
+        self.compactions = 0
+        self.compact_error: BaseException | None = None
+
+        self._generation = 0
+        self._fd: int | None = None
+        self._cond = threading.Condition()
+        self._io_lock = threading.Lock()
+        self._pending: list[bytes] = []
+        self._seq = 0  # номер последней поставленной в очередь записи
+        self._durable = 0  # номер последней записи, прошедшей fsync
+        self._error: BaseException | None = None
+        self._closing = False
+        self._writer: threading.Thread | None = None
+        self._size = 0  # байт в текущем журнале
+        self._compactor: threading.Thread | None = None
+
+    def recover(
+        self,
+        store: ListStore | ColumnarStore,
+        retain: Callable[[ListStore | ColumnarStore], int] | None = None,
+    ) -> None:
+        """
+        Loads the snapshot and the journals after it into `store` and opens the journal
+        for appending. If anything was replayed it is folded into a new snapshot.
+        retain(store) gives how many of the oldest records retention evicts; they are
+        dropped before that snapshot is written.
+        """
+        self.directory.mkdir(parents=True, exist_ok=True)
+        generation, cols = read_snapshot(self.snapshot_path)
+        if cols is not None:
+            store.load(cols)
+
+        # .prev остаётся, если процесс упал во время свёртки; он старше текущего журнала
+        applied = []
+        replayed = False
+        valid_len = 0
+        for path in (self.prev_path, self.journal_path):
+            journal_gen, records, valid_len = read_journal(path)
+            if journal_gen <= generation:
+                continue  # файла нет или он уже в снимке
+            if journal_gen > generation + 1:
+                raise JournalError(f"Journal {path} is newer than snapshot {self.snapshot_path}")
+            _replay(store, records)
+            generation = journal_gen
+            applied.append(path)
+            replayed = replayed or bool(records)
+        dropped = retain(store) if retain is not None else 0
+        if dropped:
+            store.drop_oldest(dropped)
+
+        self._generation = generation
+        if applied == [self.journal_path] and not replayed and not dropped:
+            # журнал пустой, но мог остаться оборванный хвост
+            self._open_journal(truncate_to=valid_len)
+        elif applied or dropped:
+            self._rotate(store)
+        else:
+            self._generation += 1
+            self._new_journal()
+        if self.prev_path.exists():
+            self.prev_path.unlink()
+
+        self._writer = threading.Thread(target=self._run, name="journal-writer", daemon=True)
+        self._writer.start()
+
+    def append(self, op: Operation) -> int:
+        return self._enqueue(_encode_add(op))
+
+    def append_many(self, ops: Iterable[Operation]) -> int:
+        return self._enqueue(b"".join(_encode_add(op) for op in ops))
+
+    def append_clear(self) -> int:
+        return self._enqueue(_encode_clear())
+
+    def append_drop(self, n: int) -> int:
+        return self._enqueue(_encode_drop(n))
+
+    def commit(self, seq: int) -> None:
+        """Makes record `seq` durable before returning, in synchronous mode."""
+        if self.synchronous:
+            self.wait(seq)
+
+    def wait(self, seq: int) -> None:
+        """Blocks until the record with sequence number `seq` is on disk."""
+        with self._cond:
+            while self._durable < seq and self._error is None:
+                self._cond.wait()
+            if self._error is not None:
+                raise JournalError("Journal write failed") from self._error
+
+    def flush(self) -> None:
+        with self._cond:
+            seq = self._seq
+        self.wait(seq)
+
+    def close(self) -> None:
+        with self._cond:
+            self._closing = True
+            self._cond.notify_all()
+        if self._writer is not None:
+            self._writer.join()
+            self._writer = None
+        # свёртка сама сбрасывает _compactor по окончании
+        compactor = self._compactor
+        if compactor is not None:
+            compactor.join()
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def _enqueue(self, record: bytes) -> int:
+        with self._cond:
+            if self._closing:
+                raise JournalError("Journal is closed")
+            self._pending.append(record)
+            self._seq += 1
+            self._cond.notify_all()
+            return self._seq
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._pending and not self._closing:
+                    self._cond.wait()
+                if not self._pending:
+                    return
+            if self.commit_interval > 0:
+                # даём набраться группе записей под один fsync
+                time.sleep(self.commit_interval)
+            with self._cond:
+                batch, self._pending = self._pending, []
+                seq = self._seq
+            try:
+                with self._io_lock:
+                    data = b"".join(batch)
+                    self._write_all(data)
+                    os.fsync(self._fd)
+                    self._size += len(data)
+                    if self.compact_bytes is not None and self._size >= self.compact_bytes and self._compactor is None:
+                        if self.prev_path.exists():
+                            self._start_compactor()  # прошлая свёртка не удалась, .prev ещё не в снимке
+                        else:
+                            self._switch()
+            except OSError as e:
+                with self._cond:
+                    self._error = e
+                    self._cond.notify_all()
+                return
+            with self._cond:
+                self._durable = seq
+                self._cond.notify_all()
+
+    def _write_all(self, data: bytes) -> None:
+        view = memoryview(data)
+        while view:
+            written = os.write(self._fd, view)
+            view = view[written:]
+
+    def _switch(self) -> None:
+        """
+        Writer thread, after a commit: the full journal becomes .prev, appends go to a new
+        journal of the next generation and a compactor thread folds .prev into the snapshot.
+        """
+        os.close(self._fd)
+        self._fd = None
+        os.replace(self.journal_path, self.prev_path)
+        _fsync_dir(self.directory)
+        self._generation += 1
+        self._new_journal()
+        self._start_compactor()
+
+    def _start_compactor(self) -> None:
+        self._compactor = threading.Thread(target=self._compact, name="journal-compactor", daemon=True)
+        self._compactor.start()
+
+    def _compact(self) -> None:
+        # снимок + .prev читаются из файлов: историю в памяти и её блокировку не трогаем
+        try:
+            store = ColumnarStore()
+            _, cols = read_snapshot(self.snapshot_path)
+            if cols is not None:
+                store.load(cols)
+            generation, records, _ = read_journal(self.prev_path)
+            _replay(store, records)
+            del records
+            write_snapshot(self.snapshot_path, generation, store.columns())
+            self.prev_path.unlink()
+            _fsync_dir(self.directory)
+        except (OSError, JournalError) as e:
+            # .prev остаётся: свёртку повторит следующий коммит или следующий запуск
+            self.compact_error = e
+        else:
+            self.compactions += 1
+        finally:
+            with self._io_lock:
+                self._compactor = None
+
+    def _rotate(self, store: ListStore | ColumnarStore) -> None:
+        # сначала снимок текущего поколения, потом пустой журнал следующего
+        write_snapshot(self.snapshot_path, self._generation, store.columns())
+        self._generation += 1
+        self._new_journal()
+
+    def _new_journal(self) -> None:
+        tmp = self.journal_path.with_suffix(self.journal_path.suffix + ".tmp")
+        with tmp.open("wb") as f:
+            f.write(_JOURNAL_HEAD.pack(_JOURNAL_MAGIC, self._generation))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.journal_path)
+        _fsync_dir(self.directory)
+        self._open_journal()
+
+    def _open_journal(self, truncate_to: int | None = None) -> None:
+        self._fd = os.open(self.journal_path, os.O_WRONLY | os.O_APPEND)
+        if truncate_to is not None:
+            os.ftruncate(self._fd, truncate_to)
+        self._size = os.fstat(self._fd).st_size
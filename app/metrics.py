@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+import threading
+from bisect import bisect_left
+from collections.abc import Callable, Iterable
+
+# границы корзин гистограммы задержек, в секундах
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _number(value: float) -> str:
+    if value == int(value):
+        return str(int(value))
+    return repr(value)
+
+
+class Metrics:
+    """
+    Request counters, latency histograms and conversion counts for GET /metrics.
+
+    observe() is called once per request and only bumps a few integers under a lock,
+    everything else (cumulative buckets, seconds, text) is computed by render().
+    Routes must be a small fixed set of labels, not raw paths.
+    """
+    def __init__(self, buckets: Iterable[float] = LATENCY_BUCKETS) -> None:
+        self.buckets = tuple(buckets)
+        self._bounds_ns = [round(b * 1e9) for b in self.buckets]
+        self._requests: dict[tuple[str, str, int], int] = {}
+        # (method, route) -> [счётчики по корзинам + переполнение, сумма в нс]
+        self._latency: dict[tuple[str, str], list[int]] = {}
+        self._conversions: dict[tuple[str, str], int] = {}
+        self._gauges: dict[str, tuple[str, Callable[[], float]]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, method: str, route: str, status: int, elapsed_ns: int) -> None:
+        bucket = bisect_left(self._bounds_ns, elapsed_ns)
+        key = (method, route)
+        with self._lock:
+            counts = self._latency.get(key)
+            if counts is None:
+                counts = self._latency[key] = [0] * (len(self._bounds_ns) + 2)
+            counts[bucket] += 1
+            counts[-1] += elapsed_ns
+            status_key = (method, route, status)
+            self._requests[status_key] = self._requests.get(status_key, 0) + 1
+
+    def count_conversions(self, pairs: Iterable[tuple[str, str]]) -> None:
+        with self._lock:
+            for pair in pairs:
+                self._conversions[pair] = self._conversions.get(pair, 0) + 1
+
+    def gauge(self, name: str, help_text: str, read: Callable[[], float]) -> None:
+        """Registers a value read at every render, e.g. the size of the operation log."""
+        self._gauges[name] = (help_text, read)
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        with self._lock:
+            requests = sorted(self._requests.items())
+            latency = sorted((key, list(counts)) for key, counts in self._latency.items())
+            conversions = sorted(self._conversions.items())
+
+        lines = [
+            "# HELP http_requests_total HTTP requests by method, route and status.",
+            "# TYPE http_requests_total counter",
+        ]
+        for (method, route, status), n in requests:
+            lines.append(f'http_requests_total{{method="{method}",route="{_label(route)}",status="{status}"}} {n}')
+
+        lines.append("# HELP http_request_duration_seconds Time spent handling a request.")
+        lines.append("# TYPE http_request_duration_seconds histogram")
+        for (method, route), counts in latency:
+            labels = f'method="{method}",route="{_label(route)}"'
+            total = 0
+            for bound, n in zip(self.buckets, counts):
+                total += n
+                lines.append(f'http_request_duration_seconds_bucket{{{labels},le="{bound}"}} {total}')
+            total += counts[-2]
+            lines.append(f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}} {total}')
+            lines.append(f"http_request_duration_seconds_sum{{{labels}}} {counts[-1] / 1e9}")
+            lines.append(f"http_request_duration_seconds_count{{{labels}}} {total}")
+
+        lines.append("# HELP conversions_total Stored conversions by currency pair.")
+        lines.append("# TYPE conversions_total counter")
+        for (from_currency, to_currency), n in conversions:
+            lines.append(f'conversions_total{{from="{_label(from_currency)}",to="{_label(to_currency)}"}} {n}')
+
+        for name, (help_text, read) in sorted(self._gauges.items()):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {_number(read())}")
+
+        return "\n".join(lines) + "\n"
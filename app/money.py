@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+import math
+from collections.abc import Callable, Iterable
+from decimal import Decimal
+from functools import lru_cache
+
+# знаков после запятой у курса и у результата (минорные единицы, копейки/центы)
+RATE_DIGITS = 6
+MINOR_DIGITS = 2
+
+
+def _half_up(n: int, d: int) -> int:
+    return (2 * n + d) // (2 * d)
+
+
+def _half_down(n: int, d: int) -> int:
+    return (2 * n + d - 1) // (2 * d)
+
+
+def _half_even(n: int, d: int) -> int:
+    q, r = divmod(n, d)
+    if 2 * r > d or (2 * r == d and q & 1):
+        return q + 1
+    return q
+
+
+def _down(n: int, d: int) -> int:
+    return n // d
+
+
+def _up(n: int, d: int) -> int:
+    return -(-n // d)
+
+
+# режим -> округление n / d до целого для n >= 0, d > 0; "half_up" и "up" от нуля, "down" к нулю
+ROUNDING: dict[str, Callable[[int, int], int]] = {
+    "half_up": _half_up,
+    "half_even": _half_even,
+    "half_down": _half_down,
+    "down": _down,
+    "up": _up,
+}
+
+
+def round_div(n: int, d: int, mode: str = "half_up") -> int:
+    """n / d rounded to an integer with a ROUNDING mode; d must be > 0. Symmetric around zero."""
+    if n < 0:
+        return -ROUNDING[mode](-n, d)
+    return ROUNDING[mode](n, d)
+
+
+_POW10 = tuple((e, 10**e) for e in range(8))
+# до этой величины value * 10**7 точно отличает соседние целые, дальше только через repr()
+_FLOAT_EXACT = 2.0**52 / 10**7
+
+
+def decimal_parts(value: float) -> tuple[int, int]:
+    """
+    (units, exponent) with value == units / 10**exponent, for the shortest decimal that
+    reads back as `value`, i.e. what repr() prints: 0.1 -> (1, 1), 10.005 -> (10005, 3),
+    3.0 -> (3, 0). ValueError for inf and nan.
+    """
+    if isinstance(value, int):
+        return value, 0
+    if -_FLOAT_EXACT < value < _FLOAT_EXACT:
+        # быстрый путь без repr(): подбираем число знаков, при котором value * 10**e целое
+        for exp, scale in _POW10:
+            units = round(value * scale)
+            if units / scale == value:
+                return units, exp
+    text = repr(value)
+    whole, dot, frac = text.partition(".")
+    if dot and "e" not in frac:
+        return int(whole + frac), len(frac)
+    if not math.isfinite(value):
+        raise ValueError(f"Not a finite number: {value!r}")
+    # экспоненциальная запись: 1e-05, 1e+16
+    sign, digits, exp = Decimal(text).as_tuple()
+    units = int("".join(map(str, digits)))
+    if sign:
+        units = -units
+    if exp >= 0:
+        return units * 10**exp, 0
+    return units, -exp
+
+
+class FixedPointEngine:
+    """
+    Conversions in integers, as an alternative to float multiplication and round().
+
+    An amount is taken as the decimal it prints as (10.005 is exactly 10.005), the pair rate
+    is FROM/TO rounded to rate_digits and kept as an integer, and amount x rate is rounded
+    once to minor units with an explicit mode (see ROUNDING). So the result is exact and the
+    same on every machine, and result == amount * rate up to that last rounding.
+
+    rate() is cached per pair of RUB rates; convert_many() applies one rate to a column
+    of amounts with a single divisor, which is what batches are grouped into.
+    """
+    def __init__(self, rounding: str = "half_up", minor_digits: int = MINOR_DIGITS, rate_digits: int = RATE_DIGITS):
+        if rounding not in ROUNDING:
+            raise ValueError(f"Unknown rounding: {rounding!r}, expected one of {sorted(ROUNDING)}")
+        self.rounding = rounding
+        self.minor_digits = minor_digits
+        self.rate_digits = rate_digits
+        self.minor_scale = 10**minor_digits
+        self.rate_scale = 10**rate_digits
+        self._round = ROUNDING[rounding]
+        self.rate = lru_cache(maxsize=65536)(self._rate)
+
+    def _rate(self, rate_from: float, rate_to: float) -> int:
+        """Rate of 1 FROM in TO, both given to RUB, scaled by 10**rate_digits."""
+        from_units, from_exp = decimal_parts(rate_from)
+        to_units, to_exp = decimal_parts(rate_to)
+        return round_div(from_units * 10 ** (to_exp + self.rate_digits), to_units * 10**from_exp, self.rounding)
+
+    def convert(self, amount: float, rate: int) -> int:
+        """amount x rate (scaled, from rate()) in minor units."""
+        scale = self.minor_scale
+        units = round(amount * scale)
+        if units >= 0 and units / scale == amount:
+            # обычный случай: сумма уже в целых минорных единицах
+            return self._round(units * rate, self.rate_scale)
+        units, exp = decimal_parts(amount)
+        shift = exp + self.rate_digits - self.minor_digits
+        if shift < 0:
+            return units * rate * 10**-shift
+        return round_div(units * rate, 10**shift, self.rounding)
+
+    def convert_many(self, amounts: Iterable[float], rate: int) -> list[int]:
+        """convert() for many amounts at one rate: all are brought to one scale, then divided alike."""
+        amounts = list(amounts)
+        scale = self.minor_scale
+        units = [round(amount * scale) for amount in amounts]
+        if all(u >= 0 and u / scale == amount for u, amount in zip(units, amounts)):
+            rnd, divisor = self._round, self.rate_scale
+            return [rnd(u * rate, divisor) for u in units]
+        parts = [decimal_parts(amount) for amount in amounts]
+        exp = max((e for _, e in parts), default=0)
+        units = [u * 10 ** (exp - e) if e != exp else u for u, e in parts]
+        shift = exp + self.rate_digits - self.minor_digits
+        if shift < 0:
+            scale = rate * 10**-shift
+            return [u * scale for u in units]
+        divisor = 10**shift
+        if units and min(units) < 0:
+            return [round_div(u * rate, divisor, self.rounding) for u in units]
+        rnd = self._round
+        return [rnd(u * rate, divisor) for u in units]
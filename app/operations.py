@@ -1,11 +1,83 @@
 from __future__ import annotations
 
-from dataclasses import dataclass, asdict
-from datetime import datetime, timezone
-from uuid import uuid4
+import heapq
+import os
+import struct
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from collections import deque
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass, replace
+from datetime import UTC, datetime, timedelta
+from functools import lru_cache
+from typing import TYPE_CHECKING
 
+from app.aggregates import BUCKETS, Aggregates
 
-@dataclass(frozen=True)
+if TYPE_CHECKING:
+    from app.journal import Journal
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=UTC)
+_MICROSECOND = timedelta(microseconds=1)
+
+
+class OperationLogError(Exception):
+    """Base exception for operation log issues."""
+
+
+class UnknownCursorError(OperationLogError):
+    pass
+
+
+class SubscriptionClosedError(OperationLogError):
+    """The subscription was closed: unsubscribed, or the log was closed."""
+
+
+class SubscriberDroppedError(SubscriptionClosedError):
+    """The subscriber fell more than max_pending operations behind and was dropped."""
+
+
+def ts_to_micros(ts: str) -> int:
+    """ISO timestamp of an Operation -> microseconds since the Unix epoch."""
+    return (datetime.fromisoformat(ts) - _EPOCH) // _MICROSECOND
+
+
+@lru_cache(maxsize=4096)
+def _second_prefix(seconds: int) -> str:
+    return (_EPOCH + timedelta(seconds=seconds)).isoformat()[:19]
+
+
+def micros_to_ts(micros: int) -> str:
+    """Inverse of ts_to_micros, gives back the same string as datetime.isoformat()."""
+    # операции идут плотно по времени, поэтому префикс до секунд почти всегда из кэша
+    seconds, us = divmod(micros, 1_000_000)
+    if us:
+        return f"{_second_prefix(seconds)}.{us:06d}+00:00"
+    return f"{_second_prefix(seconds)}+00:00"
+
+
+def new_operation_id() -> bytes:
+    """16 random bytes laid out as a version 4 UUID (same as uuid4().bytes)."""
+    raw = bytearray(os.urandom(16))
+    raw[6] = (raw[6] & 0x0F) | 0x40
+    raw[8] = (raw[8] & 0x3F) | 0x80
+    return bytes(raw)
+
+
+def uuid_str(raw: bytes) -> str:
+    """Same as str(UUID(bytes=raw)), without building a UUID object."""
+    h = raw.hex()
+    return f"{h[:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:]}"
+
+
+def uuid_bytes(op_id: str) -> bytes:
+    """Inverse of uuid_str; raises ValueError for a malformed id."""
+    return bytes.fromhex(op_id.replace("-", ""))
+
+
+@dataclass(frozen=True, slots=True)
 class Operation:
     id: str
     ts: str
@@ -16,38 +88,775 @@ class Operation:
     result: float
 
     def to_dict(self) -> dict:
-        return asdict(self)
+        # dataclasses.asdict рекурсивно копирует поля, здесь это не нужно
+        return {
+            "id": self.id,
+            "ts": self.ts,
+            "from_currency": self.from_currency,
+            "to_currency": self.to_currency,
+            "amount": self.amount,
+            "rate": self.rate,
+            "result": self.result,
+        }
 
 
-class OperationLog:
+@dataclass
+class Columns:
+    """
+    The history as columns, the way journal snapshots store it.
+    ids: 16 bytes per operation; ts: epoch microseconds; from_idx/to_idx: indices in codes.
+    slots: id hash table of ColumnarStore (positions, -1 = empty), None if not available.
+    """
+    codes: list[str]
+    ids: bytes
+    ts: array
+    from_idx: array
+    to_idx: array
+    amount: array
+    rate: array
+    result: array
+    slots: array | None = None
+
+    def __len__(self) -> int:
+        return len(self.ts)
+
+    def operation(self, i: int) -> Operation:
+        return Operation(
+            id=uuid_str(self.ids[16 * i:16 * i + 16]),
+            ts=micros_to_ts(self.ts[i]),
+            from_currency=self.codes[self.from_idx[i]],
+            to_currency=self.codes[self.to_idx[i]],
+            amount=self.amount[i],
+            rate=self.rate[i],
+            result=self.result[i],
+        )
+
+
+class ListStore:
+    """
+    Operation objects in a list plus a dict index by id. Simple, but several hundred bytes per operation.
+
+    Records evicted by retention (drop_oldest) only move the head; the list is compacted
+    once the dropped prefix is as long as the live part, so eviction is O(1) amortized.
+    """
+    def __init__(self) -> None:
+        self._items: list[Operation | None] = []
+        self._ts = array("q")  # время операций, для вытеснения по возрасту
+        self._head = 0  # live records are _items[_head:]
+        self._first = 0  # absolute position of _items[_head]
+        self._index: dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._items) - self._head
+
+    def append(self, op: Operation, raw_id: bytes, ts_micros: int) -> None:
+        self._index[op.id] = self._first + len(self._items) - self._head
+        self._items.append(op)
+        self._ts.append(ts_micros)
+
+    def get(self, i: int) -> Operation:
+        return self._items[self._head + i]
+
+    def ts_micros(self, i: int) -> int:
+        return self._ts[self._head + i]
+
+    def bisect_ts(self, ts_micros: int) -> int:
+        """Position of the first record at or after ts_micros; timestamps must not decrease."""
+        return bisect_left(self._ts, ts_micros, self._head) - self._head
+
+    def amount(self, i: int) -> float:
+        return self._items[self._head + i].amount
+
+    def slice(self, start: int, stop: int) -> list[Operation]:
+        return self._items[self._head + start:self._head + stop]
+
+    def find(self, op_id: str) -> int | None:
+        pos = self._index.get(op_id)
+        return None if pos is None else pos - self._first
+
+    def drop_oldest(self, n: int) -> None:
+        items, index = self._items, self._index
+        for i in range(self._head, self._head + n):
+            del index[items[i].id]
+            items[i] = None  # объект освобождается сразу, не дожидаясь сжатия
+        self._head += n
+        self._first += n
+        if self._head * 2 >= len(items):
+            del items[:self._head]
+            del self._ts[:self._head]
+            self._head = 0
+
+    def clear(self) -> None:
+        self._first += len(self)
+        self._items.clear()
+        del self._ts[:]
+        self._head = 0
+        self._index.clear()
+
+    def columns(self) -> Columns:
+        codes: dict[str, int] = {}
+        live = self._items[self._head:]
+        cols = Columns(
+            codes=[],
+            ids=uuid_bytes("".join(op.id for op in live)),
+            ts=self._ts[self._head:],
+            from_idx=array("H", [codes.setdefault(op.from_currency, len(codes)) for op in live]),
+            to_idx=array("H", [codes.setdefault(op.to_currency, len(codes)) for op in live]),
+            amount=array("d", [op.amount for op in live]),
+            rate=array("d", [op.rate for op in live]),
+            result=array("d", [op.result for op in live]),
+        )
+        cols.codes = list(codes)
+        return cols
+
+    def load(self, cols: Columns) -> None:
+        self.clear()
+        for i in range(len(cols)):
+            op = cols.operation(i)
+            self._index[op.id] = self._first + i
+            self._items.append(op)
+        self._ts = array("q", cols.ts)
+
+
+_EMPTY = -1
+_ID_HALVES = struct.Struct("=QQ")
+
+
+class ColumnarStore:
+    """
+    Operations as parallel typed arrays: 16-byte ids, epoch-microsecond timestamps,
+    interned currency indices and float64 amount/rate/result, about 70-85 bytes
+    per operation with the index. Operation objects are built only on read.
+
+    The id index is an open-addressing hash table (linear probing, load <= 1/2)
+    of positions in an array('q'); ids are random, so their first 8 bytes are the hash.
+
+    drop_oldest only moves the head: evicted rows stay in the arrays and the table
+    (find() skips them) until they make up half of the arrays, then the arrays are
+    compacted and the table rebuilt, O(1) amortized per evicted row.
+    """
     def __init__(self) -> None:
-        self._items: list[Operation] = []
+        self._ids = array("Q")  # две половины id на операцию
+        self._ts = array("q")
+        self._from = array("H")
+        self._to = array("H")
+        self._amount = array("d")
+        self._rate = array("d")
+        self._result = array("d")
+        self._codes: list[str] = []
+        self._code_ids: dict[str, int] = {}
+        self._slots = array("q", [_EMPTY]) * 16
+        self._mask = 15
+        self._head = 0  # первая живая запись в массивах
+
+    def __len__(self) -> int:
+        return len(self._ts) - self._head
+
+    def append(self, op: Operation, raw_id: bytes, ts_micros: int) -> None:
+        pos = len(self._ts)
+        if 2 * (pos + 1) > len(self._slots):
+            self._rehash(2 * len(self._slots))
+        code_ids = self._code_ids
+        from_idx = code_ids.get(op.from_currency)
+        if from_idx is None:
+            from_idx = self._code(op.from_currency)
+        to_idx = code_ids.get(op.to_currency)
+        if to_idx is None:
+            to_idx = self._code(op.to_currency)
+        self._ids.frombytes(raw_id)
+        self._ts.append(ts_micros)
+        self._from.append(from_idx)
+        self._to.append(to_idx)
+        self._amount.append(op.amount)
+        self._rate.append(op.rate)
+        self._result.append(op.result)
+
+        slots, mask = self._slots, self._mask
+        h = self._ids[2 * pos] & mask
+        while slots[h] != _EMPTY:
+            h = (h + 1) & mask
+        slots[h] = pos
+
+    def get(self, i: int) -> Operation:
+        i += self._head
+        codes = self._codes
+        return Operation(
+            uuid_str(self._ids[2 * i:2 * i + 2].tobytes()),
+            micros_to_ts(self._ts[i]),
+            codes[self._from[i]],
+            codes[self._to[i]],
+            self._amount[i],
+            self._rate[i],
+            self._result[i],
+        )
+
+    def ts_micros(self, i: int) -> int:
+        return self._ts[self._head + i]
+
+    def bisect_ts(self, ts_micros: int) -> int:
+        """Position of the first record at or after ts_micros; timestamps must not decrease."""
+        return bisect_left(self._ts, ts_micros, self._head) - self._head
+
+    def amount(self, i: int) -> float:
+        return self._amount[self._head + i]
+
+    def slice(self, start: int, stop: int) -> list[Operation]:
+        get = self.get
+        return [get(i) for i in range(start, min(stop, len(self)))]
+
+    def find(self, op_id: str) -> int | None:
+        try:
+            raw = uuid_bytes(op_id)
+        except ValueError:
+            return None
+        if len(raw) != 16:
+            return None
+        lo, hi = _ID_HALVES.unpack(raw)
+        ids, slots, mask = self._ids, self._slots, self._mask
+        h = lo & mask
+        while True:
+            pos = slots[h]
+            if pos == _EMPTY:
+                return None
+            if ids[2 * pos] == lo and ids[2 * pos + 1] == hi:
+                return pos - self._head if pos >= self._head else None
+            h = (h + 1) & mask
+
+    def drop_oldest(self, n: int) -> None:
+        self._head += n
+        if self._head * 2 >= len(self._ts):
+            self._compact()
+
+    def _compact(self) -> None:
+        head = self._head
+        del self._ids[:2 * head]
+        for col in (self._ts, self._from, self._to, self._amount, self._rate, self._result):
+            del col[:head]
+        self._head = 0
+        size = 16
+        while size < 2 * len(self._ts):
+            size *= 2
+        self._rehash(size)
+
+    def clear(self) -> None:
+        for col in (self._ids, self._ts, self._from, self._to, self._amount, self._rate, self._result):
+            del col[:]
+        self._slots = array("q", [_EMPTY]) * 16
+        self._mask = 15
+        self._head = 0
+
+    def columns(self) -> Columns:
+        """Current columns, without copying: valid until the next change."""
+        if self._head:
+            self._compact()
+        return Columns(
+            codes=list(self._codes),
+            ids=self._ids.tobytes(),
+            ts=self._ts,
+            from_idx=self._from,
+            to_idx=self._to,
+            amount=self._amount,
+            rate=self._rate,
+            result=self._result,
+            slots=self._slots,
+        )
+
+    def load(self, cols: Columns) -> None:
+        """Replaces the contents with `cols`; the arrays are taken over, not copied."""
+        self._codes = list(cols.codes)
+        self._code_ids = {code: i for i, code in enumerate(self._codes)}
+        self._ids = array("Q")
+        self._ids.frombytes(cols.ids)
+        self._ts = cols.ts
+        self._from = cols.from_idx
+        self._to = cols.to_idx
+        self._amount = cols.amount
+        self._rate = cols.rate
+        self._result = cols.result
+        self._head = 0
+        slots = cols.slots
+        if slots is not None and len(slots) >= 2 * len(cols) and len(slots) & (len(slots) - 1) == 0:
+            # индекс из снимка: не нужно заново хешировать миллионы id
+            self._slots = slots
+            self._mask = len(slots) - 1
+        else:
+            size = 16
+            while size < 2 * len(cols):
+                size *= 2
+            self._rehash(size)
+
+    def _code(self, code: str) -> int:
+        idx = self._code_ids[code] = len(self._codes)
+        self._codes.append(code)
+        return idx
+
+    def _rehash(self, size: int) -> None:
+        slots = self._slots = array("q", [_EMPTY]) * size
+        mask = self._mask = size - 1
+        ids = self._ids
+        for pos in range(len(self._ts)):
+            h = ids[2 * pos] & mask
+            while slots[h] != _EMPTY:
+                h = (h + 1) & mask
+            slots[h] = pos
+
+
+STORAGES = {"list": ListStore, "columnar": ColumnarStore}
+
+
+class Subscription:
+    """
+    New operations for one subscriber (see OperationLog.subscribe), in the order they were added.
+
+    The buffer holds at most max_pending operations. A subscriber that falls further behind
+    is dropped: the buffer is freed and get() raises SubscriberDroppedError, so a slow reader
+    never blocks add() and never makes memory grow.
+    last_id: id of the newest operation when the subscription started (None if the log was empty);
+    everything after it comes through get().
+    """
+    def __init__(self, max_pending: int, last_id: str | None) -> None:
+        self.max_pending = max_pending
+        self.last_id = last_id
+        self._pending: deque[Operation] = deque()
+        self._cond = threading.Condition(threading.Lock())
+        self._error: SubscriptionClosedError | None = None
+
+    def _push(self, ops: list[Operation]) -> bool:
+        """Called by the log with its lock held; False once the subscriber is dropped or closed."""
+        with self._cond:
+            if self._error is not None:
+                return False
+            if len(self._pending) + len(ops) > self.max_pending:
+                self._close(SubscriberDroppedError(f"subscriber is more than {self.max_pending} operations behind"))
+                return False
+            self._pending.extend(ops)
+            self._cond.notify()
+            return True
+
+    def _close(self, error: SubscriptionClosedError) -> None:
+        # вызывается с захваченным _cond
+        self._error = error
+        self._pending.clear()
+        self._cond.notify_all()
+
+    def close(self) -> None:
+        with self._cond:
+            if self._error is None:
+                self._close(SubscriptionClosedError("subscription closed"))
+
+    def get(self, timeout: float | None = None) -> list[Operation]:
+        """
+        All pending operations, waiting up to `timeout` seconds for at least one ([] on timeout).
+        Raises SubscriberDroppedError / SubscriptionClosedError once the subscription is over.
+        """
+        with self._cond:
+            if not self._pending and self._error is None:
+                self._cond.wait(timeout)
+            if self._error is not None:
+                raise self._error
+            items = list(self._pending)
+            self._pending.clear()
+            return items
+
+
+def _build_postings(cols: Columns, base: int) -> dict[tuple[str, str], array]:
+    """Positions of every record of `cols` (the first one at `base`) grouped by currency pair."""
+    by_idx: dict[tuple[int, int], array] = {}
+    for pos, key in enumerate(zip(cols.from_idx, cols.to_idx), base):
+        positions = by_idx.get(key)
+        if positions is None:
+            positions = by_idx[key] = array("q")
+        positions.append(pos)
+    codes = cols.codes
+    return {(codes[f], codes[t]): positions for (f, t), positions in by_idx.items()}
+
+
+class OperationLog:
+    """
+    Operation history. Thread-safe: the server calls it from several request threads at once.
+
+    storage: "list" (Operation objects) or "columnar" (typed arrays, see ColumnarStore).
+    With a journal the history survives restarts; max_records / max_age (seconds) evict
+    the oldest records. query() filters by pair and time window through indexes kept on
+    add, aggregates() and subscribe() serve per pair totals and the stream of new operations.
+    """
+    def __init__(
+        self,
+        journal: Journal | None = None,
+        storage: str = "list",
+        max_records: int | None = None,
+        max_age: float | None = None,
+    ) -> None:
+        try:
+            self._store: ListStore | ColumnarStore = STORAGES[storage]()
+        except KeyError:
+            raise ValueError(f"Unknown storage: {storage!r}, expected one of {sorted(STORAGES)}") from None
+        if max_records is not None and max_records < 1:
+            raise ValueError("max_records must be >= 1")
+        if max_age is not None and max_age <= 0:
+            raise ValueError("max_age must be > 0")
+        self._max_records = max_records
+        self._max_age_us = None if max_age is None else round(max_age * 1_000_000)
+        self._lock = threading.Lock()
+        # случайное начало: версии разных запусков (и ETag по ним) не совпадают
+        self._version = int.from_bytes(os.urandom(4), "big") << 32
+        self._journal = journal
+        if journal is not None:
+            journal.recover(self._store, lambda store: self._excess(store, time.time_ns() // 1000))
+        self._base = 0  # абсолютная позиция записи, которая в хранилище сейчас первая
+        self._stale = 0  # позиций вытесненных записей в списках пар
+        # пара -> абсолютные позиции записей, устаревшие обрезает _trim_postings
+        self._postings: dict[tuple[str, str], array] = {}
+        self._last_ts = 0  # ts не убывает, поэтому по колонке ts можно искать bisect
+        self._subscribers: list[Subscription] = []
+        self._evict(time.time_ns() // 1000)
+        self._aggregates = Aggregates()
+        if len(self._store):
+            cols = self._store.columns()
+            self._aggregates.add_columns(cols)
+            self._postings = _build_postings(cols, self._base)
+            self._last_ts = max(cols.ts)
+
+    def _excess(self, store: ListStore | ColumnarStore, now_micros: int) -> int:
+        """Number of the oldest records in `store` over max_records or older than max_age."""
+        n = 0
+        if self._max_records is not None and len(store) > self._max_records:
+            n = len(store) - self._max_records
+        if self._max_age_us is not None:
+            oldest_kept = now_micros - self._max_age_us
+            size = len(store)
+            while n < size and store.ts_micros(n) < oldest_kept:
+                n += 1
+        return n
+
+    def _evict(self, now_micros: int) -> None:
+        """Drops records over max_records or older than max_age; call with the lock held."""
+        store = self._store
+        n = self._excess(store, now_micros)
+        if n:
+            store.drop_oldest(n)
+            if self._journal is not None:
+                self._journal.append_drop(n)
+            self._base += n
+            self._stale += n
+            if self._stale > max(len(store), 1024):
+                self._trim_postings()
+            self._version += 1
+
+    def _trim_postings(self) -> None:
+        """Removes positions of evicted records from the posting lists, O(pairs + stale)."""
+        base = self._base
+        for pair, positions in list(self._postings.items()):
+            del positions[:bisect_left(positions, base)]
+            if not positions:
+                del self._postings[pair]
+        self._stale = 0
+
+    def _post(self, from_currency: str, to_currency: str) -> None:
+        """Adds the record just appended to its pair's posting list; call with the lock held."""
+        positions = self._postings.get((from_currency, to_currency))
+        if positions is None:
+            positions = self._postings[(from_currency, to_currency)] = array("q")
+        positions.append(self._base + len(self._store) - 1)
+
+    def _expire(self) -> None:
+        # по возрасту записи устаревают и без новых add
+        if self._max_age_us is not None:
+            self._evict(time.time_ns() // 1000)
 
     def add(self, from_currency: str, to_currency: str, amount: float, rate: float, result: float) -> Operation:
+        raw_id = new_operation_id()
+        ts_micros = time.time_ns() // 1000
         op = Operation(
-            id=str(uuid4()),
-            ts=datetime.now(timezone.utc).isoformat(),
+            id=uuid_str(raw_id),
+            ts=micros_to_ts(ts_micros),
             from_currency=from_currency,
             to_currency=to_currency,
             amount=float(amount),
             rate=float(rate),
             result=float(result),
         )
-        self._items.append(op)
+        with self._lock:
+            if ts_micros < self._last_ts:
+                # время взято до блокировки: другой поток мог успеть записать операцию позже
+                ts_micros = self._last_ts
+                op = replace(op, ts=micros_to_ts(ts_micros))
+            self._last_ts = ts_micros
+            self._store.append(op, raw_id, ts_micros)
+            self._post(op.from_currency, op.to_currency)
+            self._aggregates.add(op.from_currency, op.to_currency, op.amount, op.rate, op.result, ts_micros)
+            if self._subscribers:
+                self._publish([op])
+            self._version += 1
+            # в журнале вытеснение идёт после добавления, как и в памяти
+            if self._journal is not None:
+                seq = self._journal.append(op)
+            self._evict(ts_micros)
+        if self._journal is not None:
+            self._journal.commit(seq)
         return op
 
+    def add_many(self, rows: Iterable[tuple[str, str, float, float, float]]) -> list[Operation]:
+        """
+        Appends several operations at once: rows of (from_currency, to_currency, amount, rate, result).
+        The whole batch becomes visible atomically.
+        """
+        ts_micros = time.time_ns() // 1000
+        ts = micros_to_ts(ts_micros)
+        records = []
+        for from_currency, to_currency, amount, rate, result in rows:
+            raw_id = new_operation_id()
+            op = Operation(
+                id=uuid_str(raw_id),
+                ts=ts,
+                from_currency=from_currency,
+                to_currency=to_currency,
+                amount=float(amount),
+                rate=float(rate),
+                result=float(result),
+            )
+            records.append((op, raw_id))
+        with self._lock:
+            if ts_micros < self._last_ts:
+                ts_micros = self._last_ts
+                ts = micros_to_ts(ts_micros)
+                records = [(replace(op, ts=ts), raw_id) for op, raw_id in records]
+            self._last_ts = ts_micros
+            add_aggregate = self._aggregates.add
+            post = self._post
+            for op, raw_id in records:
+                self._store.append(op, raw_id, ts_micros)
+                post(op.from_currency, op.to_currency)
+                add_aggregate(op.from_currency, op.to_currency, op.amount, op.rate, op.result, ts_micros)
+            ops = [op for op, _ in records]
+            if self._subscribers and ops:
+                self._publish(ops)
+            self._version += 1
+            if self._journal is not None:
+                seq = self._journal.append_many(ops)
+            self._evict(ts_micros)
+        if self._journal is not None:
+            self._journal.commit(seq)
+        return ops
+
+    def get(self, op_id: str) -> Operation | None:
+        """Operation by id, or None if there is no such operation."""
+        with self._lock:
+            self._expire()
+            i = self._store.find(op_id)
+            if i is None:
+                return None
+            return self._store.get(i)
+
     def list(self, limit: int | None = None, offset: int = 0) -> list[Operation]:
+        items, _, _ = self.page(limit=limit, offset=offset)
+        return items
+
+    def page(
+        self, limit: int | None = None, offset: int = 0, after: str | None = None
+    ) -> tuple[list[Operation], str | None, int]:
+        """
+        One page of the history: (items, next cursor, total count), taken atomically.
+        The page starts right after the operation with id `after` when given,
+        otherwise at `offset`. Only the page itself is copied.
+        The next cursor is the id of the last returned item if more items follow, else None.
+        """
         if offset < 0:
             offset = 0
-        items = self._items[offset:]
-        if limit is None:
-            return list(items)
-        if limit < 0:
-            return []
-        return list(items[:limit])
+        with self._lock:
+            self._expire()
+            total = len(self._store)
+            if after is not None:
+                i = self._store.find(after)
+                if i is None:
+                    raise UnknownCursorError(f"Unknown cursor: {after}")
+                offset = i + 1
+
+            if limit is None:
+                end = total
+            elif limit < 0:
+                end = offset
+            else:
+                end = min(offset + limit, total)
+
+            items = self._store.slice(offset, end)
+
+        next_cursor = items[-1].id if items and end < total else None
+        return items, next_cursor, total
+
+    def query(
+        self,
+        from_currency: str | None = None,
+        to_currency: str | None = None,
+        since: int | None = None,
+        until: int | None = None,
+        min_amount: float | None = None,
+        limit: int | None = None,
+        offset: int = 0,
+        after: str | None = None,
+    ) -> tuple[list[Operation], str | None, int]:
+        """
+        Like page(), over the operations that match every given filter: pair (from/to,
+        either or both), since <= ts < until (epoch microseconds), amount >= min_amount.
+        The total is the number of matching operations; offset and `after` move within them.
+
+        Candidates come from the posting lists of the matching pairs (all records without
+        a pair filter), cut to the time window by bisect, so the cost depends on the
+        matching rows, not on the size of the log. min_amount has no index: it is checked
+        on the candidates, and then the total costs a pass over them.
+        """
+        offset = max(offset, 0)
+        with self._lock:
+            self._expire()
+            store, base = self._store, self._base
+            lo = 0 if since is None else store.bisect_ts(since)
+            hi = len(store) if until is None else store.bisect_ts(until)
+            start = lo
+            if after is not None:
+                i = store.find(after)
+                if i is None:
+                    raise UnknownCursorError(f"Unknown cursor: {after}")
+                start = max(lo, i + 1)
+
+            # отсортированные последовательности абсолютных позиций-кандидатов
+            if from_currency is None and to_currency is None:
+                sources = [range(base, base + len(store))]
+            else:
+                sources = [
+                    positions
+                    for (f, t), positions in self._postings.items()
+                    if from_currency in (None, f) and to_currency in (None, t)
+                ]
+            runs = []
+            total = 0
+            for positions in sources:
+                a = bisect_left(positions, base + lo)
+                b = bisect_left(positions, base + hi)
+                if a < b:
+                    runs.append((positions, bisect_left(positions, base + start, a, b), b))
+                    total += b - a
+            stop = None if limit is None else offset + max(limit, 0)
+
+            if min_amount is None and len(runs) <= 1:
+                # один отсортированный список: страница берётся по индексам, без перебора
+                positions, first, end = runs[0] if runs else ((), 0, 0)
+                last = end if stop is None else min(first + stop, end)
+                page = [positions[k] - base for k in range(min(first + offset, last), last)]
+                more = last < end
+            else:
+                amount = store.amount
+                if min_amount is not None:
+                    total = sum(
+                        1
+                        for positions, _, end in runs
+                        for k in range(bisect_left(positions, base + lo), end)
+                        if amount(positions[k] - base) >= min_amount
+                    )
+                merged = heapq.merge(*(map(positions.__getitem__, range(a, b)) for positions, a, b in runs))
+                matches = (p - base for p in merged if min_amount is None or amount(p - base) >= min_amount)
+                page = []
+                more = False
+                for n, p in enumerate(matches):
+                    if stop is not None and n >= stop:
+                        more = True
+                        break
+                    if n >= offset:
+                        page.append(p)
+
+            items = [store.get(p) for p in page]
+        return items, (items[-1].id if items and more else None), total
+
+    def _publish(self, ops: list[Operation]) -> None:
+        # отставшие подписчики отключаются здесь же, add их не ждёт
+        self._subscribers = [sub for sub in self._subscribers if sub._push(ops)]
+
+    def subscribe(self, max_pending: int = 1000) -> Subscription:
+        """
+        Starts receiving operations added from now on; see Subscription. Each add costs
+        O(subscribers) more. Call unsubscribe() (or close the Subscription) when done.
+        """
+        if max_pending < 1:
+            raise ValueError("max_pending must be >= 1")
+        with self._lock:
+            store = self._store
+            sub = Subscription(max_pending, store.get(len(store) - 1).id if len(store) else None)
+            self._subscribers.append(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscription) -> None:
+        with self._lock:
+            if sub in self._subscribers:
+                self._subscribers.remove(sub)
+        sub.close()
+
+    def version(self) -> int:
+        """
+        Changes on every add, add_many and clear. Two equal values mean the history
+        did not change in between. Starts at a random point in each process.
+        """
+        with self._lock:
+            self._expire()
+            return self._version
+
+    def aggregates(self, bucket: str | None = None) -> list[dict]:
+        """
+        Per pair totals, or with bucket ("minute", "hour", "day") the same per time bucket.
+        Costs O(pairs x buckets), independent of the history size.
+        """
+        if bucket is not None and bucket not in BUCKETS:
+            raise ValueError(f"bucket must be one of: {', '.join(BUCKETS)}")
+        with self._lock:
+            if bucket is None:
+                return self._aggregates.totals()
+            return self._aggregates.buckets(bucket)
 
     def count(self) -> int:
-        return len(self._items)
+        with self._lock:
+            self._expire()
+            return len(self._store)
 
-    def clear(self) -> None:
-        self._items.clear()
+    def clear(self) -> int:
+        """Removes all operations and returns how many were removed."""
+        with self._lock:
+            deleted = len(self._store)
+            self._store.clear()
+            self._aggregates.clear()
+            self._postings.clear()
+            self._base += deleted
+            self._stale = 0
+            self._version += 1
+            if self._journal is not None:
+                seq = self._journal.append_clear()
+        if self._journal is not None:
+            self._journal.commit(seq)
+        return deleted
+
+    def close(self) -> None:
+        """Ends all subscriptions and writes out everything still queued for the journal."""
+        with self._lock:
+            subscribers, self._subscribers = self._subscribers, []
+        for sub in subscribers:
+            sub.close()
+        if self._journal is not None:
+            self._journal.close()
+
+
+def iter_pages(log: OperationLog, after: str | None = None, page_size: int = 1000) -> Iterator[list[Operation]]:
+    """
+    Walks the whole history (from the start or right after `after`) page by page with a cursor,
+    so only one page is held at a time. Operations added during the walk are included;
+    if the cursor is evicted or cleared meanwhile, the walk goes on from the oldest remaining one.
+    Uses only OperationLog.page, so it works with a log in another process too.
+    """
+    while True:
+        try:
+            items, next_cursor, _ = log.page(limit=page_size, after=after)
+        except UnknownCursorError:
+            # курсор вытеснен или удалён очисткой: всё, что осталось, добавлено после него
+            after = None
+            continue
+        if items:
+            yield items
+        if next_cursor is None:
+            return
+        after = next_cursor
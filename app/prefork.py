@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+import multiprocessing as mp
+import os
+import signal
+import socket
+from multiprocessing.managers import BaseManager
+
+from app.journal import Journal
+from app.operations import OperationLog
+from app.server import AppState, make_server
+
+# методы OperationLog, которые вызывают обработчики запросов
+LOG_METHODS = ("add", "add_many", "get", "page", "query", "list", "aggregates", "count", "clear", "version", "close")
+
+# единственный экземпляр истории, живёт в процессе менеджера
+_shared_log: OperationLog | None = None
+
+
+def _create_log(
+    journal_dir: str | None, journal_sync: bool, storage: str, max_records: int | None, max_age: float | None
+) -> None:
+    global _shared_log
+    journal = Journal(journal_dir, synchronous=journal_sync) if journal_dir else None
+    _shared_log = OperationLog(journal, storage=storage, max_records=max_records, max_age=max_age)
+
+
+def _get_log() -> OperationLog:
+    return _shared_log
+
+
+class LogManager(BaseManager):
+    """
+    Runs one OperationLog in a separate process; workers talk to it through a proxy.
+    It is the only writer of the history (and of the journal), so every worker
+    sees the same operations, versions and ETags.
+    """
+
+
+LogManager.register("log", callable=_get_log, exposed=LOG_METHODS)
+
+
+def start_log_manager(
+    journal_dir: str | None = None,
+    journal_sync: bool = True,
+    storage: str = "list",
+    max_records: int | None = None,
+    max_age: float | None = None,
+) -> tuple[LogManager, OperationLog]:
+    """Starts the log process; returns the manager and a proxy with the OperationLog methods."""
+    manager = LogManager(ctx=mp.get_context("fork"))
+    manager.start(_create_log, (journal_dir, journal_sync, storage, max_records, max_age))
+    return manager, manager.log()
+
+
+def _serve_worker(
+    state: AppState,
+    host: str,
+    port: int,
+    mode: str,
+    workers: int,
+    watch_rates: float,
+    idle_timeout: float,
+    admission: tuple[int, int | None, float],
+) -> None:
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    # потоки не переживают fork, поэтому наблюдатель за курсами у каждого процесса свой
+    if watch_rates > 0:
+        state.start_watcher(watch_rates)
+    max_in_flight, max_queue, queue_timeout = admission
+    server = make_server(
+        state, host, port, mode=mode, workers=workers, reuse_port=True, idle_timeout=idle_timeout,
+        max_in_flight=max_in_flight, max_queue=max_queue, queue_timeout=queue_timeout,
+    )
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if state.watcher is not None:
+            state.watcher.stop()
+
+
+def run_prefork_server(
+    host: str = "0.0.0.0",
+    port: int = 8008,
+    rates_path: str = "data/rates.csv",
+    processes: int = 2,
+    mode: str = "single",
+    workers: int = 8,
+    journal_dir: str | None = None,
+    journal_sync: bool = True,
+    storage: str = "list",
+    watch_rates: float = 0.0,
+    rates_history_path: str | None = None,
+    rates_cache_path: str | None = None,
+    max_records: int | None = None,
+    max_age: float | None = None,
+    idle_timeout: float = 5.0,
+    engine: str = "float",
+    rounding: str = "half_up",
+    max_in_flight: int = 0,
+    max_queue: int | None = None,
+    queue_timeout: float = 0.5,
+) -> None:
+    """
+    Pre-fork server: `processes` worker processes, each binding host:port with SO_REUSEPORT,
+    so the kernel spreads connections between them and they run on different cores.
+
+    Rates are parsed once before the fork and shared copy-on-write. The history lives in a
+    separate log process (LogManager); each call from a worker is an IPC round trip.
+    /admin/rates/reload and /metrics are per worker; use --watch-rates to keep rates in step.
+    Admission limits (max_in_flight, ...) apply to each worker separately.
+    """
+    if processes < 1:
+        raise ValueError("processes must be >= 1")
+    if not hasattr(socket, "SO_REUSEPORT") or "fork" not in mp.get_all_start_methods():
+        raise RuntimeError("pre-fork mode needs fork() and SO_REUSEPORT")
+    if port == 0:
+        raise ValueError("pre-fork mode needs a fixed port: every worker binds it separately")
+
+    # SIGTERM как Ctrl+C: остановить воркеров и закрыть журнал, а не бросить их
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    manager, log = start_log_manager(journal_dir, journal_sync, storage, max_records, max_age)
+    state = AppState(
+        rates_path, rates_history_path=rates_history_path, rates_cache_path=rates_cache_path, log=log,
+        engine=engine, rounding=rounding,
+    )
+
+    ctx = mp.get_context("fork")
+    admission = (max_in_flight, max_queue, queue_timeout)
+    worker_args = (state, host, port, mode, workers, watch_rates, idle_timeout, admission)
+    procs = [ctx.Process(target=_serve_worker, args=worker_args, daemon=True) for _ in range(processes)]
+    for proc in procs:
+        proc.start()
+    print(f"Server running on http://{host}:{port} (mode={mode}, processes={processes}, pid={os.getpid()})")
+    try:
+        for proc in procs:
+            proc.join()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for proc in procs:
+            proc.terminate()
+        for proc in procs:
+            proc.join()
+        log.close()
+        manager.shutdown()
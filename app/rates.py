@@ -1,7 +1,21 @@
 from __future__ import annotations
 
 import csv
+import hashlib
+import mmap
+import os
+import struct
+import sys
+import threading
+import zlib
+from array import array
+from bisect import bisect_left, bisect_right
+from collections.abc import Callable
 from dataclasses import dataclass
+from datetime import UTC, date, datetime
+from functools import cached_property
+from itertools import islice, repeat
+from operator import add, and_, ge
 from pathlib import Path
 
 
@@ -17,6 +31,19 @@ class InvalidRatesFileError(RatesError):
     pass
 
 
+class RateNotAvailableError(UnknownCurrencyError):
+    """The currency is known, but has no rate on the requested date."""
+
+
+def normalize_code(code: str) -> str:
+    if not isinstance(code, str):
+        raise UnknownCurrencyError("Currency code must be a string")
+    code = code.strip().upper()
+    if not code:
+        raise UnknownCurrencyError("Currency code is empty")
+    return code
+
+
 @dataclass(frozen=True)
 class Rates:
     """
@@ -26,12 +53,7 @@ class Rates:
     rate_to_rub: dict[str, float]
 
     def normalize(self, code: str) -> str:
-        if not isinstance(code, str):
-            raise UnknownCurrencyError("Currency code must be a string")
-        code = code.strip().upper()
-        if not code:
-            raise UnknownCurrencyError("Currency code is empty")
-        return code
+        return normalize_code(code)
 
     def get_rate_to_rub(self, code: str) -> float:
         code = self.normalize(code)
@@ -40,35 +62,115 @@ class Rates:
         except KeyError as e:
             raise UnknownCurrencyError(f"Unknown currency: {code}") from e
 
+    @cached_property
+    def table(self) -> RateTable:
+        """Cross-rate table for this snapshot, built on first use."""
+        return RateTable(self.rate_to_rub)
+
+
+class RateTable:
+    """
+    Dense cross-rate table: currencies get integer ids (codes[i]) and
+    pair(i, j) returns (from, to, rate, rate rounded to 6 digits)
+    for 1 codes[i] in codes[j] with a single indexed read.
+    Rows are filled lazily, so the table costs O(n) per used source currency.
+    """
+    def __init__(self, rate_to_rub: dict[str, float]) -> None:
+        self.codes: tuple[str, ...] = tuple(sys.intern(code) for code in rate_to_rub)
+        self.index: dict[str, int] = {code: i for i, code in enumerate(self.codes)}
+        self._to_rub: tuple[float, ...] = tuple(rate_to_rub.values())
+        self._rows: list[list[tuple[str, str, float, float]] | None] = [None] * len(self.codes)
+
+    def id_of(self, code: str) -> int:
+        """Id of an already normalized code."""
+        try:
+            return self.index[code]
+        except KeyError as e:
+            raise UnknownCurrencyError(f"Unknown currency: {code}") from e
+
+    def pair(self, from_id: int, to_id: int) -> tuple[str, str, float, float]:
+        row = self._rows[from_id]
+        if row is None:
+            row = self._rows[from_id] = self._build_row(from_id)
+        return row[to_id]
+
+    def _build_row(self, from_id: int) -> list[tuple[str, str, float, float]]:
+        f = self.codes[from_id]
+        rate_from = self._to_rub[from_id]
+        row = []
+        for t, rate_to in zip(self.codes, self._to_rub):
+            rate = rate_from / rate_to
+            row.append((f, t, rate, round(rate, 6)))
+        return row
+
 
 class CsvRatesLoader:
     """
     Loads rates from CSV with header: currency,rate_to_rub
+
+    With cache_path, a successful parse is also saved there as a binary snapshot
+    (see write_rates_cache) and later loads read the snapshot instead of parsing
+    the CSV while the CSV is unchanged.
     """
-    def __init__(self, csv_path: str | Path) -> None:
+    def __init__(self, csv_path: str | Path, cache_path: str | Path | None = None) -> None:
         self.csv_path = Path(csv_path)
+        self.cache_path = Path(cache_path) if cache_path is not None else None
 
     def load(self) -> Rates:
+        """
+        Parses the file (or reads the cache). Every failure, including bytes that are not
+        UTF-8 and read errors while the file is being replaced, is an InvalidRatesFileError.
+        """
+        try:
+            return self._load()
+        except UnicodeDecodeError as e:
+            raise InvalidRatesFileError(f"Rates file is not valid UTF-8: {self.csv_path}") from e
+        except OSError as e:
+            raise InvalidRatesFileError(f"Cannot read rates file {self.csv_path}: {e}") from e
+
+    def _load(self) -> Rates:
         if not self.csv_path.exists() or not self.csv_path.is_file():
             raise InvalidRatesFileError(f"Rates file not found: {self.csv_path}")
 
+        if self.cache_path is None:
+            return Rates(rate_to_rub=self._parse())
+
+        stat = self.csv_path.stat()
+        rate_to_rub = read_rates_cache(self.cache_path, self.csv_path, stat)
+        if rate_to_rub is None:
+            # хеш до разбора: если файл поменяют во время разбора, кэш просто не совпадёт
+            digest = _file_digest(self.csv_path)
+            rate_to_rub = self._parse()
+            try:
+                write_rates_cache(self.cache_path, stat, digest, rate_to_rub)
+            except OSError:
+                pass  # кэш только ускоряет загрузку, без него всё работает
+        return Rates(rate_to_rub=rate_to_rub)
+
+    def _parse(self) -> dict[str, float]:
         rate_to_rub: dict[str, float] = {}
 
         with self.csv_path.open("r", encoding="utf-8", newline="") as f:
-            reader = csv.DictReader(f)
-            if reader.fieldnames is None:
+            reader = csv.reader(f)
+            fieldnames = next(reader, None)
+            if fieldnames is None:
                 raise InvalidRatesFileError("CSV has no header row")
 
             required = {"currency", "rate_to_rub"}
-            if set(name.strip() for name in reader.fieldnames) != required:
+            names = [name.strip() for name in fieldnames]
+            if set(names) != required:
                 # строгая проверка: ровно 2 колонки
                 raise InvalidRatesFileError(
                     f"CSV header must be exactly: {sorted(required)}"
                 )
+            code_col = names.index("currency")
+            rate_col = names.index("rate_to_rub")
 
-            for idx, row in enumerate(reader, start=2):  # start=2 because header is line 1
-                raw_code = (row.get("currency") or "").strip().upper()
-                raw_rate = (row.get("rate_to_rub") or "").strip()
+            # пустые строки пропускаются и не считаются, как было с DictReader
+            rows = (row for row in reader if row)
+            for idx, row in enumerate(rows, start=2):  # start=2 because header is line 1
+                raw_code = row[code_col].strip().upper() if len(row) > code_col else ""
+                raw_rate = row[rate_col].strip() if len(row) > rate_col else ""
 
                 if not raw_code:
                     raise InvalidRatesFileError(f"Empty currency code at line {idx}")
@@ -89,4 +191,300 @@ class CsvRatesLoader:
         if "RUB" not in rate_to_rub:
             rate_to_rub["RUB"] = 1.0
 
-        return Rates(rate_to_rub=rate_to_rub)
+        return rate_to_rub
+
+
+# magic, csv mtime_ns, csv size, blake2b of the csv, number of currencies
+_CACHE_HEAD = struct.Struct("<8sqQ16sQ")
+_CACHE_MAGIC = b"CCRATES1"
+
+
+def _file_digest(path: Path) -> bytes:
+    with path.open("rb") as f:
+        return hashlib.file_digest(f, lambda: hashlib.blake2b(digest_size=16)).digest()
+
+
+def write_rates_cache(cache_path: Path, stat: os.stat_result, digest: bytes, rate_to_rub: dict[str, float]) -> None:
+    """
+    Saves parsed rates as a binary snapshot keyed by the CSV's mtime, size and content hash.
+    Layout after the header: float64 rates, the codes as one NUL-separated UTF-8 string,
+    crc32 of everything before it. Rates with a NUL inside a code are not cached.
+    """
+    codes = "\0".join(rate_to_rub)
+    if codes.count("\0") != len(rate_to_rub) - 1:
+        return
+    parts = [
+        _CACHE_HEAD.pack(_CACHE_MAGIC, stat.st_mtime_ns, stat.st_size, digest, len(rate_to_rub)),
+        _native(array("d", rate_to_rub.values())),
+        codes.encode("utf-8"),
+    ]
+    crc = 0
+    for part in parts:
+        crc = zlib.crc32(part, crc)
+    parts.append(struct.pack("<I", crc))
+
+    tmp = cache_path.with_name(cache_path.name + ".tmp")
+    with tmp.open("wb") as f:
+        f.writelines(parts)
+    os.replace(tmp, cache_path)
+
+
+def read_rates_cache(cache_path: Path, csv_path: Path, stat: os.stat_result) -> dict[str, float] | None:
+    """
+    Rates from the snapshot if it is intact and was made from this CSV, else None.
+    mtime and size are compared first; if they differ (e.g. the file was copied or touched)
+    the CSV content hash decides.
+    """
+    try:
+        with cache_path.open("rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm, memoryview(mm) as view:
+            return _parse_rates_cache(view, csv_path, stat)
+    except (OSError, ValueError):  # нет файла, пустой файл
+        return None
+
+
+def _parse_rates_cache(view: memoryview, csv_path: Path, stat: os.stat_result) -> dict[str, float] | None:
+    if len(view) < _CACHE_HEAD.size + 4:
+        return None
+    magic, mtime_ns, size, digest, count = _CACHE_HEAD.unpack_from(view)
+    if magic != _CACHE_MAGIC:
+        return None
+    if (mtime_ns, size) != (stat.st_mtime_ns, stat.st_size) and digest != _file_digest(csv_path):
+        return None
+    (crc,) = struct.unpack_from("<I", view, len(view) - 4)
+    if zlib.crc32(view[:-4]) != crc:
+        return None
+
+    pos = _CACHE_HEAD.size
+    rates = array("d")
+    rates.frombytes(view[pos:pos + 8 * count])
+    codes = str(view[pos + 8 * count:-4], "utf-8").split("\0")
+    return dict(zip(codes, _native(rates)))
+
+
+def _native(arr: array) -> array:
+    """Snapshot arrays are little-endian."""
+    if sys.byteorder != "little":  # pragma: no cover
+        arr.byteswap()
+    return arr
+
+
+class RateHistory:
+    """
+    Daily rates to RUB over time. Each currency keeps two parallel arrays sorted by date:
+    day ordinals (date.toordinal()) and rates; the rate on a day is the last one
+    published on or before it, found by binary search.
+    RUB is 1.0 on every day unless the file says otherwise.
+    """
+    def __init__(self, series: dict[str, tuple[array, array]]) -> None:
+        self._series = series
+
+    @property
+    def currencies(self) -> list[str]:
+        return sorted(self._series.keys() | {"RUB"})
+
+    def rate_to_rub(self, code: str, day: date | datetime) -> float:
+        if isinstance(day, datetime):
+            if day.tzinfo is not None:
+                day = day.astimezone(UTC)
+            day = day.date()
+        code = normalize_code(code)
+        try:
+            days, rates = self._series[code]
+        except KeyError as e:
+            if code == "RUB":
+                return 1.0
+            raise UnknownCurrencyError(f"Unknown currency: {code}") from e
+
+        i = bisect_right(days, day.toordinal())
+        if i == 0:
+            raise RateNotAvailableError(f"No rate for {code} on {day.isoformat()}")
+        return rates[i - 1]
+
+
+class RatesWatcher:
+    """
+    Polls a rates CSV and calls on_change(rates) with the new Rates when the file changes
+    (mtime or size). A file that fails to parse is reported in last_error and skipped
+    until it changes again; on_change is not called, so the old rates stay live.
+    """
+    def __init__(
+        self,
+        csv_path: str | Path,
+        on_change: Callable[[Rates], None],
+        interval: float = 1.0,
+        cache_path: str | Path | None = None,
+    ) -> None:
+        self.loader = CsvRatesLoader(csv_path, cache_path=cache_path)
+        self.on_change = on_change
+        self.interval = interval
+        self.last_error: InvalidRatesFileError | None = None
+        self._seen = self._stamp()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def _stamp(self) -> tuple[int, int] | None:
+        try:
+            st = os.stat(self.loader.csv_path)
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def check(self) -> bool:
+        """Reloads the file if it changed since the last check; True if new rates were applied."""
+        stamp = self._stamp()
+        if stamp is None or stamp == self._seen:
+            return False
+        self._seen = stamp
+        try:
+            rates = self.loader.load()
+        except InvalidRatesFileError as e:
+            self.last_error = e
+            return False
+        self.last_error = None
+        self.on_change(rates)
+        return True
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="rates-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.check()
+
+
+# date.max.toordinal() < 2 ** 22
+_DAY_BITS = 22
+_DAY_MASK = (1 << _DAY_BITS) - 1
+
+
+class CsvRateHistoryLoader:
+    """
+    Loads dated rates from CSV with header: date,currency,rate_to_rub
+    (date in ISO format, rows in any order, one rate per currency and day, no quoting).
+
+    Years of daily rates are hundreds of thousands of rows, so the file is split
+    into whole columns and processed with map()/sort at C speed; rows are looked at
+    one by one only to report an error.
+    """
+    HEADER = ("date", "currency", "rate_to_rub")
+
+    def __init__(self, csv_path: str | Path) -> None:
+        self.csv_path = Path(csv_path)
+
+    def load(self) -> RateHistory:
+        if not self.csv_path.exists() or not self.csv_path.is_file():
+            raise InvalidRatesFileError(f"Rates file not found: {self.csv_path}")
+
+        # текстовый режим уже привёл \r\n к \n
+        header, _, body = self.csv_path.read_text(encoding="utf-8").partition("\n")
+        if not header:
+            raise InvalidRatesFileError("CSV has no header row")
+        if tuple(name.strip() for name in header.split(",")) != self.HEADER:
+            raise InvalidRatesFileError(f"CSV header must be exactly: {','.join(self.HEADER)}")
+
+        stripped = body.lstrip("\n")
+        first = 2 + len(body) - len(stripped)
+        body = stripped.rstrip("\n")
+        lines = body.split("\n")
+        numbers: range | list[int] = range(first, first + len(lines))  # номер строки для каждой записи
+        if "\n\n" in body:
+            numbers = [idx for idx, line in zip(numbers, lines) if line]
+            lines = [line for line in lines if line]
+            body = "\n".join(lines)
+        if not body:
+            return RateHistory({})
+        # проверяется каждая строка: короткая и длинная подряд дают верное общее число полей
+        if set(map(str.count, lines, repeat(","))) != {2}:
+            for idx, line in zip(numbers, lines):  # pragma: no branch
+                if line.count(",") != 2:
+                    raise InvalidRatesFileError(f"Expected 3 columns at line {idx}")
+        fields = body.replace("\n", ",").split(",")
+        raw_dates, raw_codes, raw_rates = fields[0::3], fields[1::3], fields[2::3]
+
+        # каждая дата и каждый код повторяются много раз, разбираем их один раз
+        days: dict[str, int] = {}
+        for raw in set(raw_dates):
+            try:
+                days[raw] = date.fromisoformat(raw.strip()).toordinal()
+            except ValueError as e:
+                idx = numbers[raw_dates.index(raw)]
+                raise InvalidRatesFileError(f"Invalid date at line {idx}: {raw!r}") from e
+        codes = {raw: raw.strip().upper() for raw in set(raw_codes)}
+        ids = {code: i for i, code in enumerate(sorted(set(codes.values())))}
+        if "" in ids:
+            raw = next(raw for raw, code in codes.items() if not code)
+            raise InvalidRatesFileError(f"Empty currency code at line {numbers[raw_codes.index(raw)]}")
+
+        try:
+            rates = array("d", map(float, raw_rates))
+        except ValueError:
+            rates = None
+        if rates is None or min(rates) <= 0:
+            for idx, raw in zip(numbers, raw_rates):  # pragma: no branch
+                try:
+                    rate = float(raw)
+                except ValueError as e:
+                    raise InvalidRatesFileError(f"Invalid rate at line {idx}: {raw!r}") from e
+                if rate <= 0:
+                    raise InvalidRatesFileError(f"Rate must be > 0 at line {idx}")
+
+        series = self._periodic_series(raw_dates, raw_codes, rates, days, codes)
+        if series is not None:
+            return RateHistory(series)
+
+        # (валюта, дата) одним небольшим int: такие списки сортируются быстрее всего
+        code_ids = {raw: ids[code] << _DAY_BITS for raw, code in codes.items()}
+        keys = list(map(add, map(code_ids.__getitem__, raw_codes), map(days.__getitem__, raw_dates)))
+        rate_of = dict(zip(keys, rates))
+        if len(rate_of) != len(keys):
+            seen = set()
+            for key, raw in zip(keys, raw_codes):  # pragma: no branch
+                if key in seen:
+                    raise InvalidRatesFileError(f"Duplicate date for {codes[raw]}")
+                seen.add(key)
+        keys.sort()
+
+        series = {}
+        start = 0
+        for code, code_id in ids.items():
+            stop = bisect_left(keys, (code_id + 1) << _DAY_BITS, start)
+            group = keys[start:stop]
+            series[code] = (
+                array("l", map(and_, group, repeat(_DAY_MASK))),
+                array("d", map(rate_of.__getitem__, group)),
+            )
+            start = stop
+
+        return RateHistory(series)
+
+    @staticmethod
+    def _periodic_series(
+        raw_dates: list[str], raw_codes: list[str], rates: array, days: dict[str, int], codes: dict[str, str]
+    ) -> dict[str, tuple[array, array]] | None:
+        """
+        Fast path for the usual export layout: for every date all currencies in the same order,
+        dates ascending. Each currency is then a strided slice of the rate column
+        and all of them share one array of days.
+        Returns None if the file is laid out differently.
+        """
+        k = len(codes)
+        head = raw_codes[:k]
+        if len(set(head)) != k or len(set(codes.values())) != k or raw_codes != head * (len(raw_codes) // k):
+            return None
+        dates = raw_dates[0::k]
+        day_col = array("l", map(days.__getitem__, dates))
+        if any(map(ge, day_col, islice(day_col, 1, None))):
+            return None
+        series = {}
+        for j, raw in enumerate(head):
+            if j and raw_dates[j::k] != dates:
+                return None
+            # даты у всех валют одни и те же, массив дней общий
+            series[codes[raw]] = (day_col, rates[j::k])
+        return series
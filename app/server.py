@@ -1,28 +1,188 @@
 from __future__ import annotations
 
+import argparse
+import csv
+import io
 import json
-from http.server import BaseHTTPRequestHandler, HTTPServer
+import math
+import re
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, HTTPServer, ThreadingHTTPServer
 from urllib.parse import parse_qs, urlparse
 
-from app.converter import CurrencyConverter, InvalidAmountError
-from app.operations import OperationLog
-from app.rates import CsvRatesLoader, InvalidRatesFileError, UnknownCurrencyError
+from app.admission import EXEMPT, HEAVY, NORMAL, AdmissionController
+from app.aggregates import BUCKETS
+from app.converter import ENGINES, CurrencyConverter, InvalidAmountError
+from app.filters import FILTER_PARAMS, operation_filters
+from app.http_cache import ResponseCache, cache_key, etag, etag_matches
+from app.journal import Journal
+from app.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE
+from app.metrics import Metrics
+from app.money import ROUNDING
+from app.operations import (
+    STORAGES,
+    Operation,
+    OperationLog,
+    SubscriberDroppedError,
+    SubscriptionClosedError,
+    UnknownCursorError,
+    iter_pages,
+)
+from app.rates import (
+    CsvRateHistoryLoader,
+    CsvRatesLoader,
+    InvalidRatesFileError,
+    Rates,
+    RatesWatcher,
+    UnknownCurrencyError,
+)
 
+try:
+    import orjson as _orjson
+except ImportError:  # pragma: no cover - optional dependency
+    _orjson = None
 
-def _json_response(handler: BaseHTTPRequestHandler, status: int, payload: object) -> None:
-    data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+
+_LONG_DIGITS = re.compile(rb"[0-9]{19}")
+
+
+class JsonCodec:
+    """
+    Request decoding and response encoding for the handlers.
+
+    loads() uses orjson when it is installed. Whatever orjson rejects is parsed again
+    by the stdlib, so the accepted input and the error messages stay exactly the same
+    (NaN/Infinity, lone surrogates, invalid UTF-8). Bodies with 19+ digit runs go straight
+    to the stdlib: orjson reads integers beyond 64 bits as floats instead of failing.
+
+    dumps() always uses the stdlib encoder, one reused instance instead of a new one per
+    json.dumps(ensure_ascii=False) call. orjson's encoder is not used: it writes no spaces
+    after separators and formats some floats differently (1e16 instead of 1e+16),
+    so its bytes would not match what the API has always returned.
+    """
+    def __init__(self, use_orjson: bool = True) -> None:
+        self._encoder = json.JSONEncoder(ensure_ascii=False)
+        self._fast_loads = _orjson.loads if use_orjson and _orjson is not None else None
+        self.name = "orjson" if self._fast_loads is not None else "json"
+
+    def loads(self, raw: bytes) -> object:
+        """Parses a request body; raises ValueError (JSONDecodeError or UnicodeDecodeError) like json.loads."""
+        if self._fast_loads is not None and _LONG_DIGITS.search(raw) is None:
+            try:
+                return self._fast_loads(raw)
+            except ValueError:
+                pass
+        return json.loads(raw.decode("utf-8"))
+
+    def dumps(self, payload: object) -> str:
+        return self._encoder.encode(payload)
+
+
+CODEC = JsonCodec()
+
+# то же экранирование строк, что у json.dumps(ensure_ascii=False)
+_json_str = json.encoder.encode_basestring
+_INF = float("inf")
+
+
+def _json_float(x: float) -> str:
+    # как json.dumps: repr для конечных чисел, NaN/Infinity для остальных
+    if math.isnan(x):
+        return "NaN"
+    if x == _INF:
+        return "Infinity"
+    if x == -_INF:
+        return "-Infinity"
+    return float.__repr__(x)
+
+
+def _operation_json(op: Operation) -> str:
+    """json.dumps(op.to_dict(), ensure_ascii=False), without building the dict."""
+    return (
+        f'{{"id": {_json_str(op.id)}, "ts": {_json_str(op.ts)}, '
+        f'"from_currency": {_json_str(op.from_currency)}, "to_currency": {_json_str(op.to_currency)}, '
+        f'"amount": {_json_float(op.amount)}, "rate": {_json_float(op.rate)}, "result": {_json_float(op.result)}}}'
+    )
+
+
+def _operation_payload_json(op: Operation) -> str:
+    """The operation as returned by POST: like to_dict, but with "from"/"to" keys."""
+    return (
+        f'{{"id": {_json_str(op.id)}, "ts": {_json_str(op.ts)}, '
+        f'"from": {_json_str(op.from_currency)}, "to": {_json_str(op.to_currency)}, '
+        f'"amount": {_json_float(op.amount)}, "rate": {_json_float(op.rate)}, "result": {_json_float(op.result)}}}'
+    )
+
+
+def _conversion_json(rate: float, result: float, op: Operation) -> str:
+    return f'{{"rate": {_json_float(rate)}, "result": {_json_float(result)}, "operation": {_operation_payload_json(op)}}}'
+
+
+def _page_json(ops: list[Operation], next_cursor: str | None, count: int) -> str:
+    items = ", ".join(map(_operation_json, ops))
+    next_json = "null" if next_cursor is None else _json_str(next_cursor)
+    return f'{{"count": {count}, "items": [{items}], "next": {next_json}}}'
+
+
+_CSV_FIELDS = ("id", "ts", "from_currency", "to_currency", "amount", "rate", "result")
+
+
+def _ndjson_chunk(ops: list[Operation]) -> str:
+    return "".join([_operation_json(op) + "\n" for op in ops])
+
+
+def _csv_chunk(ops: list[Operation]) -> str:
+    buf = io.StringIO()
+    csv.writer(buf, lineterminator="\n").writerows(
+        (op.id, op.ts, op.from_currency, op.to_currency, op.amount, op.rate, op.result) for op in ops
+    )
+    return buf.getvalue()
+
+
+# format -> (Content-Type, первая строка, кодирование страницы)
+EXPORT_FORMATS = {
+    "ndjson": ("application/x-ndjson; charset=utf-8", "", _ndjson_chunk),
+    "csv": ("text/csv; charset=utf-8", ",".join(_CSV_FIELDS) + "\n", _csv_chunk),
+}
+
+
+def _encode(payload: object) -> bytes:
+    return CODEC.dumps(payload).encode("utf-8")
+
+
+def _send_body(
+    handler: BaseHTTPRequestHandler,
+    status: int,
+    data: bytes,
+    etag: str | None = None,
+    content_type: str = "application/json; charset=utf-8",
+) -> None:
     handler.send_response(status)
-    handler.send_header("Content-Type", "application/json; charset=utf-8")
+    handler.send_header("Content-Type", content_type)
     handler.send_header("Content-Length", str(len(data)))
+    if etag is not None:
+        handler.send_header("ETag", etag)
     handler.end_headers()
     handler.wfile.write(data)
 
 
+def _json_response(handler: BaseHTTPRequestHandler, status: int, payload: object) -> None:
+    _send_body(handler, status, _encode(payload))
+
+
+# ответ /health не меняется, кодируем один раз
+_HEALTH_BODY = _encode({"status": "ok"})
+
+
 def _error(handler: BaseHTTPRequestHandler, status: int, error: str, message: str) -> None:
     _json_response(handler, status, {"error": error, "message": message})
 
 
-def _read_json(handler: BaseHTTPRequestHandler) -> dict:
+def _read_json_value(handler: BaseHTTPRequestHandler) -> object:
     length_str = handler.headers.get("Content-Length", "0")
     try:
         length = int(length_str)
@@ -30,37 +190,274 @@ def _read_json(handler: BaseHTTPRequestHandler) -> dict:
         raise ValueError("Invalid Content-Length")
 
     raw = handler.rfile.read(length) if length > 0 else b""
+    handler._body_left = 0
     try:
-        obj = json.loads(raw.decode("utf-8")) if raw else None
+        obj = CODEC.loads(raw) if raw else None
     except json.JSONDecodeError as e:
         raise ValueError("Invalid JSON") from e
 
+    return obj
+
+
+def _read_json(handler: BaseHTTPRequestHandler) -> dict:
+    obj = _read_json_value(handler)
     if not isinstance(obj, dict):
         raise ValueError("JSON body must be an object")
 
     return obj
 
 
+def _parse_as_of(value: object) -> datetime:
+    """ISO date or datetime from the as_of field; ValueError if it is neither."""
+    try:
+        return datetime.fromisoformat(value)
+    except (TypeError, ValueError):  # TypeError: не строка
+        raise ValueError(f"Invalid as_of: {value!r}") from None
+
+
+# максимум элементов в одном POST /operations/batch
+MAX_BATCH_ITEMS = 1000
+
+
+_ROUTES = frozenset((
+    "/health", "/metrics", "/operations", "/operations/batch", "/operations/stream", "/aggregates", "/admin/rates/reload",
+))
+
+
+def _route(target: str) -> str:
+    """Metrics label for a request target: the route template, never the raw path."""
+    path = target.partition("?")[0]
+    if path in _ROUTES:
+        return path
+    if path.startswith("/operations/"):
+        return "/operations/{id}"
+    return "other"
+
+
+def _priority(method: str, target: str) -> int:
+    """Admission class of a request: health and metrics are never held back, history scans go last."""
+    path = target.partition("?")[0]
+    if path in ("/health", "/metrics", "/operations/stream"):
+        return EXEMPT  # у потоков свой лимит, max_streams
+    if method == "GET" and path == "/operations":
+        return HEAVY
+    return NORMAL
+
+
 class AppState:
-    def __init__(self, rates_path: str) -> None:
-        rates = CsvRatesLoader(rates_path).load()
-        self.converter = CurrencyConverter(rates)
-        self.log = OperationLog()
+    def __init__(
+        self,
+        rates_path: str,
+        journal_dir: str | None = None,
+        journal_sync: bool = True,
+        storage: str = "list",
+        watch_rates: float = 0.0,
+        rates_history_path: str | None = None,
+        rates_cache_path: str | None = None,
+        log: OperationLog | None = None,
+        max_records: int | None = None,
+        max_age: float | None = None,
+        engine: str = "float",
+        rounding: str = "half_up",
+    ) -> None:
+        """
+        log: an existing (possibly shared) history; journal and retention options are then ignored.
+        engine, rounding: arithmetic of conversions, see CurrencyConverter.
+        """
+        self.rates_path = rates_path
+        self.rates_cache_path = rates_cache_path
+        rates = CsvRatesLoader(rates_path, cache_path=rates_cache_path).load()
+        history = CsvRateHistoryLoader(rates_history_path).load() if rates_history_path else None
+        self.converter = CurrencyConverter(rates, history, engine=engine, rounding=rounding)
+        if log is None:
+            journal = Journal(journal_dir, synchronous=journal_sync) if journal_dir else None
+            log = OperationLog(journal, storage=storage, max_records=max_records, max_age=max_age)
+        self.log = log
+        self.responses = ResponseCache()
+        self.metrics = Metrics()
+        self.metrics.gauge("operations_log_size", "Operations in the history.", self.log.count)
+        self.metrics.gauge("rates_currencies", "Currencies in the live rates.", self._currencies)
+        self.streams = 0  # открытых GET /operations/stream
+        self._streams_lock = threading.Lock()
+        self.metrics.gauge("stream_subscribers", "Open GET /operations/stream connections.", lambda: self.streams)
+        self.watcher: RatesWatcher | None = None
+        if watch_rates > 0:
+            self.start_watcher(watch_rates)
+
+    def start_watcher(self, interval: float) -> None:
+        self.watcher = RatesWatcher(
+            self.rates_path, self.converter.set_rates, interval=interval, cache_path=self.rates_cache_path
+        )
+        self.watcher.start()
+
+    def _currencies(self) -> int:
+        return len(self.converter.rates.rate_to_rub)
+
+    def reload_rates(self) -> Rates:
+        """
+        Parses the rates file again and swaps it in.
+        Raises InvalidRatesFileError and keeps the current rates if the file is broken.
+        """
+        rates = CsvRatesLoader(self.rates_path, cache_path=self.rates_cache_path).load()
+        self.converter.set_rates(rates)
+        return rates
+
+    def open_stream(self, limit: int) -> bool:
+        """Takes one of `limit` stream slots; False when all are taken."""
+        with self._streams_lock:
+            if self.streams >= limit:
+                return False
+            self.streams += 1
+            return True
+
+    def close_stream(self) -> None:
+        with self._streams_lock:
+            self.streams -= 1
+
+    def close(self) -> None:
+        if self.watcher is not None:
+            self.watcher.stop()
+        self.log.close()
+
+
+# непрочитанное тело запроса больше этого не вычитываем, а закрываем соединение
+MAX_DRAIN_BYTES = 1024 * 1024
+
+# GET /operations/stream: буфер подписчика (операций) и сколько подписчиков на сервер
+STREAM_BUFFER = 1000
+MAX_STREAMS = 256
+
+
+def _event(op: Operation) -> str:
+    return f"id: {op.id}\ndata: {_operation_json(op)}\n\n"
 
 
 class Handler(BaseHTTPRequestHandler):
+    """
+    HTTP/1.1 with persistent connections: requests on one connection (pipelined or not)
+    are answered in order. Every response has a Content-Length (or chunked encoding), an
+    unread request body is drained after the response, and a connection idle for
+    `timeout` seconds is closed. keep_alive = False closes after every response.
+    """
     state: AppState
+    protocol_version = "HTTP/1.1"
+    keep_alive = True
+    timeout = 5.0
+    # заголовки и тело одной записью в сокет, без задержек Nagle между ними
+    wbufsize = 64 * 1024
+    disable_nagle_algorithm = True
+    _routed = False
+    # потоков под GET /operations/stream; 0 - не поддерживается (single, asyncio, pre-fork)
+    max_streams = 0
+    stream_ping = 15.0
+    # ограничение одновременных запросов, None - без ограничения
+    admission: AdmissionController | None = None
 
     # чтобы не шумел стандартный логгер на каждый запрос
     def log_message(self, format: str, *args) -> None:  # noqa: A002
         return
 
+    def send_response(self, code: int, message: str | None = None) -> None:
+        self._status = code
+        super().send_response(code, message)
+        if not self._routed:
+            return  # ответ на битый запрос: send_error сам пишет Connection
+        if self.close_connection and self.request_version == "HTTP/1.1":
+            self.send_header("Connection", "close")
+        elif not self.close_connection and self.request_version == "HTTP/1.0":
+            self.send_header("Connection", "keep-alive")
+
+    def _request_body_length(self) -> int | None:
+        """Length of the request body, None if it cannot be skipped safely (no keep-alive then)."""
+        if "Transfer-Encoding" in self.headers:
+            return None
+        try:
+            length = int(self.headers.get("Content-Length", "0"))
+        except ValueError:
+            return None
+        return length if 0 <= length <= MAX_DRAIN_BYTES else None
+
+    def _instrumented(self, method: str, handle) -> None:
+        self._status = 500  # если обработчик упал, не успев ответить
+        self._routed = True
+        self._body_left = self._request_body_length()
+        if self._body_left is None or not self.keep_alive:
+            # конец тела не найти: следующий запрос на этом соединении не прочитать
+            self.close_connection = True
+        start = time.perf_counter_ns()
+        admission = self.admission
+        priority = _priority(method, self.path)
+        admitted = False
+        try:
+            if admission is not None and not admission.admit(priority):
+                self._reject(admission)
+                return
+            admitted = True
+            handle()
+            if self._body_left and not self.close_connection:
+                self.rfile.read(self._body_left)
+        finally:
+            if admitted and admission is not None:
+                admission.release(priority)
+            self._routed = False
+            elapsed = time.perf_counter_ns() - start
+            self.state.metrics.observe(method, _route(self.path), self._status, elapsed)
+
+    def _reject(self, admission: AdmissionController) -> None:
+        # соединение закрываем: поток освобождается, клиент придёт заново после Retry-After
+        self.close_connection = True
+        data = _encode({"error": "overloaded", "message": "server is overloaded, retry later"})
+        self.send_response(503)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.send_header("Retry-After", str(admission.retry_after))
+        self.end_headers()
+        self.wfile.write(data)
+
     def do_GET(self) -> None:  # noqa: N802
+        self._instrumented("GET", self._get)
+
+    def do_POST(self) -> None:  # noqa: N802
+        self._instrumented("POST", self._post)
+
+    def do_DELETE(self) -> None:  # noqa: N802
+        self._instrumented("DELETE", self._delete)
+
+    def _get(self) -> None:
         parsed = urlparse(self.path)
         path = parsed.path
 
         if path == "/health":
-            _json_response(self, 200, {"status": "ok"})
+            _send_body(self, 200, _HEALTH_BODY)
+            return
+
+        if path == "/metrics":
+            _send_body(self, 200, self.state.metrics.render().encode("utf-8"), content_type=METRICS_CONTENT_TYPE)
+            return
+
+        if path == "/operations/stream":
+            self._stream()
+            return
+
+        if path == "/operations" and "format=" in parsed.query:
+            qs = parse_qs(parsed.query)
+            if qs.get("format", ["json"])[0] != "json":
+                self._export(qs)
+                return
+
+        # сначала запрос разбирается и проверяется: 304 и кэш только для ответа, который был бы 200
+        if path == "/aggregates":
+            bucket = parse_qs(parsed.query).get("bucket", [None])[0]
+            if bucket is not None and bucket not in BUCKETS:
+                _error(self, 400, "bad_request", f"bucket must be one of: {', '.join(BUCKETS)}")
+                return
+            key = cache_key(path, parsed.query)
+            version = self.state.log.version()
+            if self._send_cached(key, version):
+                return
+            rows = self.state.log.aggregates(bucket)
+            payload = {"pairs": rows} if bucket is None else {"bucket": bucket, "buckets": rows}
+            self._send_versioned(key, _encode(payload), version)
             return
 
         if path == "/operations":
@@ -83,8 +480,35 @@ class Handler(BaseHTTPRequestHandler):
                     _error(self, 400, "bad_request", "offset must be integer")
                     return
 
-            items = [op.to_dict() for op in self.state.log.list(limit=limit, offset=offset)]
-            _json_response(self, 200, {"count": self.state.log.count(), "items": items})
+            after = None
+            if "after" in qs:
+                if "offset" in qs:
+                    _error(self, 400, "bad_request", "after and offset cannot be combined")
+                    return
+                after = qs["after"][0].strip()
+
+            try:
+                filters = operation_filters(qs)
+            except ValueError as e:
+                _error(self, 400, "bad_request", str(e))
+                return
+
+            key = cache_key(path, parsed.query)
+            version = self.state.log.version()
+            try:
+                if after is not None:
+                    self.state.log.page(limit=0, after=after)
+                if self._send_cached(key, version):
+                    return
+                if filters:
+                    ops, next_cursor, count = self.state.log.query(**filters, limit=limit, offset=offset, after=after)
+                else:
+                    ops, next_cursor, count = self.state.log.page(limit=limit, offset=offset, after=after)
+            except UnknownCursorError as e:
+                _error(self, 400, "bad_request", str(e))
+                return
+
+            self._send_versioned(key, _page_json(ops, next_cursor, count).encode("utf-8"), version)
             return
 
         if path.startswith("/operations/"):
@@ -93,20 +517,175 @@ class Handler(BaseHTTPRequestHandler):
                 _error(self, 404, "not_found", "operation id is required")
                 return
 
-            for op in self.state.log.list():
-                if op.id == op_id:
-                    _json_response(self, 200, op.to_dict())
-                    return
+            key = cache_key(path, parsed.query)
+            version = self.state.log.version()
+            op = self.state.log.get(op_id)
+            if op is None:
+                _error(self, 404, "not_found", "operation not found")
+                return
+            if self._send_cached(key, version):
+                return
 
-            _error(self, 404, "not_found", "operation not found")
+            self._send_versioned(key, _operation_json(op).encode("utf-8"), version)
             return
 
         _error(self, 404, "not_found", "endpoint not found")
 
-    def do_POST(self) -> None:  # noqa: N802
+    def _stream(self) -> None:
+        """
+        GET /operations/stream: Server-Sent Events, one event per new operation
+        (id: operation id, data: the operation JSON), a comment line every stream_ping
+        seconds while idle. With Last-Event-ID the operations added after that one are
+        sent first, from the history; `event: reset` if it is no longer there.
+        A subscriber more than STREAM_BUFFER operations behind gets `event: dropped`
+        and is disconnected, so a slow reader never holds back POST /operations.
+        """
+        log = self.state.log
+        if not isinstance(log, OperationLog) or self.max_streams == 0:
+            _error(self, 503, "unavailable", "streaming needs --mode threaded or pool in a single process")
+            return
+        if not self.state.open_stream(self.max_streams):
+            _error(self, 503, "unavailable", "too many stream subscribers")
+            return
+
+        # подписываемся до ответа: всё, что добавят после, придёт через буфер
+        sub = log.subscribe(STREAM_BUFFER)
+        try:
+            self.close_connection = True
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream; charset=utf-8")
+            self.send_header("Cache-Control", "no-cache")
+            self.end_headers()
+            last_event_id = self.headers.get("Last-Event-ID", "").strip()
+            if last_event_id:
+                self._replay(log, last_event_id, sub.last_id)
+            self.wfile.flush()
+            while True:
+                try:
+                    ops = sub.get(self.stream_ping)
+                except SubscriberDroppedError as e:
+                    self.wfile.write(f"event: dropped\ndata: {CODEC.dumps({'message': str(e)})}\n\n".encode())
+                    return
+                except SubscriptionClosedError:
+                    return
+                self.wfile.write("".join(map(_event, ops)).encode("utf-8") if ops else b": ping\n\n")
+                self.wfile.flush()
+        except OSError:
+            pass  # клиент отключился или не читает дольше timeout
+        finally:
+            log.unsubscribe(sub)
+            self.state.close_stream()
+
+    def _replay(self, log: OperationLog, after: str, stop_id: str | None) -> None:
+        """Writes the operations after `after` up to stop_id, the newest one when the subscription began."""
+        if stop_id is None or after == stop_id:
+            return
+        try:
+            while True:
+                items, _, _ = log.page(limit=1000, after=after)
+                for i, op in enumerate(items):
+                    if op.id == stop_id:
+                        items = items[:i + 1]
+                        break
+                self.wfile.write("".join(map(_event, items)).encode("utf-8"))
+                if not items or items[-1].id == stop_id:
+                    return
+                after = items[-1].id
+        except UnknownCursorError:
+            # курсор вытеснен или удалён: клиенту нужно перечитать историю
+            self.wfile.write(b"event: reset\ndata: {}\n\n")
+
+    def _export(self, qs: dict[str, list[str]]) -> None:
+        """
+        GET /operations?format=ndjson|csv: the whole history (or the part after `after`),
+        written page by page as it is read, so memory does not grow with the history.
+        HTTP/1.1 clients get chunked encoding (the connection stays open), HTTP/1.0 ones
+        a body ended by closing the connection.
+        """
+        fmt = qs["format"][0]
+        if fmt not in EXPORT_FORMATS:
+            _error(self, 400, "bad_request", f"format must be one of: json, {', '.join(EXPORT_FORMATS)}")
+            return
+        if "limit" in qs or "offset" in qs:
+            _error(self, 400, "bad_request", f"limit and offset are not supported with format={fmt}")
+            return
+        if any(name in qs for name in FILTER_PARAMS):
+            _error(self, 400, "bad_request", f"filters are not supported with format={fmt}")
+            return
+        after = qs["after"][0].strip() if "after" in qs else None
+        if after is not None:
+            try:
+                self.state.log.page(limit=0, after=after)
+            except UnknownCursorError as e:
+                _error(self, 400, "bad_request", str(e))
+                return
+
+        content_type, header, encode_page = EXPORT_FORMATS[fmt]
+        chunked = self.request_version == "HTTP/1.1"
+        if not chunked:
+            self.close_connection = True
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        if chunked:
+            self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        self.wfile.flush()  # первый байт сразу, а не после первой страницы
+
+        def write(text: str) -> None:
+            data = text.encode("utf-8")
+            if chunked:
+                data = b"%x\r\n%s\r\n" % (len(data), data)
+            self.wfile.write(data)
+
+        if header:
+            write(header)
+        for ops in iter_pages(self.state.log, after=after):
+            write(encode_page(ops))
+        if chunked:
+            self.wfile.write(b"0\r\n\r\n")
+
+    def _send_cached(self, key: str, version: int) -> bool:
+        """
+        Answers a GET that has already been validated from what the client or the cache has:
+        304 if If-None-Match has the current ETag, the cached bytes if they are current.
+        """
+        tag = etag(version, key)
+        if etag_matches(self.headers.get("If-None-Match"), tag):
+            self.send_response(304)
+            self.send_header("ETag", tag)
+            self.end_headers()
+            return True
+        body = self.state.responses.get(key, version)
+        if body is None:
+            return False
+        _send_body(self, 200, body, tag)
+        return True
+
+    def _send_versioned(self, key: str, body: bytes, version: int) -> None:
+        # если лог изменился, пока строился ответ, неизвестно, к какой версии он относится
+        if self.state.log.version() != version:
+            _send_body(self, 200, body)
+            return
+        self.state.responses.put(key, version, body)
+        _send_body(self, 200, body, etag(version, key))
+
+    def _post(self) -> None:
         parsed = urlparse(self.path)
         path = parsed.path
 
+        if path == "/operations/batch":
+            self._post_batch()
+            return
+
+        if path == "/admin/rates/reload":
+            try:
+                rates = self.state.reload_rates()
+            except InvalidRatesFileError as e:
+                _error(self, 500, "invalid_rates", str(e))
+                return
+            _json_response(self, 200, {"status": "reloaded", "currencies": len(rates.rate_to_rub)})
+            return
+
         if path != "/operations":
             _error(self, 404, "not_found", "endpoint not found")
             return
@@ -125,8 +704,19 @@ class Handler(BaseHTTPRequestHandler):
             _error(self, 400, "bad_request", f"missing field: {e.args[0]}")
             return
 
+        as_of = None
+        if body.get("as_of") is not None:
+            if self.state.converter.history is None:
+                _error(self, 400, "bad_request", "as_of is not supported: no rates history loaded")
+                return
+            try:
+                as_of = _parse_as_of(body["as_of"])
+            except ValueError as e:
+                _error(self, 400, "bad_request", str(e))
+                return
+
         try:
-            result = self.state.converter.convert(amount, from_cur, to_cur)
+            result = self.state.converter.convert(amount, from_cur, to_cur, as_of=as_of)
         except InvalidAmountError as e:
             _error(self, 400, "bad_request", str(e))
             return
@@ -141,23 +731,62 @@ class Handler(BaseHTTPRequestHandler):
             result.rate,
             result.result,
         )
+        self.state.metrics.count_conversions(((op.from_currency, op.to_currency),))
 
-        payload = {
-            "rate": result.rate,
-            "result": result.result,
-            "operation": {
-                "id": op.id,
-                "ts": op.ts,
-                "from": op.from_currency,
-                "to": op.to_currency,
-                "amount": op.amount,
-                "rate": op.rate,
-                "result": op.result,
-            },
-        }
-        _json_response(self, 200, payload)
+        _send_body(self, 200, _conversion_json(result.rate, result.result, op).encode("utf-8"))
 
-    def do_DELETE(self) -> None:  # noqa: N802
+    def _post_batch(self) -> None:
+        try:
+            body = _read_json_value(self)
+        except ValueError as e:
+            _error(self, 400, "bad_request", str(e))
+            return
+
+        if not isinstance(body, list):
+            _error(self, 400, "bad_request", "JSON body must be an array")
+            return
+        if len(body) > MAX_BATCH_ITEMS:
+            _error(self, 400, "bad_request", f"batch is limited to {MAX_BATCH_ITEMS} items")
+            return
+
+        # сначала разбираем элементы, конвертируем только корректные
+        items: list[dict | str | None] = [None] * len(body)
+        requests: list[tuple[object, object, object]] = []
+        positions: list[int] = []
+        for i, item in enumerate(body):
+            if not isinstance(item, dict):
+                items[i] = {"error": "bad_request", "message": "item must be an object"}
+                continue
+            try:
+                requests.append((item["amount"], item["from"], item["to"]))
+            except KeyError as e:
+                items[i] = {"error": "bad_request", "message": f"missing field: {e.args[0]}"}
+                continue
+            positions.append(i)
+
+        converted = []
+        for i, res in zip(positions, self.state.converter.convert_many(requests)):
+            if isinstance(res, InvalidAmountError):
+                items[i] = {"error": "bad_request", "message": str(res)}
+            elif isinstance(res, UnknownCurrencyError):
+                items[i] = {"error": "not_found", "message": str(res)}
+            else:
+                converted.append((i, res))
+
+        # список, а не генератор: лог может быть в другом процессе (--processes)
+        ops = self.state.log.add_many(
+            [(r.from_currency, r.to_currency, r.amount, r.rate, r.result) for _, r in converted]
+        )
+        for (i, res), op in zip(converted, ops):
+            items[i] = _conversion_json(res.rate, res.result, op)
+        self.state.metrics.count_conversions((op.from_currency, op.to_currency) for op in ops)
+
+        # ошибки - словари, успешные элементы уже закодированы
+        items_json = ", ".join(item if isinstance(item, str) else CODEC.dumps(item) for item in items)
+        data = f'{{"converted": {len(ops)}, "failed": {len(body) - len(ops)}, "items": [{items_json}]}}'
+        _send_body(self, 200, data.encode("utf-8"))
+
+    def _delete(self) -> None:
         parsed = urlparse(self.path)
         path = parsed.path
 
@@ -165,31 +794,231 @@ class Handler(BaseHTTPRequestHandler):
             _error(self, 404, "not_found", "endpoint not found")
             return
 
-        deleted = self.state.log.count()
-        self.state.log.clear()
+        deleted = self.state.log.clear()
         _json_response(self, 200, {"deleted": deleted})
 
 
-def run_server(host: str = "0.0.0.0", port: int = 8008, rates_path: str = "data/rates.csv") -> None:
+class PooledHTTPServer(HTTPServer):
+    """
+    Serves connections on a fixed pool of worker threads.
+    When all workers are busy the accept loop waits, so extra connections
+    stay in the listen backlog instead of piling up in memory.
+    """
+    def __init__(self, server_address, handler_class, workers: int = 8) -> None:
+        if workers < 1:
+            raise ValueError("workers must be >= 1")
+        super().__init__(server_address, handler_class)
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="http-worker")
+        self._slots = threading.BoundedSemaphore(workers)
+
+    def process_request(self, request, client_address) -> None:
+        self._slots.acquire()
+        self._pool.submit(self._process_request_worker, request, client_address)
+
+    def _process_request_worker(self, request, client_address) -> None:
+        try:
+            self.finish_request(request, client_address)
+        except Exception:  # noqa: BLE001 - как ThreadingMixIn.process_request_thread
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+            self._slots.release()
+
+    def server_close(self) -> None:
+        super().server_close()
+        self._pool.shutdown(wait=True)
+
+
+SERVER_MODES = ("single", "threaded", "pool")
+
+
+def make_server(
+    state: AppState,
+    host: str = "0.0.0.0",
+    port: int = 8008,
+    mode: str = "single",
+    workers: int = 8,
+    reuse_port: bool = False,
+    idle_timeout: float = 5.0,
+    max_in_flight: int = 0,
+    max_queue: int | None = None,
+    queue_timeout: float = 0.5,
+) -> HTTPServer:
+    """
+    Builds (but does not start) an HTTP server for the given state.
+    mode: "single" - one request at a time (HTTPServer),
+          "threaded" - a new thread per connection (ThreadingHTTPServer),
+          "pool" - a bounded pool of `workers` threads (PooledHTTPServer).
+    reuse_port sets SO_REUSEPORT, so several processes can listen on the same port.
+    idle_timeout: seconds a keep-alive connection may wait for its next request.
+    In "single" mode connections are closed after each response: one idle
+    keep-alive client would otherwise hold the whole server.
+    GET /operations/stream holds a thread per subscriber: up to MAX_STREAMS in "threaded",
+    half of the pool in "pool", not available in "single".
+    max_in_flight > 0 turns on admission control (see AdmissionController): at most that many
+    requests run at once, max_queue more wait up to queue_timeout seconds, the rest get 503.
+    Not available in "single" mode, which already runs one request at a time.
+    """
+    if max_in_flight > 0 and mode == "single":
+        raise ValueError("admission control (max_in_flight) needs mode 'threaded' or 'pool'")
+    # прокидываем state в handler через подкласс, чтобы у каждого сервера был свой
+    # поток на подписчика: в single не бывает, в pool занимает не больше половины пула
+    max_streams = {"single": 0, "threaded": MAX_STREAMS, "pool": workers // 2}.get(mode, 0)
+    admission = None
+    if max_in_flight > 0:
+        admission = AdmissionController(max_in_flight, max_queue=max_queue, queue_timeout=queue_timeout)
+        state.metrics.gauge("admission_in_flight", "Requests admitted and running.", lambda: admission.in_flight)
+        state.metrics.gauge("admission_queued", "Requests waiting for admission.", lambda: admission.queued)
+    handler_class = type(
+        "BoundHandler",
+        (Handler,),
+        {
+            "state": state, "timeout": idle_timeout, "keep_alive": mode != "single",
+            "max_streams": max_streams, "admission": admission,
+        },
+    )
+
+    server_classes = {"single": HTTPServer, "threaded": ThreadingHTTPServer, "pool": PooledHTTPServer}
+    try:
+        server_class = server_classes[mode]
+    except KeyError:
+        raise ValueError(f"Unknown server mode: {mode!r}, expected one of {SERVER_MODES}") from None
+    options = {}
+    if reuse_port:
+        options["allow_reuse_port"] = True
+    if admission is not None:
+        # с очередью в 5 соединений (по умолчанию) лишние SYN теряются и клиент ждёт повтора 1-3 с;
+        # под admission сервер принимает всё сразу и сам отвечает 503
+        options["request_queue_size"] = socket.SOMAXCONN
+    if options:
+        server_class = type(server_class.__name__, (server_class,), options)
+
+    if mode == "pool":
+        return server_class((host, port), handler_class, workers=workers)
+    return server_class((host, port), handler_class)
+
+
+def run_server(
+    host: str = "0.0.0.0",
+    port: int = 8008,
+    rates_path: str = "data/rates.csv",
+    mode: str = "single",
+    workers: int = 8,
+    journal_dir: str | None = None,
+    journal_sync: bool = True,
+    storage: str = "list",
+    watch_rates: float = 0.0,
+    rates_history_path: str | None = None,
+    rates_cache_path: str | None = None,
+    max_records: int | None = None,
+    max_age: float | None = None,
+    idle_timeout: float = 5.0,
+    engine: str = "float",
+    rounding: str = "half_up",
+    max_in_flight: int = 0,
+    max_queue: int | None = None,
+    queue_timeout: float = 0.5,
+) -> None:
     # Создаём state один раз
-    state = AppState(rates_path)
+    state = AppState(
+        rates_path,
+        journal_dir=journal_dir,
+        journal_sync=journal_sync,
+        storage=storage,
+        watch_rates=watch_rates,
+        rates_history_path=rates_history_path,
+        rates_cache_path=rates_cache_path,
+        max_records=max_records,
+        max_age=max_age,
+        engine=engine,
+        rounding=rounding,
+    )
 
-    # прокидываем state в handler через атрибут класса
-    def handler_factory(*args, **kwargs):
-        h = Handler(*args, **kwargs)
-        return h
+    server = make_server(
+        state, host, port, mode=mode, workers=workers, idle_timeout=idle_timeout,
+        max_in_flight=max_in_flight, max_queue=max_queue, queue_timeout=queue_timeout,
+    )
+    print(f"Server running on http://{host}:{port} (mode={mode})")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        state.close()
 
-    # не используем factory в HTTPServer напрямую, поэтому присваиваем state классу
-    Handler.state = state  # type: ignore[assignment]
 
-    server = HTTPServer((host, port), Handler)
-    print(f"Server running on http://{host}:{port}")
-    server.serve_forever()
+def _parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Currency converter HTTP server")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8008)
+    parser.add_argument("--rates", default="data/rates.csv", help="path to rates CSV")
+    parser.add_argument("--mode", choices=SERVER_MODES, default="single")
+    parser.add_argument("--workers", type=int, default=8, help="pool size for --mode pool")
+    parser.add_argument(
+        "--idle-timeout", type=float, default=5.0, help="seconds to keep an idle keep-alive connection open"
+    )
+    parser.add_argument(
+        "--processes", type=int, default=1,
+        help="worker processes sharing the port (SO_REUSEPORT) and one history process",
+    )
+    parser.add_argument("--journal", metavar="DIR", help="keep the operation history on disk in DIR")
+    parser.add_argument(
+        "--journal-async", action="store_true",
+        help="answer POST before the journal fsync (faster, may lose the last few ms on a crash)",
+    )
+    parser.add_argument(
+        "--storage", choices=sorted(STORAGES), default="list",
+        help="how the history is kept in memory; columnar uses several times less memory",
+    )
+    parser.add_argument(
+        "--watch-rates", type=float, default=0.0, metavar="SECONDS",
+        help="reload the rates file when it changes, checking every SECONDS (0 = off)",
+    )
+    parser.add_argument(
+        "--rates-cache", metavar="PATH", help="binary copy of the parsed rates file, reused while the CSV is unchanged"
+    )
+    parser.add_argument(
+        "--rates-history", metavar="CSV", help="dated rates (date,currency,rate_to_rub) for as_of conversions"
+    )
+    parser.add_argument("--max-records", type=int, metavar="N", help="keep only the newest N operations")
+    parser.add_argument("--max-age", type=float, metavar="SECONDS", help="drop operations older than SECONDS")
+    parser.add_argument(
+        "--engine", choices=ENGINES, default="float",
+        help="conversion arithmetic: float, or fixed (integer minor units, exact rounding)",
+    )
+    parser.add_argument("--rounding", choices=sorted(ROUNDING), default="half_up", help="rounding of --engine fixed")
+    parser.add_argument(
+        "--max-in-flight", type=int, default=0, metavar="N",
+        help="admission control: at most N requests at once, the rest wait or get 503 (0 = off)",
+    )
+    parser.add_argument(
+        "--max-queue", type=int, metavar="N", help="requests waiting for admission before 503 (default: --max-in-flight)"
+    )
+    parser.add_argument(
+        "--queue-timeout", type=float, default=0.5, metavar="SECONDS", help="longest wait for admission before 503"
+    )
+    args = parser.parse_args(argv)
+    if args.max_in_flight > 0 and args.mode == "single":
+        parser.error("--max-in-flight needs --mode threaded or pool")
+    return args
 
 
 if __name__ == "__main__":
+    args = _parse_args()
+    run = run_server
+    options = {}
+    if args.processes > 1:
+        from app.prefork import run_prefork_server as run
+
+        options["processes"] = args.processes
     try:
-        run_server()
+        run(
+            args.host, args.port, args.rates, mode=args.mode, workers=args.workers,
+            journal_dir=args.journal, journal_sync=not args.journal_async, storage=args.storage,
+            watch_rates=args.watch_rates, rates_history_path=args.rates_history,
+            rates_cache_path=args.rates_cache, max_records=args.max_records, max_age=args.max_age,
+            idle_timeout=args.idle_timeout, engine=args.engine, rounding=args.rounding,
+            max_in_flight=args.max_in_flight, max_queue=args.max_queue, queue_timeout=args.queue_timeout, **options,
+        )
     except InvalidRatesFileError as e:
         print(f"Failed to start server: {e}")
         raise
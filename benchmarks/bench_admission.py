@@ -0,0 +1,92 @@
+"""
+Overload test of admission control: the threaded server without limits vs --max-in-flight.
+
+`clients` threads send POST /operations back to back (far more than the server keeps up with),
+`scanners` threads read large GET /operations pages, and a prober calls /health every 50 ms.
+Reported per request kind: answered (200), shed (503), p50/p99 latency of every answer.
+Without admission everything is answered but waits behind everything else; with it the
+excess gets a fast 503 and p99 stays near queue_timeout.
+
+    python -m benchmarks.bench_admission --clients 32 --scanners 16
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import threading
+import time
+
+from benchmarks.common import percentile, request, server_process
+
+BODY = {"from": "USD", "to": "RUB", "amount": 10}
+
+
+def _summary(results: list[tuple[int, float]]) -> dict:
+    latencies = sorted(t for _, t in results)
+    return {
+        "ok": sum(1 for status, _ in results if status == 200),
+        "shed": sum(1 for status, _ in results if status == 503),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+    }
+
+
+def run(clients: int, scanners: int, duration: float, history: int, **options) -> dict:
+    with server_process(mode="threaded", **options) as port:
+        for _ in range(history // 1000):
+            request(port, "POST", "/operations/batch", [BODY] * 1000)
+
+        results: dict[str, list[tuple[int, float]]] = {"post": [], "scan": [], "health": []}
+        lock = threading.Lock()
+        deadline = time.perf_counter() + duration
+
+        def loop(kind: str, method: str, path: str, body: object | None, pause: float) -> None:
+            local = []
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                try:
+                    status, _ = request(port, method, path, body)
+                except OSError:
+                    status = 0
+                local.append((status, time.perf_counter() - started))
+                if pause:
+                    time.sleep(pause)
+            with lock:
+                results[kind].extend(local)
+
+        threads = [threading.Thread(target=loop, args=("post", "POST", "/operations", BODY, 0)) for _ in range(clients)]
+        threads += [
+            threading.Thread(target=loop, args=("scan", "GET", "/operations?limit=5000", None, 0))
+            for _ in range(scanners)
+        ]
+        threads.append(threading.Thread(target=loop, args=("health", "GET", "/health", None, 0.05)))
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        return {kind: _summary(items) for kind, items in results.items()}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--scanners", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--history", type=int, default=20_000, help="operations stored before the test")
+    parser.add_argument("--max-in-flight", type=int, default=2)
+    parser.add_argument("--max-queue", type=int, default=4)
+    parser.add_argument("--queue-timeout", type=float, default=0.1)
+    args = parser.parse_args()
+
+    load = {"clients": args.clients, "scanners": args.scanners, "duration": args.duration, "history": args.history}
+    limits = {"max_in_flight": args.max_in_flight, "max_queue": args.max_queue, "queue_timeout": args.queue_timeout}
+    print(json.dumps({
+        "load": load,
+        "limits": limits,
+        "no_admission": run(**load),
+        "admission": run(**load, **limits),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
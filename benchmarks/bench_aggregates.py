@@ -0,0 +1,69 @@
+"""
+Per pair totals: maintained aggregates (OperationLog.aggregates) vs computing them
+from the full history, by history size; plus the cost of Aggregates.add per operation.
+
+    python -m benchmarks.bench_aggregates --sizes 10000,100000,1000000
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import time
+import timeit
+from functools import partial
+
+from app.aggregates import Aggregates
+from app.operations import OperationLog
+
+PAIRS = [(f, t) for f in ("USD", "EUR", "CNY", "GBP", "JPY") for t in ("RUB", "USD", "EUR") if f != t]
+
+
+def from_history(log: OperationLog) -> dict:
+    """What a reporting job does today: read every operation and sum it up."""
+    totals: dict[tuple[str, str], list] = {}
+    for op in log.list():
+        s = totals.setdefault((op.from_currency, op.to_currency), [0, 0.0, 0.0, op.rate, op.rate])
+        s[0] += 1
+        s[1] += op.amount
+        s[2] += op.result
+        s[3] = min(s[3], op.rate)
+        s[4] = max(s[4], op.rate)
+    return totals
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="10000,100000,1000000")
+    args = parser.parse_args()
+
+    rnd = random.Random(0)
+    results = []
+    for size in map(int, args.sizes.split(",")):
+        log = OperationLog()
+        for start in range(0, size, 10_000):
+            rows = []
+            for _ in range(min(10_000, size - start)):
+                f, t = rnd.choice(PAIRS)
+                rate = rnd.uniform(0.5, 100)
+                rows.append((f, t, 10.0, rate, 10.0 * rate))
+            log.add_many(rows)
+        started = time.perf_counter()
+        from_history(log)
+        scan_ms = (time.perf_counter() - started) * 1e3
+        query_ms = min(timeit.repeat(log.aggregates, number=100, repeat=5)) / 100 * 1e3
+        hour_ms = min(timeit.repeat(partial(log.aggregates, "hour"), number=100, repeat=5)) / 100 * 1e3
+        results.append({
+            "history": size, "scan_ms": round(scan_ms, 1),
+            "aggregates_ms": round(query_ms, 3), "aggregates_hour_ms": round(hour_ms, 3),
+        })
+
+    agg = Aggregates()
+    ts = time.time_ns() // 1000
+    add_us = min(timeit.repeat(lambda: agg.add("USD", "RUB", 10.0, 78.05, 780.5, ts), number=100_000, repeat=5)) * 10
+
+    print(json.dumps({"pairs": len(PAIRS), "add_us": round(add_us, 2), "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
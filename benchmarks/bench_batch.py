@@ -0,0 +1,58 @@
+"""
+Batch conversion: CurrencyConverter.convert_many vs convert() in a loop,
+and one POST /operations/batch vs N POST /operations.
+
+    python -m benchmarks.bench_batch --items 100
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import time
+import timeit
+
+from app.converter import CurrencyConverter
+from app.rates import CsvRatesLoader
+from benchmarks.common import RATES_PATH, request, server_process
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, default=100)
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    rates = CsvRatesLoader(RATES_PATH).load()
+    conv = CurrencyConverter(rates)
+    codes = sorted(rates.rate_to_rub)
+    rnd = random.Random(1)
+    items = [(rnd.uniform(1, 1000), rnd.choice(codes), rnd.choice(codes)) for _ in range(args.items)]
+
+    loop = min(timeit.repeat(lambda: [conv.convert(*it) for it in items], number=100, repeat=5)) / 100
+    many = min(timeit.repeat(lambda: conv.convert_many(items), number=100, repeat=5)) / 100
+
+    body = [{"amount": a, "from": f, "to": t} for a, f, t in items]
+    with server_process(mode="single") as port:
+        started = time.perf_counter()
+        for _ in range(args.rounds):
+            for it in body:
+                request(port, "POST", "/operations", it)
+        single_http = (time.perf_counter() - started) / args.rounds
+
+        started = time.perf_counter()
+        for _ in range(args.rounds):
+            request(port, "POST", "/operations/batch", body)
+        batch_http = (time.perf_counter() - started) / args.rounds
+
+    print(json.dumps({
+        "items": args.items,
+        "convert_loop_us": round(loop * 1e6, 1),
+        "convert_many_us": round(many * 1e6, 1),
+        "http_single_posts_ms": round(single_http * 1e3, 2),
+        "http_batch_post_ms": round(batch_http * 1e3, 2),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Bulk conversion (python main.py bulk) of generated CSV files: rows per second and peak
+memory by input size, in one process and with a process pool. Peak memory should not
+grow with the input.
+
+    python -m benchmarks.bench_bulk --rows 100000,1000000 --processes 1,2
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+from benchmarks.common import RATES_PATH
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# запускается в отдельном процессе: пиковая память своя у каждого прогона
+_RUN = """
+import resource, sys, time
+import main
+started = time.perf_counter()
+main.main(sys.argv[1:])
+seconds = time.perf_counter() - started
+own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+print(f"{seconds} {own} {children}", file=sys.stderr)
+"""
+
+
+def write_input(path: Path, rows: int) -> None:
+    rnd = random.Random(rows)
+    codes = ["RUB", "USD", "EUR", "CNY", "GBP"]
+    with path.open("w", encoding="utf-8") as f:
+        f.write("from,to,amount\n")
+        for start in range(0, rows, 100_000):
+            f.write("".join(
+                f"{rnd.choice(codes)},{rnd.choice(codes)},{rnd.randint(1, 10**6) / 100}\n"
+                for _ in range(min(100_000, rows - start))
+            ))
+
+
+def run(path: Path, out: Path, processes: int, chunk_size: int) -> dict:
+    cmd = [sys.executable, "-c", _RUN, "bulk", str(path), "-o", str(out), "--rates", RATES_PATH,
+           "--processes", str(processes), "--chunk-size", str(chunk_size)]
+    proc = subprocess.run(cmd, cwd=ROOT, capture_output=True, text=True, check=True)
+    seconds, own_kb, children_kb = proc.stderr.strip().splitlines()[-1].split()
+    return {"seconds": round(float(seconds), 2), "peak_rss_mb": round(int(own_kb) / 1024, 1),
+            "worker_peak_rss_mb": round(int(children_kb) / 1024, 1)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", default="100000,1000000")
+    parser.add_argument("--processes", default="1,2")
+    parser.add_argument("--chunk-size", type=int, default=10_000)
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in map(int, args.rows.split(",")):
+            path = Path(tmp) / f"in_{rows}.csv"
+            write_input(path, rows)
+            for processes in map(int, args.processes.split(",")):
+                stats = run(path, Path(tmp) / "out.csv", processes, args.chunk_size)
+                stats.update(rows=rows, processes=processes, input_mb=round(path.stat().st_size / 2**20, 1))
+                stats["rows_per_second"] = round(rows / stats["seconds"])
+                results.append(stats)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+JSON work per request: the POST body decode (stdlib vs orjson) and the response
+encode (json.dumps of dicts vs the direct builders in app.server).
+
+    python -m benchmarks.bench_codec --page 100
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import timeit
+
+from app.operations import OperationLog
+from app.server import JsonCodec, _conversion_json, _page_json
+
+
+def per_call_us(fn, number: int = 2000) -> float:
+    best = min(timeit.repeat(fn, number=number, repeat=5))
+    return best / number * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--page", type=int, default=100)
+    args = parser.parse_args()
+
+    log = OperationLog()
+    ops = log.add_many([("USD", "RUB", i + 1, 78.05, 78.05 * (i + 1)) for i in range(args.page)])
+    op = ops[0]
+    body = b'{"from": "USD", "to": "RUB", "amount": 10}'
+    stdlib, fast = JsonCodec(use_orjson=False), JsonCodec()
+
+    def post_dicts() -> bytes:
+        payload = {"operation": {"id": op.id, "ts": op.ts, "from": op.from_currency, "to": op.to_currency,
+                                 "amount": op.amount, "rate": op.rate, "result": op.result},
+                   "rate": op.rate, "result": op.result}
+        return json.dumps(payload, ensure_ascii=False).encode("utf-8")
+
+    def page_dicts() -> bytes:
+        payload = {"count": len(ops), "items": [o.to_dict() for o in ops], "next": None}
+        return json.dumps(payload, ensure_ascii=False).encode("utf-8")
+
+    print(json.dumps({
+        "codec": fast.name,
+        "loads_stdlib_us": round(per_call_us(lambda: stdlib.loads(body)), 2),
+        "loads_codec_us": round(per_call_us(lambda: fast.loads(body)), 2),
+        "post_dicts_us": round(per_call_us(post_dicts), 2),
+        "post_builder_us": round(per_call_us(lambda: _conversion_json(op.rate, op.result, op).encode()), 2),
+        "page": args.page,
+        "page_dicts_us": round(per_call_us(page_dicts, 200), 1),
+        "page_builder_us": round(per_call_us(lambda: _page_json(ops, None, len(ops)).encode(), 200), 1),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Per-call cost of CurrencyConverter.convert with the cross-rate table
+vs the previous path (normalize + two Rates.get_rate_to_rub lookups + division).
+
+    python -m benchmarks.bench_converter --currencies 150
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import timeit
+
+from app.converter import ConversionResult, CurrencyConverter
+from app.rates import Rates
+
+
+def lookup_convert(rates: Rates, amount: float, from_currency: str, to_currency: str) -> ConversionResult:
+    """The converter before the cross-rate table, kept for comparison."""
+    amount = float(amount)
+    f = rates.normalize(from_currency)
+    t = rates.normalize(to_currency)
+    rate = rates.get_rate_to_rub(f) / rates.get_rate_to_rub(t)
+    return ConversionResult(f, t, amount, round(rate, 6), round(amount * rate, 2))
+
+
+def lookup_pair(rates: Rates, from_currency: str, to_currency: str) -> tuple[str, str, float, float]:
+    f = rates.normalize(from_currency)
+    t = rates.normalize(to_currency)
+    rate = rates.get_rate_to_rub(f) / rates.get_rate_to_rub(t)
+    return f, t, rate, round(rate, 6)
+
+
+def make_rates(n: int) -> Rates:
+    rnd = random.Random(n)
+    codes = {"RUB"} | {f"C{i:03d}" for i in range(n - 1)}
+    return Rates(rate_to_rub={c: 1.0 if c == "RUB" else rnd.uniform(0.01, 500) for c in sorted(codes)})
+
+
+def per_call_ns(fn, pairs: list[tuple[float, str, str]], number: int = 20) -> float:
+    best = min(timeit.repeat(lambda: [fn(*p) for p in pairs], number=number, repeat=5))
+    return best / number / len(pairs) * 1e9
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--currencies", type=int, default=150)
+    parser.add_argument("--calls", type=int, default=10_000)
+    args = parser.parse_args()
+
+    rates = make_rates(args.currencies)
+    conv = CurrencyConverter(rates)
+    codes = list(rates.rate_to_rub)
+    rnd = random.Random(0)
+    pairs = [(rnd.uniform(1, 1000), rnd.choice(codes), rnd.choice(codes)) for _ in range(args.calls)]
+    lower = [(a, f.lower(), t.lower()) for a, f, t in pairs]
+    table = rates.table
+
+    for p in pairs:
+        assert conv.convert(*p) == lookup_convert(rates, *p)
+
+    print(json.dumps({
+        "currencies": args.currencies,
+        "lookup_convert_ns": round(per_call_ns(lambda *p: lookup_convert(rates, *p), pairs)),
+        "table_convert_ns": round(per_call_ns(conv.convert, pairs)),
+        "table_convert_unnormalized_ns": round(per_call_ns(conv.convert, lower)),
+        "lookup_pair_ns": round(per_call_ns(lambda a, f, t: lookup_pair(rates, f, t), pairs)),
+        "table_pair_ns": round(per_call_ns(lambda a, f, t: table.pair(table.index[f], table.index[t]), pairs)),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
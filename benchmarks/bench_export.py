@@ -0,0 +1,84 @@
+"""
+Full history download: GET /operations (one JSON body) vs the streaming export
+(?format=ndjson / csv). Time to the first body byte, total time, size and the
+peak memory of the server process.
+
+    python -m benchmarks.bench_export --history 200000
+"""
+from __future__ import annotations
+
+import argparse
+import http.client
+import json
+import multiprocessing as mp
+import time
+
+from benchmarks.common import RATES_PATH, request
+
+
+def _serve(conn, rates_path: str, history: int) -> None:
+    from app.server import AppState, make_server
+
+    state = AppState(rates_path)
+    for start in range(0, history, 10_000):
+        rows = [("USD", "RUB", i + 1, 78.05, 78.05 * (i + 1)) for i in range(start, min(history, start + 10_000))]
+        state.log.add_many(rows)
+    server = make_server(state, "127.0.0.1", 0, mode="threaded")
+    conn.send(server.server_address[1])
+    server.serve_forever()
+
+
+def download(port: int, path: str) -> dict:
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=300)
+    started = time.perf_counter()
+    conn.request("GET", path)
+    resp = conn.getresponse()
+    first = resp.read(1)
+    first_byte = time.perf_counter() - started
+    size = len(first)
+    while chunk := resp.read(1 << 16):
+        size += len(chunk)
+    conn.close()
+    return {
+        "first_byte_ms": round(first_byte * 1e3, 1),
+        "total_ms": round((time.perf_counter() - started) * 1e3, 1),
+        "mb": round(size / 1e6, 1),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--history", type=int, default=200_000)
+    args = parser.parse_args()
+
+    results = {}
+    for path in ("/operations?format=ndjson", "/operations?format=csv", "/operations"):
+        # свой процесс на каждый путь, чтобы пик памяти относился к одному запросу
+        parent, child = mp.Pipe()
+        proc = mp.Process(target=_serve, args=(child, RATES_PATH, args.history), daemon=True)
+        proc.start()
+        try:
+            port = parent.recv()
+            assert request(port, "GET", "/health")[0] == 200
+            before = _peak_rss_mb(proc.pid)
+            result = download(port, path)
+            result["server_peak_rss_growth_mb"] = round(_peak_rss_mb(proc.pid) - before, 1)
+            results[path] = result
+        finally:
+            proc.terminate()
+            proc.join()
+
+    print(json.dumps({"history": args.history, "results": results}, indent=2))
+
+
+def _peak_rss_mb(pid: int) -> float:
+    """VmHWM of a process (Linux), in MB."""
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) / 1024
+    raise RuntimeError("no VmHWM in /proc status")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Filtered GET /operations at the log level: OperationLog.query (posting lists per pair,
+bisect over timestamps) vs paging through the whole history and filtering on the client,
+by history size. One pair gets 1% of the operations; the time window is the newest 1%.
+
+    python -m benchmarks.bench_filters --sizes 10000,100000,1000000
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import time
+import timeit
+from functools import partial
+
+from app.operations import OperationLog, iter_pages, ts_to_micros
+
+PAIRS = [(f, t) for f in ("USD", "EUR", "CNY", "GBP", "JPY") for t in ("RUB", "USD", "EUR") if f != t]
+
+
+def client_scan(log: OperationLog, keep) -> list:
+    """What a client does today: read every page and filter it."""
+    return [op for page in iter_pages(log) for op in page if keep(op)]
+
+
+def _ms(fn, number: int = 20) -> float:
+    return round(min(timeit.repeat(fn, number=number, repeat=3)) / number * 1e3, 3)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="10000,100000,1000000")
+    parser.add_argument("--storage", default="list")
+    args = parser.parse_args()
+
+    rnd = random.Random(0)
+    results = []
+    for size in map(int, args.sizes.split(",")):
+        log = OperationLog(storage=args.storage)
+        for start in range(0, size, 10_000):
+            rows = []
+            for _ in range(min(10_000, size - start)):
+                f, t = ("AUD", "RUB") if rnd.random() < 0.01 else rnd.choice(PAIRS)
+                rows.append((f, t, rnd.uniform(1, 1000), 1.0, 1.0))
+            log.add_many(rows)
+            time.sleep(0.001)  # у пакетов разное время, окно since отрезает их часть
+        ops = log.list()
+        since = ts_to_micros(ops[size - size // 100].ts)
+        del ops
+
+        scan_ms = _ms(partial(client_scan, log, lambda op: op.from_currency == "AUD"), 1)
+        results.append({
+            "history": size,
+            "client_scan_ms": scan_ms,
+            "pair_page_ms": _ms(partial(log.query, "AUD", "RUB", limit=100)),
+            "pair_all_ms": _ms(partial(log.query, "AUD", "RUB")),
+            "since_page_ms": _ms(partial(log.query, since=since, limit=100)),
+            "pair_since_ms": _ms(partial(log.query, "AUD", since=since)),
+            "pair_min_amount_ms": _ms(partial(log.query, "AUD", "RUB", min_amount=900.0, limit=100)),
+            "matching_pair": log.query("AUD", "RUB", limit=0)[2],
+        })
+
+    log = OperationLog(storage=args.storage)
+    add_us = min(timeit.repeat(lambda: log.add("USD", "RUB", 10.0, 78.05, 780.5), number=50_000, repeat=3)) * 20
+
+    print(json.dumps({"storage": args.storage, "add_us": round(add_us, 2), "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Historical rates: load time of a dated rates file and cost of an as_of lookup.
+
+    python -m benchmarks.bench_history --years 10 --currencies 160
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import tempfile
+import time
+import timeit
+from datetime import date, timedelta
+from pathlib import Path
+
+from app.converter import CurrencyConverter
+from app.rates import CsvRateHistoryLoader, Rates
+
+
+def write_history(path: Path, years: int, currencies: int, shuffle: bool) -> int:
+    rnd = random.Random(years * 1000 + currencies)
+    codes = ["RUB"] + [f"C{i:03d}" for i in range(currencies - 1)]
+    start = date(2026, 1, 1) - timedelta(days=365 * years)
+    rows = [
+        f"{(start + timedelta(days=d)).isoformat()},{code},{rnd.uniform(0.01, 500):.4f}"
+        for d in range(365 * years)
+        for code in codes
+    ]
+    if shuffle:
+        rnd.shuffle(rows)
+    path.write_text("date,currency,rate_to_rub\n" + "\n".join(rows) + "\n", encoding="utf-8")
+    return len(rows)
+
+
+def measure(years: int, currencies: int, shuffle: bool) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "history.csv"
+        rows = write_history(path, years, currencies, shuffle)
+        loads = []
+        for _ in range(3):
+            started = time.perf_counter()
+            history = CsvRateHistoryLoader(path).load()
+            loads.append(time.perf_counter() - started)
+
+    conv = CurrencyConverter(Rates(rate_to_rub={"RUB": 1.0}), history)
+    rnd = random.Random(1)
+    codes = history.currencies
+    first = date(2026, 1, 1) - timedelta(days=365 * years)
+    queries = [
+        (rnd.choice(codes), rnd.choice(codes), first + timedelta(days=rnd.randrange(365 * years)))
+        for _ in range(10_000)
+    ]
+
+    def run() -> None:
+        for f, t, day in queries:
+            conv.convert(100, f, t, as_of=day)
+
+    per_call = min(timeit.repeat(run, number=1, repeat=5)) / len(queries)
+    return {
+        "layout": "shuffled" if shuffle else "by date",
+        "rows": rows,
+        "load_s": round(min(loads), 3),
+        "convert_as_of_us": round(per_call * 1e6, 2),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--years", type=int, default=10)
+    parser.add_argument("--currencies", type=int, default=160)
+    args = parser.parse_args()
+    results = [measure(args.years, args.currencies, shuffle) for shuffle in (False, True)]
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+Serving keep-alive clients while thousands of idle connections are open.
+
+Opens --idle connections that send nothing, then runs a closed loop of
+keep-alive clients against GET /health and POST /operations.
+
+    python -m benchmarks.bench_idle_connections --mode async --idle 2000
+"""
+from __future__ import annotations
+
+import argparse
+import http.client
+import json
+import socket
+import threading
+
+from benchmarks.common import closed_loop, server_process
+
+BODY = json.dumps({"from": "USD", "to": "RUB", "amount": 10}).encode("utf-8")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--mode", default="async")
+    parser.add_argument("--idle", type=int, default=2000)
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=3.0)
+    args = parser.parse_args()
+
+    with server_process(mode=args.mode) as port:
+        idle = [socket.create_connection(("127.0.0.1", port)) for _ in range(args.idle)]
+        local = threading.local()
+
+        def call() -> None:
+            conn = getattr(local, "conn", None)
+            if conn is None:
+                conn = local.conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+            conn.request("POST", "/operations", body=BODY, headers={"Content-Type": "application/json"})
+            resp = conn.getresponse()
+            resp.read()
+            if resp.status != 200:
+                raise RuntimeError(resp.status)
+
+        try:
+            res = closed_loop(call, args.clients, args.duration)
+        finally:
+            for sock in idle:
+                sock.close()
+
+    res["idle_connections"] = args.idle
+    print(json.dumps(res, indent=2))
+
+
+if __name__ == "__main__":
+    main()
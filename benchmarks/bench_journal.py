@@ -0,0 +1,122 @@
+"""
+Operation journal: recovery time by history size, startup after a long uptime (everything
+written by one running log, with and without compaction) and cost of add() with the journal on.
+
+    python -m benchmarks.bench_journal --sizes 100000 1000000 --tail 10000
+    python -m benchmarks.bench_journal --storage columnar --sizes 10000000 --uptime 2000000
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import tempfile
+import threading
+import time
+from array import array
+from pathlib import Path
+
+from app.journal import COMPACT_BYTES, SNAPSHOT_NAME, Journal, write_snapshot
+from app.operations import ColumnarStore, Columns, OperationLog
+
+
+def make_history(directory: Path, size: int, tail: int, storage: str = "list") -> None:
+    """Snapshot with `size - tail` operations plus a journal tail of `tail` operations."""
+    n = size - tail
+    seed = ColumnarStore()
+    seed.load(Columns(
+        codes=["USD", "RUB"],
+        ids=os.urandom(16 * n),
+        ts=array("q", range(1_760_000_000_000_000, 1_760_000_000_000_000 + n)),
+        from_idx=array("H", [0]) * n,
+        to_idx=array("H", [1]) * n,
+        amount=array("d", [100.0]) * n,
+        rate=array("d", [78.65]) * n,
+        result=array("d", [7865.0]) * n,
+    ))
+    write_snapshot(directory / SNAPSHOT_NAME, 1, seed.columns())
+    del seed
+
+    log = OperationLog(Journal(directory, synchronous=False, compact_bytes=None), storage=storage)
+    log.add_many(("EUR", "RUB", i + 1.0, 90.0, (i + 1) * 90.0) for i in range(tail))
+    log.close()
+
+
+def recovery(size: int, tail: int, storage: str) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        directory = Path(tmp)
+        make_history(directory, size, tail, storage)
+        started = time.perf_counter()
+        log = OperationLog(Journal(directory), storage=storage)
+        elapsed = time.perf_counter() - started
+        assert log.count() == size
+        log.close()
+    return {"storage": storage, "size": size, "tail": tail, "recovery_s": round(elapsed, 3)}
+
+
+def uptime(size: int, storage: str, compact_bytes: int | None) -> dict:
+    """Startup after one process wrote `size` operations; without compaction all of them are the tail."""
+    with tempfile.TemporaryDirectory() as tmp:
+        directory = Path(tmp)
+        journal = Journal(directory, synchronous=False, compact_bytes=compact_bytes)
+        log = OperationLog(journal, storage=storage)
+        for start in range(0, size, 1000):
+            log.add_many(("USD", "RUB", i + 1.0, 78.65, (i + 1) * 78.65) for i in range(start, min(size, start + 1000)))
+        log.close()
+        tail_bytes = os.path.getsize(journal.journal_path)
+        started = time.perf_counter()
+        log = OperationLog(Journal(directory), storage=storage)
+        elapsed = time.perf_counter() - started
+        assert log.count() == size
+        log.close()
+    return {
+        "storage": storage, "size": size, "compact_bytes": compact_bytes,
+        "compactions": journal.compactions, "tail_mb": round(tail_bytes / 2**20, 1), "recovery_s": round(elapsed, 3),
+    }
+
+
+def add_rate(journal: str, threads: int, per_thread: int) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        if journal == "none":
+            log = OperationLog()
+        else:
+            log = OperationLog(Journal(tmp, synchronous=journal == "sync"))
+
+        def work() -> None:
+            for i in range(per_thread):
+                log.add("USD", "RUB", i + 1, 78.65, (i + 1) * 78.65)
+
+        workers = [threading.Thread(target=work) for _ in range(threads)]
+        started = time.perf_counter()
+        for t in workers:
+            t.start()
+        for t in workers:
+            t.join()
+        log.close()
+        elapsed = time.perf_counter() - started
+    return {"journal": journal, "threads": threads, "adds_per_s": round(threads * per_thread / elapsed)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--tail", type=int, default=10_000)
+    parser.add_argument("--uptime", type=int, default=1_000_000, help="operations written before the restart")
+    parser.add_argument("--adds", type=int, default=2_000)
+    parser.add_argument("--storage", choices=["list", "columnar"], default="list")
+    args = parser.parse_args()
+
+    results = {
+        "recovery": [recovery(size, min(args.tail, size), args.storage) for size in args.sizes],
+        "uptime": [uptime(args.uptime, args.storage, compact) for compact in (None, COMPACT_BYTES)],
+        "add": [
+            add_rate(journal, threads, args.adds // threads)
+            for journal in ("none", "async", "sync")
+            for threads in (1, 8)
+        ],
+    }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
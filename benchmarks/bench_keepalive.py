@@ -0,0 +1,61 @@
+"""
+Requests per second with a new TCP connection per request vs one reused
+(keep-alive) connection per client, for GET /health and POST /operations.
+
+    python -m benchmarks.bench_keepalive --mode threaded --clients 4 --duration 3
+"""
+from __future__ import annotations
+
+import argparse
+import http.client
+import json
+import threading
+from functools import partial
+
+from benchmarks.common import closed_loop, server_process
+
+BODY = json.dumps({"from": "USD", "to": "RUB", "amount": 10}).encode("utf-8")
+HEADERS = {"Content-Type": "application/json"}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--mode", default="threaded")
+    parser.add_argument("--clients", type=int, default=4)
+    parser.add_argument("--duration", type=float, default=3.0)
+    args = parser.parse_args()
+
+    results = []
+    with server_process(mode=args.mode) as port:
+        local = threading.local()
+
+        def send(conn: http.client.HTTPConnection, method: str, path: str) -> None:
+            conn.request(method, path, body=BODY if method == "POST" else None, headers=HEADERS)
+            resp = conn.getresponse()
+            resp.read()
+            if resp.status != 200:
+                raise RuntimeError(resp.status)
+
+        def fresh(method: str, path: str) -> None:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+            try:
+                send(conn, method, path)
+            finally:
+                conn.close()
+
+        def reused(method: str, path: str) -> None:
+            conn = getattr(local, "conn", None)
+            if conn is None:
+                conn = local.conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+            send(conn, method, path)
+
+        for method, path in (("GET", "/health"), ("POST", "/operations")):
+            for name, call in (("new_connection", fresh), ("keep_alive", reused)):
+                stats = closed_loop(partial(call, method, path), args.clients, args.duration)
+                results.append({"request": f"{method} {path}", "connection": name, **stats})
+
+    print(json.dumps({"mode": args.mode, "clients": args.clients, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
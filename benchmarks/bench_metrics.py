@@ -0,0 +1,42 @@
+"""
+Per-request cost of the metrics instrumentation: route label, two clock reads
+and Metrics.observe, plus the cost of rendering GET /metrics.
+
+    python -m benchmarks.bench_metrics
+"""
+from __future__ import annotations
+
+import json
+import time
+import timeit
+
+from app.metrics import Metrics
+from app.server import _route
+
+
+def main() -> None:
+    metrics = Metrics()
+    targets = ["/health", "/operations?limit=100", "/operations/2f1c6a5e", "/operations"] * 250
+
+    def instrumented() -> None:
+        for target in targets:
+            start = time.perf_counter_ns()
+            metrics.observe("GET", _route(target), 200, time.perf_counter_ns() - start)
+
+    per_request_us = min(timeit.repeat(instrumented, number=20, repeat=5)) / 20 / len(targets) * 1e6
+    pairs = [("USD", "RUB")]
+    conversion_us = min(timeit.repeat(lambda: metrics.count_conversions(pairs), number=20_000, repeat=5)) / 20_000 * 1e6
+
+    for i in range(150):
+        metrics.count_conversions([(f"C{i:03d}", "RUB")])
+    render_ms = min(timeit.repeat(metrics.render, number=50, repeat=5)) / 50 * 1e3
+
+    print(json.dumps({
+        "per_request_us": round(per_request_us, 2),
+        "count_conversion_us": round(conversion_us, 2),
+        "render_ms": round(render_ms, 3),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
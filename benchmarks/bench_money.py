@@ -0,0 +1,96 @@
+"""
+Conversion arithmetic: the float engine (float division, round()), the fixed-point engine
+(app.money, integers) and the same exact rules done with decimal.Decimal; per call and
+for a batch (convert_many). Also counts amounts where float round() differs from exact
+half-up rounding.
+
+    python -m benchmarks.bench_money --calls 20000
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import timeit
+from decimal import ROUND_HALF_UP, Decimal
+
+from app.converter import ConversionResult, CurrencyConverter
+from app.money import FixedPointEngine
+from app.rates import Rates
+
+_RATE_STEP = Decimal("1e-6")
+_CENT = Decimal("0.01")
+
+
+def decimal_convert(rates: Rates, amount: float, from_currency: str, to_currency: str) -> ConversionResult:
+    """Fixed engine rules with Decimal: rate to 6 digits, result to cents, half-up."""
+    f, t = rates.normalize(from_currency), rates.normalize(to_currency)
+    rate = (Decimal(repr(rates.rate_to_rub[f])) / Decimal(repr(rates.rate_to_rub[t]))).quantize(_RATE_STEP, ROUND_HALF_UP)
+    result = (Decimal(repr(float(amount))) * rate).quantize(_CENT, ROUND_HALF_UP)
+    return ConversionResult(f, t, float(amount), float(rate), float(result))
+
+
+def _us(fn, number: int = 5) -> float:
+    return min(timeit.repeat(fn, number=number, repeat=5)) / number * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--currencies", type=int, default=150)
+    parser.add_argument("--calls", type=int, default=20_000)
+    args = parser.parse_args()
+
+    rnd = random.Random(0)
+    codes = ["RUB"] + [f"C{i:03d}" for i in range(args.currencies - 1)]
+    # курсы как в CSV: до 4 знаков после запятой
+    rates = Rates(rate_to_rub={c: 1.0 if c == "RUB" else round(rnd.uniform(0.01, 500), 4) for c in codes})
+    items = [(round(rnd.uniform(1, 10_000), 2), rnd.choice(codes), rnd.choice(codes)) for _ in range(args.calls)]
+
+    float_conv = CurrencyConverter(rates)
+    fixed_conv = CurrencyConverter(rates, engine="fixed")
+    for item in items[:1000]:
+        assert fixed_conv.convert(*item) == decimal_convert(rates, *item)
+
+    n = len(items)
+    per_call = {
+        "float": _us(lambda: [float_conv.convert(*i) for i in items]) / n,
+        "fixed": _us(lambda: [fixed_conv.convert(*i) for i in items]) / n,
+        "decimal": _us(lambda: [decimal_convert(rates, *i) for i in items]) / n,
+    }
+    # в реальных пакетах пар немного: суммы одной пары считаются вместе
+    few = [(a, codes[i % 5], "RUB") for i, (a, _, _) in enumerate(items)]
+    batch = {
+        "float": _us(lambda: float_conv.convert_many(items)) / n,
+        "fixed": _us(lambda: fixed_conv.convert_many(items)) / n,
+        "float_5_pairs": _us(lambda: float_conv.convert_many(few)) / n,
+        "fixed_5_pairs": _us(lambda: fixed_conv.convert_many(few)) / n,
+    }
+
+    # только арифметика: колонка сумм по одному курсу
+    amounts = [a for a, _, _ in items]
+    engine = FixedPointEngine("half_up")  # то же, что у CurrencyConverter(engine="fixed")
+    rate_float, rate_dec = 92.5 / 1.3, Decimal("71.153846")
+    scaled = engine.rate(92.5, 1.3)
+    column = {
+        "float_round": _us(lambda: [round(a * rate_float, 2) for a in amounts]) / n,
+        "fixed_convert_many": _us(lambda: engine.convert_many(amounts, scaled)) / n,
+        "decimal_quantize": _us(lambda: [(Decimal(repr(a)) * rate_dec).quantize(_CENT, ROUND_HALF_UP) for a in amounts]) / n,
+    }
+
+    # суммы вида x.xx5 при курсе 1: float round() ошибается там, где двоичная дробь чуть меньше
+    halves = [i / 1000 for i in range(5, 100_000, 10)]
+    same = CurrencyConverter(Rates(rate_to_rub={"RUB": 1.0}), engine="fixed")
+    differ = sum(1 for a in halves if round(a, 2) != same.convert(a, "RUB", "RUB").result)
+
+    print(json.dumps({
+        "calls": n,
+        "us_per_call": {k: round(v, 3) for k, v in per_call.items()},
+        "us_per_item_convert_many": {k: round(v, 3) for k, v in batch.items()},
+        "us_per_amount_one_rate": {k: round(v, 3) for k, v in column.items()},
+        "half_cent_amounts": len(halves),
+        "float_round_differs_from_half_up": differ,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
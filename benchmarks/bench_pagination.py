@@ -0,0 +1,51 @@
+"""
+Cost of one GET /operations page (limit=10) deep in the history, by log size:
+the previous list() (copies the whole tail), offset paging and cursor paging.
+
+    python -m benchmarks.bench_pagination --sizes 10000 100000 1000000
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import timeit
+from functools import partial
+
+from app.operations import OperationLog
+
+
+def tail_copy_list(items: list, limit: int, offset: int) -> list:
+    """OperationLog.list before cursor paging, on a plain list of the operations: slices the tail, then the page."""
+    tail = items[offset:]
+    return list(tail[:limit])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--limit", type=int, default=10)
+    args = parser.parse_args()
+
+    results = []
+    for size in args.sizes:
+        log = OperationLog()
+        log.add_many(("USD", "RUB", i + 1, 1.0, i + 1) for i in range(size))
+        offset = size // 10  # страница в начале истории: хвост почти весь лог
+        cursor = log.list(limit=1, offset=offset - 1)[0].id
+        items = log.list()
+
+        def us(fn) -> float:
+            return round(min(timeit.repeat(fn, number=50, repeat=5)) / 50 * 1e6, 2)
+
+        results.append({
+            "size": size,
+            "tail_copy_us": us(partial(tail_copy_list, items, args.limit, offset)),
+            "offset_page_us": us(partial(log.page, limit=args.limit, offset=offset)),
+            "cursor_page_us": us(partial(log.page, limit=args.limit, after=cursor)),
+        })
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Throughput of the pre-fork server (--processes N) for N = 1..8, against the
+single-process threaded server with the history in the same process.
+Scaling only shows on a multi-core host; with one CPU the run measures the IPC cost.
+
+    python -m benchmarks.bench_prefork --clients 16 --duration 3
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import multiprocessing as mp
+import os
+import socket
+import time
+
+from benchmarks.common import RATES_PATH, closed_loop, request, server_process
+
+BODY = {"from": "USD", "to": "RUB", "amount": 10}
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_for(port: int, timeout: float = 10.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError(f"server did not start on port {port}")
+
+
+def _run_prefork(port: int, processes: int) -> None:
+    from app.prefork import run_prefork_server
+
+    run_prefork_server("127.0.0.1", port, RATES_PATH, processes=processes, mode="threaded")
+
+
+def measure(port: int, clients: int, duration: float) -> dict:
+    def post() -> None:
+        status, _ = request(port, "POST", "/operations", BODY)
+        if status != 200:
+            raise RuntimeError(status)
+
+    def get() -> None:
+        status, _ = request(port, "GET", "/operations?limit=10")
+        if status != 200:
+            raise RuntimeError(status)
+
+    result = {}
+    for name, call in (("post", post), ("get", get)):
+        stats = closed_loop(call, clients, duration)
+        result[f"{name}_rps"] = stats["rps"]
+        result[f"{name}_p99_ms"] = stats["p99_ms"]
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=3.0)
+    parser.add_argument("--processes", default="1,2,4,8")
+    args = parser.parse_args()
+
+    results = []
+    with server_process("threaded") as port:
+        results.append({"processes": "threaded, log in process", **measure(port, args.clients, args.duration)})
+
+    for n in map(int, args.processes.split(",")):
+        port = _free_port()
+        proc = mp.get_context("fork").Process(target=_run_prefork, args=(port, n))
+        proc.start()
+        try:
+            _wait_for(port)
+            results.append({"processes": n, **measure(port, args.clients, args.duration)})
+        finally:
+            proc.terminate()
+            proc.join()
+
+    print(json.dumps({"cpus": os.cpu_count(), "clients": args.clients, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
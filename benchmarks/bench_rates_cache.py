@@ -0,0 +1,73 @@
+"""
+Rates loading: parsing the CSV (cold, the binary cache is written) vs reading
+the binary cache (warm, the CSV is unchanged).
+
+    python -m benchmarks.bench_rates_cache --rows 10000 100000 1000000
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from app.rates import CsvRatesLoader
+
+
+def write_csv(path: Path, rows: int) -> None:
+    rnd = random.Random(rows)
+    lines = ["currency,rate_to_rub", "RUB,1"]
+    lines += [f"c{i:07d},{rnd.uniform(0.01, 500):.6f}" for i in range(rows - 1)]
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+
+def best_of(fn, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - started)
+    return min(times)
+
+
+def measure(rows: int, repeat: int) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = Path(tmp) / "rates.csv"
+        cache_path = Path(tmp) / "rates.cache"
+        write_csv(csv_path, rows)
+        loader = CsvRatesLoader(csv_path, cache_path=cache_path)
+
+        no_cache = best_of(CsvRatesLoader(csv_path).load, repeat)
+
+        def cold() -> None:
+            cache_path.unlink(missing_ok=True)
+            loader.load()
+
+        cold_s = best_of(cold, repeat)
+        warm_s = best_of(loader.load, repeat)
+        # копия файла: mtime другой, кэш подтверждается хешем содержимого
+        os.utime(csv_path)
+        touched_s = best_of(loader.load, repeat)
+        assert loader.load().rate_to_rub == CsvRatesLoader(csv_path).load().rate_to_rub
+    return {
+        "rows": rows,
+        "csv_s": round(no_cache, 4),
+        "cold_s": round(cold_s, 4),
+        "warm_s": round(warm_s, 4),
+        "touched_s": round(touched_s, 4),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    print(json.dumps([measure(rows, args.repeat) for rows in args.rows], indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+GET /operations polling: a fresh encode per request (cache miss), the cached bytes,
+and a conditional GET answered with 304.
+
+    python -m benchmarks.bench_response_cache --history 10000 --duration 3
+"""
+from __future__ import annotations
+
+import argparse
+import http.client
+import itertools
+import json
+from functools import partial
+
+from benchmarks.common import closed_loop, request, server_process
+
+
+def get(port: int, path: str, etag: str | None = None) -> tuple[int, str | None]:
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    try:
+        conn.request("GET", path, headers={"If-None-Match": etag} if etag else {})
+        resp = conn.getresponse()
+        resp.read()
+        return resp.status, resp.getheader("ETag")
+    finally:
+        conn.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--history", type=int, default=10_000)
+    parser.add_argument("--duration", type=float, default=3.0)
+    parser.add_argument("--clients", type=int, default=1)
+    args = parser.parse_args()
+
+    results = []
+    with server_process("threaded") as port:
+        for _ in range(args.history // 1000):
+            status, _ = request(port, "POST", "/operations/batch", [{"from": "USD", "to": "RUB", "amount": 1}] * 1000)
+            assert status == 200
+
+        for path in ("/operations?limit=100", "/operations"):
+            counter = itertools.count()
+            _, etag = get(port, path)
+            sep = "&" if "?" in path else "?"
+            # лишний параметр в запросе даёт новый ключ кэша: каждый раз кодирование заново
+            miss = closed_loop(
+                lambda path=path, sep=sep, counter=counter: get(port, f"{path}{sep}n={next(counter)}"),
+                args.clients, args.duration,
+            )
+            hit = closed_loop(partial(get, port, path), args.clients, args.duration)
+            not_modified = closed_loop(partial(get, port, path, etag), args.clients, args.duration)
+            assert get(port, path, etag)[0] == 304
+            results.append({
+                "path": path,
+                "miss_rps": miss["rps"], "miss_p50_ms": miss["p50_ms"],
+                "hit_rps": hit["rps"], "hit_p50_ms": hit["p50_ms"],
+                "304_rps": not_modified["rps"], "304_p50_ms": not_modified["p50_ms"],
+            })
+
+    print(json.dumps({"history": args.history, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
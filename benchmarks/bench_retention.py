@@ -0,0 +1,60 @@
+"""
+Sustained adds with and without retention: add() cost and traced memory
+after every block of adds (it should stop growing with --max-records).
+
+    python -m benchmarks.bench_retention --adds 500000 --max-records 100000
+"""
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import time
+import tracemalloc
+
+from app.operations import STORAGES, OperationLog
+
+
+def run(storage: str, adds: int, blocks: int, **retention) -> dict:
+    gc.collect()
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    log = OperationLog(storage=storage, **retention)
+    memory_mb = []
+    for _ in range(blocks):
+        for i in range(adds // blocks):
+            log.add("USD", "RUB", i + 1, 78.05, 78.05 * (i + 1))
+        gc.collect()
+        memory_mb.append(round((tracemalloc.get_traced_memory()[0] - base) / 1e6, 1))
+    tracemalloc.stop()
+    # tracemalloc замедляет выделения, поэтому время add считаем отдельным проходом
+    log = OperationLog(storage=storage, **retention)
+    started = time.perf_counter()
+    for i in range(adds):
+        log.add("USD", "RUB", i + 1, 78.05, 78.05 * (i + 1))
+    add_us = (time.perf_counter() - started) / adds * 1e6
+    return {"count": log.count(), "add_us": round(add_us, 2), "memory_mb_by_block": memory_mb}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--adds", type=int, default=500_000)
+    parser.add_argument("--blocks", type=int, default=5)
+    parser.add_argument("--max-records", type=int, default=100_000)
+    parser.add_argument("--max-age", type=float, default=3600.0)
+    args = parser.parse_args()
+
+    results = []
+    for storage in sorted(STORAGES):
+        for name, retention in (
+            ("unbounded", {}),
+            ("max_records", {"max_records": args.max_records}),
+            ("max_records+max_age", {"max_records": args.max_records, "max_age": args.max_age}),
+        ):
+            results.append({"storage": storage, "retention": name, **run(storage, args.adds, args.blocks, **retention)})
+
+    print(json.dumps({"adds": args.adds, "max_records": args.max_records, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
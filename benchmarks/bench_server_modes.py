@@ -0,0 +1,82 @@
+"""
+Throughput of the server modes (single / threaded / pool).
+
+Two scenarios per mode:
+- fast: N clients doing POST /operations back to back;
+- slow: the same load plus a few clients that trickle their request body
+  (a slow network), which stalls the single-threaded server.
+
+    python -m benchmarks.bench_server_modes --clients 8 --duration 3
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import socket
+import threading
+import time
+
+from benchmarks.common import closed_loop, request, server_process
+
+BODY = {"from": "USD", "to": "RUB", "amount": 10}
+
+
+def _slow_client(port: int, stop: threading.Event, delay: float) -> None:
+    body = json.dumps(BODY).encode("utf-8")
+    head = (
+        "POST /operations HTTP/1.0\r\n"
+        "Content-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\n\r\n"
+    ).encode("ascii")
+    while not stop.is_set():
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=30) as sock:
+                sock.sendall(head)
+                time.sleep(delay)
+                sock.sendall(body)
+                while sock.recv(65536):
+                    pass
+        except OSError:
+            return  # сервер остановлен
+
+
+def run(mode: str, clients: int, duration: float, slow_clients: int, slow_delay: float, workers: int) -> dict:
+    with server_process(mode=mode, workers=workers) as port:
+        def call() -> None:
+            status, _ = request(port, "POST", "/operations", BODY)
+            if status != 200:
+                raise RuntimeError(status)
+
+        stop = threading.Event()
+        slow = [
+            threading.Thread(target=_slow_client, args=(port, stop, slow_delay), daemon=True)
+            for _ in range(slow_clients)
+        ]
+        for t in slow:
+            t.start()
+        try:
+            return closed_loop(call, clients, duration)
+        finally:
+            stop.set()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=3.0)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--slow-clients", type=int, default=2)
+    parser.add_argument("--slow-delay", type=float, default=0.05)
+    args = parser.parse_args()
+
+    results = {}
+    for mode in ("single", "threaded", "pool"):
+        for scenario, slow in (("fast", 0), ("slow", args.slow_clients)):
+            res = run(mode, args.clients, args.duration, slow, args.slow_delay, args.workers)
+            results[f"{mode}/{scenario}"] = res
+            print(f"{mode:>8} {scenario:>4}: {res['rps']:>8} req/s  p50={res['p50_ms']}ms  p99={res['p99_ms']}ms")
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
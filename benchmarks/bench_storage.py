@@ -0,0 +1,69 @@
+"""
+Operation history storages: memory per operation, add() rate, get() by id and page reads.
+
+    python -m benchmarks.bench_storage --size 1000000
+"""
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import random
+import time
+import tracemalloc
+
+from app.operations import STORAGES, OperationLog
+
+
+def measure(storage: str, size: int, lookups: int) -> dict:
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    log = OperationLog(storage=storage)
+    for i in range(size):
+        log.add("USD", "RUB", i + 1, 78.65, (i + 1) * 78.65)
+    gc.collect()
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+
+    # отдельный проход без tracemalloc: он сильно замедляет выделения
+    del log
+    gc.collect()
+    log = OperationLog(storage=storage)
+    started = time.perf_counter()
+    for i in range(size):
+        log.add("USD", "RUB", i + 1, 78.65, (i + 1) * 78.65)
+    add_s = time.perf_counter() - started
+
+    ids = [op.id for op in random.sample(log.list(), min(lookups, size))]
+    started = time.perf_counter()
+    for op_id in ids:
+        log.get(op_id)
+    get_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for offset in range(0, min(size, 100 * lookups), 100):
+        log.list(limit=100, offset=offset)
+    page_s = time.perf_counter() - started
+    pages = len(range(0, min(size, 100 * lookups), 100))
+
+    return {
+        "storage": storage,
+        "size": size,
+        "bytes_per_op": round(used / size),
+        "add_us": round(add_s / size * 1e6, 2),
+        "get_us": round(get_s / len(ids) * 1e6, 2),
+        "page100_us": round(page_s / pages * 1e6, 1),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", type=int, default=200_000)
+    parser.add_argument("--lookups", type=int, default=10_000)
+    args = parser.parse_args()
+    print(json.dumps([measure(storage, args.size, args.lookups) for storage in STORAGES], indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Fan-out of new operations to stream subscribers at the log level: cost of OperationLog.add
+by number of subscribers (each drained by its own thread, as GET /operations/stream does),
+and a subscriber that never reads: it is dropped after max_pending operations and add
+keeps its speed, with memory bounded by the buffer.
+
+    python -m benchmarks.bench_stream --subscribers 0,1,10,100
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import threading
+import time
+
+from app.operations import OperationLog, SubscriberDroppedError, SubscriptionClosedError
+
+
+def _drain(sub, received: list[int], i: int) -> None:
+    try:
+        while True:
+            received[i] += len(sub.get(1.0))
+    except SubscriptionClosedError:
+        pass
+
+
+def _add_us(log: OperationLog, n: int) -> float:
+    started = time.perf_counter()
+    for _ in range(n):
+        log.add("USD", "RUB", 10.0, 78.05, 780.5)
+    return (time.perf_counter() - started) / n * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--subscribers", default="0,1,10,100")
+    parser.add_argument("--operations", type=int, default=20_000)
+    args = parser.parse_args()
+
+    results = []
+    for count in map(int, args.subscribers.split(",")):
+        log = OperationLog(max_records=100_000)
+        received = [0] * count
+        threads = [
+            threading.Thread(target=_drain, args=(log.subscribe(args.operations), received, i), daemon=True)
+            for i in range(count)
+        ]
+        for t in threads:
+            t.start()
+        add_us = _add_us(log, args.operations)
+        started = time.perf_counter()
+        while sum(received) < count * args.operations and time.perf_counter() - started < 30:
+            time.sleep(0.01)
+        log.close()  # закрывает подписки, потоки выходят
+        for t in threads:
+            t.join()
+        results.append({
+            "subscribers": count,
+            "add_us": round(add_us, 2),
+            "delivered": sum(received),
+            "expected": count * args.operations,
+        })
+
+    # подписчик, который не читает: буфер 1000, дальше отключение
+    log = OperationLog(max_records=100_000)
+    stalled = log.subscribe(1000)
+    add_us = _add_us(log, args.operations)
+    try:
+        stalled.get(0)
+        dropped = False
+    except SubscriberDroppedError:
+        dropped = True
+
+    print(json.dumps({
+        "operations": args.operations,
+        "results": results,
+        "stalled_subscriber": {"add_us": round(add_us, 2), "dropped": dropped},
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
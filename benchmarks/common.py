@@ -0,0 +1,125 @@
+"""Shared helpers for the benchmark scripts (run them with `python -m benchmarks.<name>`)."""
+from __future__ import annotations
+
+import http.client
+import json
+import multiprocessing as mp
+import threading
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from pathlib import Path
+
+RATES_PATH = str(Path(__file__).resolve().parent.parent / "data" / "rates.csv")
+
+
+def _serve(conn, rates_path: str, mode: str, workers: int, options: dict) -> None:
+    from app.server import AppState, make_server
+
+    if mode == "async":
+        _serve_async(conn, AppState(rates_path))
+        return
+
+    server = make_server(AppState(rates_path), "127.0.0.1", 0, mode=mode, workers=workers, **options)
+    conn.send(server.server_address[1])
+    conn.close()
+    server.serve_forever()
+
+
+def _serve_async(conn, state) -> None:
+    import asyncio
+
+    from app.aioserver import AsyncHTTPServer
+
+    async def main() -> None:
+        server = await AsyncHTTPServer(state).start("127.0.0.1", 0)
+        conn.send(server.sockets[0].getsockname()[1])
+        conn.close()
+        await server.serve_forever()
+
+    asyncio.run(main())
+
+
+@contextmanager
+def server_process(
+    mode: str = "single", workers: int = 8, rates_path: str = RATES_PATH, **options
+) -> Iterator[int]:
+    """
+    Starts the server in a child process on an ephemeral port and yields the port.
+    mode is one of app.server.SERVER_MODES or "async" (app.aioserver);
+    options go to make_server (e.g. max_in_flight).
+    """
+    parent, child = mp.Pipe()
+    proc = mp.Process(target=_serve, args=(child, rates_path, mode, workers, options), daemon=True)
+    proc.start()
+    try:
+        port = parent.recv()
+        yield port
+    finally:
+        proc.terminate()
+        proc.join()
+
+
+def request(port: int, method: str, path: str, body: object | None = None) -> tuple[int, bytes]:
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    try:
+        data = json.dumps(body).encode("utf-8") if body is not None else None
+        headers = {"Content-Type": "application/json"} if data is not None else {}
+        conn.request(method, path, body=data, headers=headers)
+        resp = conn.getresponse()
+        return resp.status, resp.read()
+    finally:
+        conn.close()
+
+
+def closed_loop(call: Callable[[], object], clients: int, duration: float) -> dict:
+    """
+    Closed-loop load: `clients` threads call `call()` back to back for `duration` seconds.
+    Returns request count, throughput and latency percentiles (ms); a call that raises
+    OSError, HTTPException or RuntimeError (bad status) counts as an error.
+    """
+    latencies: list[float] = []
+    errors = 0
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def worker() -> None:
+        nonlocal errors
+        local: list[float] = []
+        failed = 0
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                call()
+            except (OSError, http.client.HTTPException, RuntimeError):
+                failed += 1
+                continue
+            local.append(time.perf_counter() - started)
+        with lock:
+            latencies.extend(local)
+            errors += failed
+
+    threads = [threading.Thread(target=worker) for _ in range(clients)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "seconds": round(elapsed, 3),
+        "rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+    }
+
+
+def percentile(sorted_values: list[float], p: float) -> float:
+    if not sorted_values:
+        return 0.0
+    idx = min(len(sorted_values) - 1, int(len(sorted_values) * p / 100))
+    return sorted_values[idx]
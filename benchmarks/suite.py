@@ -0,0 +1,176 @@
+"""
+Benchmark suite: microbenchmarks of the converter, the rates loader and the operation log,
+plus a closed-loop HTTP load against a server on an ephemeral port. Results go to JSON;
+with --baseline the run fails (exit code 1) when a metric is worse than the baseline
+by more than --threshold.
+
+    python -m benchmarks.suite --out before.json
+    python -m benchmarks.suite --baseline before.json --threshold 0.15 --out after.json
+    python -m benchmarks.suite --quick --only convert,load   # smaller sizes, some groups only
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import random
+import sys
+import tempfile
+import time
+import timeit
+from pathlib import Path
+
+from app.converter import CurrencyConverter
+from app.operations import STORAGES, OperationLog
+from app.rates import CsvRatesLoader, Rates
+from benchmarks.common import closed_loop, request, server_process
+
+# метрики, по которым работает порог; p99 на общей машине слишком шумный и только выводится
+GATED = ("ns_per_call", "ms_per_load", "us_per_page", "rps", "p50_ms")
+HIGHER_IS_BETTER = ("rps",)
+
+
+def _best(fn, number: int) -> float:
+    """Seconds per call, best of 5 runs."""
+    return min(timeit.repeat(fn, number=number, repeat=5)) / number
+
+
+def _codes(n: int) -> list[str]:
+    return ["RUB"] + [f"C{i:04d}" for i in range(n - 1)]
+
+
+def bench_convert(currencies: int, calls: int = 5000) -> dict:
+    rnd = random.Random(currencies)
+    codes = _codes(currencies)
+    rates = Rates(rate_to_rub={c: 1.0 if c == "RUB" else rnd.uniform(0.01, 500) for c in codes})
+    conv = CurrencyConverter(rates)
+    pairs = [(rnd.uniform(1, 1000), rnd.choice(codes), rnd.choice(codes)) for _ in range(calls)]
+    seconds = _best(lambda: [conv.convert(*p) for p in pairs], 5)
+    return {"ns_per_call": round(seconds / calls * 1e9)}
+
+
+def bench_load(rows: int, tmp: Path) -> dict:
+    rnd = random.Random(rows)
+    path = tmp / f"rates_{rows}.csv"
+    lines = ["currency,rate_to_rub"] + [f"{c},{rnd.uniform(0.01, 500):.6f}" for c in _codes(rows)]
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+    cache = tmp / f"rates_{rows}.cache"
+    CsvRatesLoader(path, cache_path=cache).load()
+    number = max(1, 20_000 // rows)
+    return {
+        "ms_per_load": round(_best(CsvRatesLoader(path).load, number) * 1e3, 3),
+        "ms_per_cached_load": round(_best(CsvRatesLoader(path, cache_path=cache).load, number) * 1e3, 3),
+    }
+
+
+def bench_log(size: int, storage: str, page: int = 100) -> dict:
+    log = OperationLog(storage=storage)
+    for start in range(0, size, 10_000):
+        log.add_many(("USD", "RUB", i + 1, 78.05, 78.05 * (i + 1)) for i in range(start, min(size, start + 10_000)))
+    middle = log.list(limit=1, offset=size // 2)[0].id
+    return {
+        "us_per_page": round(_best(lambda: log.list(limit=page, offset=size - page), 200) * 1e6, 1),
+        "us_per_cursor_page": round(_best(lambda: log.page(limit=page, after=middle), 200) * 1e6, 1),
+    }
+
+
+def bench_http(clients: int, duration: float, mode: str = "threaded") -> dict:
+    body = {"from": "USD", "to": "RUB", "amount": 10}
+    results = {}
+    with server_process(mode) as port:
+        def post() -> None:
+            status, _ = request(port, "POST", "/operations", body)
+            if status != 200:
+                raise RuntimeError(status)
+
+        def get() -> None:
+            status, _ = request(port, "GET", "/operations?limit=100")
+            if status != 200:
+                raise RuntimeError(status)
+
+        for name, call in (("post", post), ("get_page", get)):
+            stats = closed_loop(call, clients, duration)
+            results[name] = {k: stats[k] for k in ("rps", "p50_ms", "p99_ms", "errors")}
+    return results
+
+
+def run(quick: bool, only: set[str] | None, duration: float, clients: int) -> dict:
+    results: dict[str, dict] = {}
+
+    def wanted(group: str) -> bool:
+        return only is None or group in only
+
+    if wanted("convert"):
+        for n in (10, 150) if quick else (10, 150, 1000):
+            results[f"convert[currencies={n}]"] = bench_convert(n)
+    if wanted("load"):
+        with tempfile.TemporaryDirectory() as tmp:
+            for n in (200, 10_000) if quick else (200, 10_000, 200_000):
+                results[f"load[rows={n}]"] = bench_load(n, Path(tmp))
+    if wanted("log"):
+        for n in (1000, 100_000) if quick else (1000, 100_000, 1_000_000):
+            for storage in sorted(STORAGES):
+                results[f"log_list[size={n},storage={storage}]"] = bench_log(n, storage)
+    if wanted("http"):
+        for name, stats in bench_http(clients, duration).items():
+            results[f"http_{name}[clients={clients}]"] = stats
+    return results
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> list[str]:
+    """Gated metrics of `current` that are worse than `baseline` by more than threshold (0.1 = 10%)."""
+    regressions = []
+    for case, metrics in current.items():
+        old_metrics = baseline.get(case, {})
+        for name in GATED:
+            old, new = old_metrics.get(name), metrics.get(name)
+            if not old or new is None:
+                continue
+            if name in HIGHER_IS_BETTER:
+                change = (old - new) / old
+            else:
+                change = (new - old) / old
+            if change > threshold:
+                regressions.append(f"{case} {name}: {old} -> {new} ({change:+.0%} worse)")
+    return regressions
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark suite with a regression gate")
+    parser.add_argument("--out", help="write results to this JSON file")
+    parser.add_argument("--baseline", help="JSON file of an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed slowdown, 0.2 = 20%%")
+    parser.add_argument("--quick", action="store_true", help="smaller sizes")
+    parser.add_argument("--only", help="comma separated groups: convert,load,log,http")
+    parser.add_argument("--duration", type=float, default=3.0, help="seconds per HTTP scenario")
+    parser.add_argument("--clients", type=int, default=4, help="concurrent HTTP clients")
+    args = parser.parse_args(argv)
+
+    only = set(args.only.split(",")) if args.only else None
+    report = {
+        "meta": {
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "quick": args.quick,
+        },
+        "results": run(args.quick, only, args.duration, args.clients),
+    }
+    text = json.dumps(report, indent=2)
+    if args.out:
+        Path(args.out).write_text(text + "\n", encoding="utf-8")
+    print(text)
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))["results"]
+        regressions = compare(baseline, report["results"], args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,13 +1,19 @@
+import argparse
+import sys
+from contextlib import ExitStack
 from pathlib import Path
 
-from app.rates import CsvRatesLoader
-from app.converter import CurrencyConverter
+from app.bulk import FORMATS, BulkError, convert_stream, format_of
+from app.converter import ENGINES, CurrencyConverter
+from app.money import ROUNDING
 from app.operations import OperationLog
+from app.rates import CsvRatesLoader, InvalidRatesFileError
 
+BASE_DIR = Path(__file__).resolve().parent
 
-def main() -> None:
-    base_dir = Path(__file__).resolve().parent
-    rates_path = base_dir / "data" / "rates.csv"
+
+def demo() -> None:
+    rates_path = BASE_DIR / "data" / "rates.csv"
 
     rates = CsvRatesLoader(rates_path).load()
     converter = CurrencyConverter(rates)
@@ -29,5 +35,64 @@ def main() -> None:
         print(op.to_dict())
 
 
+def _positive_int(text: str) -> int:
+    try:
+        value = int(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid int value: {text!r}") from None
+    if value < 1:
+        raise argparse.ArgumentTypeError(f"must be >= 1, got {value}")
+    return value
+
+
+def bulk(args: argparse.Namespace) -> int:
+    in_fmt = args.input_format or format_of(args.input)
+    out_fmt = args.output_format or format_of(args.output, default=in_fmt)
+    try:
+        converter = CurrencyConverter(CsvRatesLoader(args.rates).load(), engine=args.engine, rounding=args.rounding)
+        with ExitStack() as stack:
+            source = sys.stdin if args.input == "-" else stack.enter_context(
+                open(args.input, encoding="utf-8", newline="")
+            )
+            target = sys.stdout if args.output == "-" else stack.enter_context(
+                open(args.output, "w", encoding="utf-8", newline="")
+            )
+            stats = convert_stream(
+                source, target, converter, in_fmt=in_fmt, out_fmt=out_fmt,
+                chunk_size=args.chunk_size, processes=args.processes, rates_path=args.rates,
+            )
+    except (BulkError, InvalidRatesFileError, OSError) as e:
+        print(f"Bulk conversion failed: {e}", file=sys.stderr)
+        return 1
+
+    print(
+        f"rows={stats.rows} errors={stats.errors} seconds={stats.seconds:.2f} "
+        f"rows_per_second={stats.rows_per_second:.0f}",
+        file=sys.stderr,
+    )
+    return 0
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Currency converter demo and bulk conversion")
+    commands = parser.add_subparsers(dest="command")
+    p = commands.add_parser("bulk", help="convert a CSV or NDJSON file of from,to,amount rows")
+    p.add_argument("input", help="input file, - for stdin")
+    p.add_argument("-o", "--output", default="-", help="output file, - for stdout (default)")
+    p.add_argument("--input-format", choices=FORMATS, help="default: by extension, csv for stdin")
+    p.add_argument("--output-format", choices=FORMATS, help="default: by extension, else as the input")
+    p.add_argument("--rates", default=str(BASE_DIR / "data" / "rates.csv"), help="path to rates CSV")
+    p.add_argument("--chunk-size", type=_positive_int, default=10_000, help="rows per chunk")
+    p.add_argument("--processes", type=_positive_int, default=1, help="convert chunks in N worker processes")
+    p.add_argument("--engine", choices=ENGINES, default="float", help="conversion arithmetic")
+    p.add_argument("--rounding", choices=sorted(ROUNDING), default="half_up", help="rounding of --engine fixed")
+    args = parser.parse_args(argv)
+
+    if args.command == "bulk":
+        return bulk(args)
+    demo()
+    return 0
+
+
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
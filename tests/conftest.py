@@ -0,0 +1,49 @@
+import socket
+import threading
+from pathlib import Path
+
+import pytest
+
+from app.server import AppState, make_server
+
+RATES = str(Path(__file__).resolve().parent.parent / "data" / "rates.csv")
+
+
+def free_port() -> int:
+    """A port that was free a moment ago, for a server that binds it itself (subprocess, event loop)."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def read_response(f) -> tuple[int, dict[str, str], bytes]:
+    """Reads one HTTP response from sock.makefile("rb"): status, headers (lower-case names), body."""
+    status_line = f.readline()
+    assert status_line, "connection closed"
+    status = int(status_line.split()[1])
+    headers = {}
+    while (line := f.readline()) not in (b"\r\n", b""):
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    body = f.read(int(headers.get("content-length", "0")))
+    return status, headers, body
+
+
+@pytest.fixture
+def served(request: pytest.FixtureRequest):
+    """
+    app.server on a free port, serving from a background thread: yields (state, port).
+    Parametrize indirectly with a mode name or a dict of make_server options; by default
+    threaded, a pool of 2 workers for "pool", idle_timeout 1 s.
+    """
+    param = getattr(request, "param", {})
+    options = {"mode": "threaded", "workers": 2, "idle_timeout": 1.0}
+    options.update({"mode": param} if isinstance(param, str) else param)
+    state = AppState(RATES)
+    server = make_server(state, "127.0.0.1", 0, **options)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield state, server.server_address[1]
+    server.shutdown()
+    server.server_close()
+    state.close()
@@ -0,0 +1,158 @@
+import json
+import socket
+import threading
+import time
+
+import pytest
+from conftest import RATES, read_response
+
+from app import server as server_mod
+from app.admission import EXEMPT, HEAVY, NORMAL, AdmissionController
+from app.server import AppState, make_server
+
+
+def _admit_in_thread(ac: AdmissionController, priority: int, results: list) -> threading.Thread:
+    t = threading.Thread(target=lambda: results.append((priority, ac.admit(priority))), daemon=True)
+    t.start()
+    return t
+
+
+def _wait_queued(ac: AdmissionController, n: int) -> None:
+    for _ in range(500):
+        if ac.queued == n:
+            return
+        time.sleep(0.01)
+    raise AssertionError(f"queued={ac.queued}, expected {n}")
+
+
+def test_limits_in_flight_and_queue() -> None:
+    ac = AdmissionController(2, max_queue=1, queue_timeout=5)
+    assert ac.admit() and ac.admit()
+    assert ac.in_flight == 2
+
+    results: list = []
+    waiter = _admit_in_thread(ac, NORMAL, results)
+    _wait_queued(ac, 1)
+    assert not ac.admit()  # очередь полна: отказ сразу
+    assert ac.rejected == 1
+
+    ac.release()
+    waiter.join(5)
+    assert results == [(NORMAL, True)]
+    assert ac.in_flight == 2 and ac.queued == 0
+    assert ac.admit(EXEMPT)  # проверки здоровья не ограничиваются
+    ac.release(EXEMPT)
+    assert ac.in_flight == 2
+
+
+def test_queue_deadline() -> None:
+    ac = AdmissionController(1, queue_timeout=0.05)
+    assert ac.admit()
+    started = time.monotonic()
+    assert not ac.admit()
+    assert time.monotonic() - started >= 0.05
+    assert ac.queued == 0 and ac.rejected == 1
+    ac.release()
+    assert ac.in_flight == 0
+
+    no_wait = AdmissionController(1, queue_timeout=0)
+    assert no_wait.admit(HEAVY)
+    assert not no_wait.admit()
+
+
+def test_normal_requests_go_before_heavy() -> None:
+    ac = AdmissionController(2, max_queue=4, queue_timeout=5, max_heavy=1)
+    assert ac.admit(HEAVY)
+    results: list = []
+    heavy = _admit_in_thread(ac, HEAVY, results)  # второй скан ждёт: тяжёлым только один слот
+    _wait_queued(ac, 1)
+    assert ac.admit(NORMAL)  # обычный запрос проходит мимо ждущего скана
+    normal = _admit_in_thread(ac, NORMAL, results)
+    _wait_queued(ac, 2)
+
+    ac.release(NORMAL)  # слот достаётся обычному запросу, хотя скан ждёт дольше
+    normal.join(5)
+    assert results == [(NORMAL, True)]
+    ac.release(HEAVY)
+    heavy.join(5)
+    assert results[1] == (HEAVY, True)
+    assert ac.in_flight == 2 and ac.heavy_in_flight == 1
+
+
+@pytest.mark.parametrize("kwargs", [
+    {"max_in_flight": 0},
+    {"max_in_flight": 1, "max_queue": -1},
+    {"max_in_flight": 1, "queue_timeout": -1},
+    {"max_in_flight": 2, "max_heavy": 3},
+])
+def test_invalid_limits(kwargs: dict) -> None:
+    with pytest.raises(ValueError):
+        AdmissionController(**kwargs)
+
+
+@pytest.fixture
+def slow_server(served, monkeypatch: pytest.MonkeyPatch):
+    """`served` with POST /operations waiting for `release`; yields (state, port, release)."""
+    release = threading.Event()
+    original = server_mod.Handler._post
+
+    def slow_post(self) -> None:
+        release.wait(5)
+        original(self)
+
+    monkeypatch.setattr(server_mod.Handler, "_post", slow_post)
+    state, port = served
+    yield state, port, release
+    release.set()
+
+
+def _send(port: int, request: bytes) -> socket.socket:
+    sock = socket.create_connection(("127.0.0.1", port), timeout=5)
+    sock.sendall(request)
+    return sock
+
+
+def _response(sock: socket.socket) -> tuple[int, dict[str, str], bytes]:
+    with sock.makefile("rb") as f:
+        return read_response(f)
+
+
+@pytest.mark.parametrize("served", [{"max_in_flight": 1, "max_queue": 0}], indirect=True)
+def test_overloaded_server_answers_503(slow_server) -> None:
+    state, port, release = slow_server
+    body = b'{"from":"USD","to":"RUB","amount":1}'
+    busy = _send(port, b"POST /operations HTTP/1.1\r\nHost: t\r\nContent-Length: %d\r\n\r\n" % len(body) + body)
+    for _ in range(500):
+        if state.metrics.render().find("admission_in_flight 1") >= 0:
+            break
+        time.sleep(0.01)
+
+    with _send(port, b"GET /operations HTTP/1.1\r\nHost: t\r\n\r\n") as sock:
+        status, headers, payload = _response(sock)
+    assert status == 503
+    assert headers["retry-after"] == "1"
+    assert headers["connection"] == "close"
+    assert json.loads(payload)["error"] == "overloaded"
+
+    with _send(port, b"GET /health HTTP/1.1\r\nHost: t\r\n\r\n") as sock:
+        assert _response(sock)[0] == 200  # здоровье отвечает и под нагрузкой
+
+    release.set()
+    assert _response(busy)[0] == 200
+    busy.close()
+    with _send(port, b"GET /operations HTTP/1.1\r\nHost: t\r\n\r\n") as sock:
+        assert _response(sock)[0] == 200
+    assert 'status="503"' in state.metrics.render()
+
+
+def test_admission_is_rejected_in_single_mode() -> None:
+    # single и так обслуживает по одному запросу: лимит только поднял бы backlog
+    state = AppState(RATES)
+    try:
+        with pytest.raises(ValueError, match="threaded"):
+            make_server(state, "127.0.0.1", 0, max_in_flight=2)
+    finally:
+        state.close()
+    with pytest.raises(SystemExit):
+        server_mod._parse_args(["--max-in-flight", "2"])
+    assert server_mod._parse_args(["--mode", "pool", "--max-in-flight", "2"]).max_in_flight == 2
@@ -0,0 +1,99 @@
+from pathlib import Path
+
+import pytest
+
+from app import operations as ops_mod
+from app.aggregates import Aggregates
+from app.journal import Journal
+from app.operations import STORAGES, OperationLog
+
+T0 = 1_767_225_600 * 1_000_000  # 2026-01-01T00:00:00Z в микросекундах
+MINUTE = 60 * 1_000_000
+
+
+def _pair(rows: list[dict], from_currency: str = "USD", to_currency: str = "RUB") -> dict:
+    return next(r for r in rows if (r["from"], r["to"]) == (from_currency, to_currency))
+
+
+def test_totals_and_buckets() -> None:
+    agg = Aggregates()
+    agg.add("USD", "RUB", 10, 90.0, 900.0, T0 + 1)
+    agg.add("USD", "RUB", 5, 92.0, 460.0, T0 + 2)
+    agg.add("USD", "RUB", 1, 89.0, 89.0, T0 + 3)
+    agg.add("EUR", "RUB", 1, 100.0, 100.0, T0 + MINUTE)  # следующая минута
+    agg.add("USD", "RUB", 2, 91.0, 182.0, T0 + 61 * MINUTE)  # следующий час
+
+    totals = agg.totals()
+    assert [(r["from"], r["to"]) for r in totals] == [("EUR", "RUB"), ("USD", "RUB")]
+    assert _pair(totals) == {
+        "from": "USD", "to": "RUB", "count": 4, "sum_amount": 18.0, "sum_result": 1631.0,
+        "min_rate": 89.0, "max_rate": 92.0,
+    }
+
+    minutes = agg.buckets("minute")
+    assert [b["start"] for b in minutes] == [
+        "2026-01-01T00:00:00+00:00", "2026-01-01T00:01:00+00:00", "2026-01-01T01:01:00+00:00",
+    ]
+    assert _pair(minutes[0]["pairs"])["count"] == 3
+    assert minutes[1]["pairs"] == [_pair(totals, "EUR")]
+
+    hours = agg.buckets("hour")
+    assert [b["start"] for b in hours] == ["2026-01-01T00:00:00+00:00", "2026-01-01T01:00:00+00:00"]
+    assert _pair(hours[0]["pairs"])["count"] == 3
+    assert _pair(hours[1]["pairs"])["count"] == 1  # открытая минута уже видна в своём часе
+
+    days = agg.buckets("day")
+    assert len(days) == 1
+    assert days[0]["pairs"] == totals
+
+
+def test_late_record_is_counted_once() -> None:
+    agg = Aggregates()
+    agg.add("USD", "RUB", 1, 90.0, 90.0, T0 + 2 * MINUTE)
+    agg.add("USD", "RUB", 1, 95.0, 95.0, T0)  # часы отстали, минута уже прошла
+    agg.add("USD", "RUB", 1, 80.0, 80.0, T0 + 3 * MINUTE)
+
+    assert _pair(agg.totals())["count"] == 3
+    assert _pair(agg.buckets("hour")[0]["pairs"]) == _pair(agg.totals())
+    assert [_pair(b["pairs"])["count"] for b in agg.buckets("minute")] == [1, 1, 1]
+    assert _pair(agg.totals())["min_rate"] == 80.0
+    assert _pair(agg.totals())["max_rate"] == 95.0
+
+
+def test_old_buckets_are_dropped(monkeypatch: pytest.MonkeyPatch) -> None:
+    from app import aggregates as agg_mod
+
+    monkeypatch.setitem(agg_mod.BUCKETS, "minute", (60, 3))
+    agg = Aggregates()
+    for i in range(5):
+        agg.add("USD", "RUB", 1, 90.0, 90.0, T0 + i * MINUTE)
+    assert len(agg.buckets("minute")) == 3
+    assert _pair(agg.totals())["count"] == 5  # часы и итоги не теряют выброшенные минуты
+    agg.clear()
+    assert agg.totals() == []
+    assert agg.buckets("hour") == []
+
+
+@pytest.mark.parametrize("storage", sorted(STORAGES))
+def test_log_keeps_aggregates(tmp_path: Path, storage: str, monkeypatch: pytest.MonkeyPatch) -> None:
+    now = [T0 * 1000]
+    monkeypatch.setattr(ops_mod.time, "time_ns", lambda: now[0])
+    log = OperationLog(Journal(tmp_path), storage=storage)
+    log.add("USD", "RUB", 10, 90.0, 900.0)
+    now[0] += 3600 * 10**9
+    log.add_many([("USD", "RUB", 1, r, r) for r in (91.0, 89.0, 93.0)] + [("EUR", "RUB", 2, 100.0, 200.0)])
+    expected = log.aggregates()
+    assert (_pair(expected)["count"], _pair(expected)["min_rate"], _pair(expected)["max_rate"]) == (4, 89.0, 93.0)
+    hours = log.aggregates("hour")
+    assert len(hours) == 2
+    with pytest.raises(ValueError):
+        log.aggregates("week")
+    log.close()
+
+    # после перезапуска агрегаты строятся заново по восстановленной истории
+    log = OperationLog(Journal(tmp_path), storage=storage)
+    assert log.aggregates() == expected
+    assert log.aggregates("hour") == hours
+    log.clear()
+    assert log.aggregates() == []
+    log.close()
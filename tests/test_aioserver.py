@@ -0,0 +1,111 @@
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+from conftest import free_port
+
+from app import aioserver
+from app.aioserver import MAX_BODY_BYTES, _serve
+from app.server import AppState
+
+ROOT = Path(__file__).resolve().parent.parent
+RATES = str(ROOT / "data" / "rates.csv")
+
+
+@pytest.fixture
+def async_port():
+    """app.aioserver on its own event loop in a background thread."""
+    state = AppState(RATES)
+    port = free_port()
+    loop = asyncio.new_event_loop()
+    task = loop.create_task(_serve("127.0.0.1", port, state, 0.3))
+
+    def run() -> None:
+        try:
+            loop.run_until_complete(task)
+        except asyncio.CancelledError:
+            pass
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    for _ in range(500):
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            break
+        except OSError:
+            threading.Event().wait(0.01)
+    yield port
+    loop.call_soon_threadsafe(task.cancel)
+    thread.join(5)
+    loop.close()
+    state.close()
+
+
+def _exchange(port: int, data: bytes, close_write: bool = False) -> bytes:
+    with socket.create_connection(("127.0.0.1", port), timeout=5) as sock:
+        sock.sendall(data)
+        if close_write:
+            sock.shutdown(socket.SHUT_WR)
+        chunks = []
+        while chunk := sock.recv(65536):
+            chunks.append(chunk)
+        return b"".join(chunks)
+
+
+def test_api_suite_against_asyncio_server(async_port: int) -> None:
+    pytest.importorskip("requests")
+    env = {**os.environ, "API_BASE_URL": f"http://127.0.0.1:{async_port}"}
+    result = subprocess.run(
+        [sys.executable, "-m", "pytest", "-q", "-p", "no:cacheprovider", str(ROOT / "tests_api")],
+        cwd=ROOT, env=env, capture_output=True, text=True, timeout=300, check=False,
+    )
+    assert result.returncode == 0, result.stdout[-3000:]
+
+
+def test_body_limit(async_port: int) -> None:
+    head = b"POST /operations HTTP/1.1\r\nHost: t\r\nContent-Length: %d\r\n\r\n" % (MAX_BODY_BYTES + 1)
+    response = _exchange(async_port, head)
+    assert response.startswith(b"HTTP/1.1 413 ")
+    assert b'"payload_too_large"' in response
+
+
+def test_slow_or_cut_requests_are_closed(async_port: int) -> None:
+    # тело не пришло за idle_timeout
+    assert _exchange(async_port, b"POST /operations HTTP/1.1\r\nHost: t\r\nContent-Length: 10\r\n\r\n{") == b""
+    # клиент закрыл соединение посреди тела
+    cut = b"POST /operations HTTP/1.1\r\nHost: t\r\nContent-Length: 10\r\n\r\n{"
+    assert _exchange(async_port, cut, close_write=True) == b""
+    # заголовки длиннее MAX_HEAD_BYTES
+    assert _exchange(async_port, b"GET /health HTTP/1.1\r\nX: " + b"a" * 70_000) == b""
+
+
+def test_keep_alive_and_bad_length(async_port: int) -> None:
+    two = b"GET /health HTTP/1.1\r\nHost: t\r\n\r\n" * 2
+    assert _exchange(async_port, two, close_write=True).count(b"HTTP/1.1 200 ") == 2
+    # непонятная длина тела: ответ и закрытие, следующий запрос не читается
+    bad = b"POST /nowhere HTTP/1.1\r\nHost: t\r\nContent-Length: x\r\n\r\nGET /health HTTP/1.1\r\n\r\n"
+    response = _exchange(async_port, bad)
+    assert response.startswith(b"HTTP/1.1 404 ")
+    assert response.count(b"HTTP/1.1") == 1
+
+
+def test_journal_sync_is_rejected(monkeypatch: pytest.MonkeyPatch) -> None:
+    with pytest.raises(ValueError):
+        aioserver.run_async_server(rates_path=RATES, journal_sync=True)
+    with pytest.raises(SystemExit):
+        aioserver._parse_args(["--journal", "x", "--journal-sync"])
+    assert aioserver._parse_args(["--port", "9000"]).port == 9000
+
+    served = []
+
+    async def fake_serve(host: str, port: int, state: AppState, idle_timeout: float) -> None:
+        served.append((host, port, state.converter.engine, idle_timeout))
+
+    monkeypatch.setattr(aioserver, "_serve", fake_serve)
+    aioserver.run_async_server("127.0.0.1", 9000, RATES, idle_timeout=1.0, engine="fixed")
+    assert served == [("127.0.0.1", 9000, "fixed", 1.0)]
@@ -0,0 +1,186 @@
+import io
+import json
+from pathlib import Path
+
+import pytest
+
+import main
+from app import bulk
+from app.bulk import (
+    BulkStats,
+    InvalidInputError,
+    convert_chunk,
+    convert_stream,
+    format_of,
+)
+from app.converter import CurrencyConverter
+from app.rates import Rates
+
+RATES = {"RUB": 1.0, "USD": 92.5, "EUR": 100.2}
+
+
+def _converter(**kwargs) -> CurrencyConverter:
+    return CurrencyConverter(Rates(rate_to_rub=dict(RATES)), **kwargs)
+
+
+def _write_rates(tmp_path: Path) -> str:
+    path = tmp_path / "rates.csv"
+    path.write_text("currency,rate_to_rub\n" + "".join(f"{c},{r}\n" for c, r in RATES.items()), encoding="utf-8")
+    return str(path)
+
+
+CSV_INPUT = "amount,from,to\n10,USD,RUB\n1500,rub,usd\nabc,USD,RUB\n5,USD,XXX\n1,USD\ninf,USD,RUB\n"
+
+
+def test_csv_rows_in_order_with_errors() -> None:
+    out = io.StringIO()
+    stats = convert_stream(io.StringIO(CSV_INPUT), out, _converter(), chunk_size=2)
+
+    assert (stats.rows, stats.errors) == (6, 4)
+    assert out.getvalue().splitlines() == [
+        "row,from,to,amount,rate,result,error,message",
+        "1,USD,RUB,10.0,92.5,925.0,,",
+        "2,RUB,USD,1500.0,0.010811,16.22,,",
+        "3,,,,,,bad_request,Amount must be a number",
+        "4,,,,,,not_found,Unknown currency: XXX",
+        "5,,,,,,bad_request,row has 2 fields",
+        "6,,,,,,bad_request,Amount must be a number",
+    ]
+
+
+def test_blank_csv_lines_are_skipped() -> None:
+    out = io.StringIO()
+    stats = convert_stream(io.StringIO("amount,from,to\n10,USD,RUB\n\n \n5,USD,RUB\n"), out, _converter())
+    assert (stats.rows, stats.errors) == (2, 0)
+    assert [line.split(",")[0] for line in out.getvalue().splitlines()[1:]] == ["1", "4"]
+
+
+def test_ndjson_to_ndjson_and_csv() -> None:
+    source = '{"from": "USD", "to": "RUB", "amount": 10}\n\n[1]\n{"from": "USD"}\n{bad\n{"from": "EUR", "to": "RUB", "amount": 0}\n'
+    out = io.StringIO()
+    stats = convert_stream(io.StringIO(source), out, _converter(), in_fmt="ndjson")
+
+    rows = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert (stats.rows, stats.errors) == (5, 4)
+    assert rows[0] == {"row": 1, "from": "USD", "to": "RUB", "amount": 10.0, "rate": 92.5, "result": 925.0}
+    assert [r["row"] for r in rows] == [1, 3, 4, 5, 6]  # пустая строка пропущена, но посчитана
+    assert rows[1] == {"row": 3, "error": "bad_request", "message": "row must be an object"}
+    assert rows[2]["message"] == "missing field: amount"
+    assert rows[3]["message"].startswith("invalid JSON")
+    assert rows[4] == {"row": 6, "error": "bad_request", "message": "Amount must be > 0"}
+
+    out = io.StringIO()
+    convert_stream(io.StringIO(source), out, _converter(), in_fmt="ndjson", out_fmt="csv")
+    assert out.getvalue().splitlines()[1] == "1,USD,RUB,10.0,92.5,925.0,,"
+
+
+def test_process_pool_keeps_order(tmp_path: Path) -> None:
+    rates_path = _write_rates(tmp_path)
+    lines = [f"{i + 1},{('USD', 'EUR', 'RUB', 'XXX')[i % 4]},RUB" for i in range(500)]
+    source = "amount,from,to\n" + "\n".join(lines) + "\n"
+    conv = _converter(engine="fixed", rounding="half_even")
+
+    expected = io.StringIO()
+    convert_stream(io.StringIO(source), expected, conv, chunk_size=37)
+    out = io.StringIO()
+    stats = convert_stream(io.StringIO(source), out, conv, chunk_size=37, processes=2, rates_path=rates_path)
+
+    assert out.getvalue() == expected.getvalue()
+    assert (stats.rows, stats.errors) == (500, 125)
+    assert stats.rows_per_second > 0
+
+
+def test_input_is_read_as_output_is_written() -> None:
+    read = [0]
+
+    def source():
+        yield "from,to,amount\n"
+        for i in range(10_000):
+            read[0] += 1
+            yield f"USD,RUB,{i + 1}\n"
+
+    class Target(io.StringIO):
+        def write(self, text: str) -> int:
+            # к моменту записи первого куска прочитано не больше одного куска вперёд
+            if text.startswith("1,"):
+                assert read[0] <= 200
+            return super().write(text)
+
+    stats = convert_stream(source(), Target(), _converter(), chunk_size=100)
+    assert stats.rows == 10_000
+
+
+def test_bad_input() -> None:
+    with pytest.raises(InvalidInputError, match="missing: amount"):
+        convert_stream(io.StringIO("from,to\nUSD,RUB\n"), io.StringIO(), _converter())
+    with pytest.raises(InvalidInputError):
+        convert_stream(io.StringIO(""), io.StringIO(), _converter())
+    with pytest.raises(ValueError):
+        convert_stream(io.StringIO(CSV_INPUT), io.StringIO(), _converter(), in_fmt="xml")
+    with pytest.raises(ValueError):
+        convert_stream(io.StringIO(CSV_INPUT), io.StringIO(), _converter(), chunk_size=0)
+    with pytest.raises(ValueError):
+        convert_stream(io.StringIO(CSV_INPUT), io.StringIO(), _converter(), processes=2)
+    for fmt, data in (("csv", b"from,to,amount\nUSD,RUB,1\nUSD,R\xffB,1\n"), ("ndjson", b'{"from": "\xff"}\n')):
+        source = io.TextIOWrapper(io.BytesIO(data), encoding="utf-8", newline="")
+        with pytest.raises(InvalidInputError, match="not valid UTF-8"):
+            convert_stream(source, io.StringIO(), _converter(), in_fmt=fmt)
+
+
+def test_worker_uses_its_own_converter(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(bulk, "_worker_converter", None)
+    bulk._init_worker(_write_rates(tmp_path), "fixed", "down")
+    text, rows, errors = bulk._convert_in_worker((0, 1, 2), 7, [["RUB", "RUB", "1.005"]], "csv")
+    assert (text, rows, errors) == ("7,RUB,RUB,1.005,1.0,1.0,,\n", 1, 0)
+    assert convert_chunk(_converter(), (0, 1, 2), 1, [], "csv") == ("", 0, 0)
+
+
+def test_format_of_and_stats() -> None:
+    assert [format_of(p) for p in ("a.CSV", "b.ndjson", "c.jsonl", "-")] == ["csv", "ndjson", "ndjson", "csv"]
+    assert format_of("-", default="ndjson") == "ndjson"
+    assert BulkStats().rows_per_second == 0.0
+
+
+def test_cli(tmp_path: Path, capsys: pytest.CaptureFixture) -> None:
+    src = tmp_path / "in.csv"
+    src.write_text(CSV_INPUT, encoding="utf-8")
+    out = tmp_path / "out.ndjson"
+    assert main.main(["bulk", str(src), "-o", str(out), "--rates", _write_rates(tmp_path), "--engine", "fixed"]) == 0
+    assert len(out.read_text(encoding="utf-8").splitlines()) == 6
+    assert "rows=6 errors=4" in capsys.readouterr().err
+
+    src.write_text("a,b\n", encoding="utf-8")
+    assert main.main(["bulk", str(src), "-o", str(out), "--rates", _write_rates(tmp_path)]) == 1
+
+    src.write_bytes(b"from,to,amount\nUSD,RUB,\xff\n")
+    assert main.main(["bulk", str(src), "-o", str(out), "--rates", _write_rates(tmp_path)]) == 1
+    assert "input is not valid UTF-8" in capsys.readouterr().err
+
+    for option in (["--chunk-size", "0"], ["--processes", "two"]):
+        with pytest.raises(SystemExit) as exc:
+            main.main(["bulk", str(src), *option])
+        assert exc.value.code == 2
+    assert "must be >= 1, got 0" in capsys.readouterr().err
+
+
+def test_cli_errors_close_files(tmp_path: Path, capsys: pytest.CaptureFixture, monkeypatch: pytest.MonkeyPatch) -> None:
+    src = tmp_path / "in.csv"
+    src.write_text(CSV_INPUT, encoding="utf-8")
+    bad_rates = tmp_path / "bad_rates.csv"
+    bad_rates.write_text("currency,rate_to_rub\nUSD,abc\n", encoding="utf-8")
+    assert main.main(["bulk", str(src), "--rates", str(bad_rates)]) == 1
+    assert capsys.readouterr().err.startswith("Bulk conversion failed: ")
+
+    opened = []
+    real_open = open
+
+    def tracking_open(*args, **kwargs):
+        f = real_open(*args, **kwargs)
+        opened.append(f)
+        return f
+
+    monkeypatch.setattr("builtins.open", tracking_open)
+    # вход открыт, выход открыть нельзя: вход всё равно закрывается
+    assert main.main(["bulk", str(src), "-o", str(tmp_path), "--rates", _write_rates(tmp_path)]) == 1
+    assert "Bulk conversion failed: " in capsys.readouterr().err
+    assert opened and all(f.closed for f in opened)
@@ -0,0 +1,54 @@
+import json
+import math
+
+import pytest
+
+from app import server
+from app.operations import Operation, OperationLog
+
+
+def _dumps(payload: object) -> str:
+    return json.dumps(payload, ensure_ascii=False)
+
+
+OPS = [
+    Operation("id-1", "2026-01-20T07:45:22.586611+00:00", "USD", "RUB", 10.0, 78.65, 786.5),
+    Operation("id-2", "2026-01-20T07:45:22+00:00", 'ЮА"НЬ\\', "€\n", 1e16, 1e-7, 0.1 + 0.2),
+    Operation("id-3", "2026-01-20T07:45:22+00:00", "A", "B", math.inf, -math.inf, math.nan),
+]
+
+
+@pytest.mark.parametrize("op", OPS)
+def test_operation_json_matches_stdlib(op: Operation) -> None:
+    assert server._operation_json(op) == _dumps(op.to_dict())
+    payload = {
+        "id": op.id, "ts": op.ts, "from": op.from_currency, "to": op.to_currency,
+        "amount": op.amount, "rate": op.rate, "result": op.result,
+    }
+    assert server._operation_payload_json(op) == _dumps(payload)
+    assert server._conversion_json(op.rate, op.result, op) == _dumps(
+        {"rate": op.rate, "result": op.result, "operation": payload}
+    )
+
+
+def test_page_json_matches_stdlib() -> None:
+    log = OperationLog()
+    log.add_many([("USD", "RUB", 1, 78.65, 78.65), ("ЮАНЬ", "RUB", 2, 12.8, 25.6)])
+    ops, next_cursor, count = log.page(limit=1)
+    expected = {"count": count, "items": [op.to_dict() for op in ops], "next": next_cursor}
+    assert server._page_json(ops, next_cursor, count) == _dumps(expected)
+    assert server._page_json([], None, 0) == _dumps({"count": 0, "items": [], "next": None})
+
+
+@pytest.mark.parametrize("use_orjson", [True, False])
+def test_codec_same_as_stdlib(use_orjson: bool) -> None:
+    codec = server.JsonCodec(use_orjson=use_orjson)
+    for raw in (b'{"from": "USD", "to": "RUB", "amount": 1.5}', "[1, \"ю\"]".encode(), b"NaN", b"1" * 30, b"-9223372036854775809", b"1E400"):
+        assert repr(codec.loads(raw)) == repr(json.loads(raw.decode("utf-8")))
+    for raw in (b"{", b"\xff", b"[1,]", b"\"\\ud800\" x"):
+        with pytest.raises(ValueError) as fast:
+            codec.loads(raw)
+        with pytest.raises(ValueError) as slow:
+            json.loads(raw.decode("utf-8"))
+        assert (type(fast.value), str(fast.value)) == (type(slow.value), str(slow.value))
+    assert codec.dumps({"a": [1.0, "ю", None]}) == _dumps({"a": [1.0, "ю", None]})
@@ -1,7 +1,10 @@
+from array import array
+from datetime import date
+
 import pytest
 
 from app.converter import CurrencyConverter, InvalidAmountError
-from app.rates import Rates, UnknownCurrencyError
+from app.rates import RateHistory, RateNotAvailableError, Rates, UnknownCurrencyError
 
 
 def test_convert_ok_rounding() -> None:
@@ -41,3 +44,126 @@ def test_unknown_currency_propagates() -> None:
 
     with pytest.raises(UnknownCurrencyError):
         conv.convert(10, "USD", "RUB")
+
+
+def test_convert_many_matches_convert() -> None:
+    rates = Rates(rate_to_rub={"RUB": 1.0, "USD": 92.5, "EUR": 100.2})
+    conv = CurrencyConverter(rates)
+
+    items = [(1500, "RUB", "USD"), (10, "usd", "eur"), (3.33, " EUR ", "RUB"), (1500, "RUB", "USD")]
+    results = conv.convert_many(items)
+
+    assert results == [conv.convert(*item) for item in items]
+
+
+def test_convert_many_returns_errors_per_item() -> None:
+    rates = Rates(rate_to_rub={"RUB": 1.0, "USD": 92.5})
+    conv = CurrencyConverter(rates)
+
+    results = conv.convert_many([
+        ("10", "USD", "RUB"),
+        (0, "USD", "RUB"),
+        (10, "", "RUB"),
+        (10, "", "RUB"),
+        (10, 123, "RUB"),
+        (10, ["USD"], "RUB"),
+        (10, "USD", "AAA"),
+        (10, "AAA", "USD"),
+        (10, "USD", "RUB"),
+    ])
+
+    assert isinstance(results[0], InvalidAmountError)
+    assert isinstance(results[1], InvalidAmountError)
+    for res in results[2:8]:
+        assert isinstance(res, UnknownCurrencyError)
+    assert str(results[6]) == "Unknown currency: AAA"
+    assert results[8] == conv.convert(10, "USD", "RUB")
+
+
+def test_convert_many_empty() -> None:
+    conv = CurrencyConverter(Rates(rate_to_rub={"RUB": 1.0}))
+    assert conv.convert_many([]) == []
+
+
+def test_convert_normalizes_codes() -> None:
+    rates = Rates(rate_to_rub={"RUB": 1.0, "USD": 92.5})
+    conv = CurrencyConverter(rates)
+
+    res = conv.convert(10, " usd ", "rub")
+    assert (res.from_currency, res.to_currency) == ("USD", "RUB")
+    assert res == conv.convert(10, "USD", "RUB")
+
+
+def test_convert_checks_codes_before_lookup() -> None:
+    conv = CurrencyConverter(Rates(rate_to_rub={"RUB": 1.0}))
+
+    # пустой код TO важнее неизвестного FROM, как и раньше
+    with pytest.raises(UnknownCurrencyError, match="empty"):
+        conv.convert(10, "AAA", " ")
+    with pytest.raises(UnknownCurrencyError, match="must be a string"):
+        conv.convert(10, ["RUB"], "RUB")  # type: ignore[arg-type]
+
+
+def test_set_rates_swaps_snapshot() -> None:
+    old = Rates(rate_to_rub={"RUB": 1.0, "USD": 92.5})
+    conv = CurrencyConverter(old)
+    conv.set_rates(Rates(rate_to_rub={"RUB": 1.0, "USD": 100.0}))
+
+    assert conv.rates is not old
+    assert conv.convert(2, "USD", "RUB").result == 200.0
+    assert [r.result for r in conv.convert_many([(1, "USD", "RUB"), (3, "usd", "rub")])] == [100.0, 300.0]
+
+
+def test_convert_as_of() -> None:
+    history = RateHistory({
+        "USD": (array("l", [date(2024, 1, 9).toordinal(), date(2024, 1, 12).toordinal()]), array("d", [90.0, 88.0])),
+        "EUR": (array("l", [date(2024, 1, 9).toordinal()]), array("d", [99.0])),
+    })
+    conv = CurrencyConverter(Rates(rate_to_rub={"RUB": 1.0, "USD": 92.5}), history)
+
+    assert conv.convert(10, "usd", "RUB", as_of=date(2024, 1, 10)).result == 900.0
+    assert conv.convert(10, "USD", "RUB", as_of=date(2024, 1, 12)).result == 880.0
+    assert conv.convert(10, "USD", "RUB").result == 925.0  # без as_of текущие курсы
+    res = conv.convert(1, "USD", "EUR", as_of=date(2024, 1, 12))
+    assert (res.from_currency, res.to_currency, res.rate) == ("USD", "EUR", round(88.0 / 99.0, 6))
+
+    with pytest.raises(RateNotAvailableError):
+        conv.convert(10, "USD", "RUB", as_of=date(2023, 12, 31))
+    with pytest.raises(RateNotAvailableError, match="No rates history"):
+        CurrencyConverter(Rates(rate_to_rub={"RUB": 1.0})).convert(1, "RUB", "RUB", as_of=date(2024, 1, 1))
+
+
+def test_fixed_engine_rounds_exact_decimals() -> None:
+    rates = Rates(rate_to_rub={"RUB": 1.0, "USD": 92.5})
+    # 1.005 в float чуть меньше 1.005, поэтому round() даёт 1.0
+    assert CurrencyConverter(rates).convert(1.005, "RUB", "RUB").result == 1.0
+    assert CurrencyConverter(rates, engine="fixed").convert(1.005, "RUB", "RUB").result == 1.01
+    assert CurrencyConverter(rates, engine="fixed", rounding="down").convert(1.005, "RUB", "RUB").result == 1.0
+
+    res = CurrencyConverter(rates, engine="fixed").convert(1500, "rub", "USD")
+    assert (res.from_currency, res.to_currency, res.amount) == ("RUB", "USD", 1500.0)
+    assert res.rate == 0.010811  # 1 / 92.5 = 0.0108108...
+    assert res.result == 16.22  # 1500 * 0.010811 = 16.2165
+
+    with pytest.raises(InvalidAmountError):
+        CurrencyConverter(rates, engine="fixed").convert(float("inf"), "USD", "RUB")
+    with pytest.raises(ValueError):
+        CurrencyConverter(rates, engine="decimal")
+
+
+def test_fixed_engine_batch_matches_convert() -> None:
+    rates = Rates(rate_to_rub={"RUB": 1.0, "USD": 92.5, "EUR": 100.2})
+    conv = CurrencyConverter(rates, engine="fixed", rounding="half_even")
+
+    items = [(1500, "RUB", "USD"), (10.125, "usd", "eur"), (0.005, "RUB", "RUB"), (3, "USD", "EUR"), (0, "RUB", "USD")]
+    results = conv.convert_many(items)
+
+    assert results[:4] == [conv.convert(*item) for item in items[:4]]
+    assert isinstance(results[4], InvalidAmountError)
+    assert isinstance(conv.convert_many([(float("nan"), "RUB", "USD")])[0], InvalidAmountError)
+
+
+def test_fixed_engine_as_of() -> None:
+    history = RateHistory({"USD": (array("l", [date(2024, 1, 9).toordinal()]), array("d", [90.5]))})
+    conv = CurrencyConverter(Rates(rate_to_rub={"RUB": 1.0, "USD": 92.5}), history, engine="fixed")
+    assert conv.convert(0.015, "USD", "RUB", as_of=date(2024, 1, 10)).result == 1.36  # 1.3575
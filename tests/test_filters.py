@@ -0,0 +1,42 @@
+from urllib.parse import parse_qs
+
+import pytest
+
+from app.filters import operation_filters, query_time
+
+
+def test_query_time() -> None:
+    assert query_time("1970-01-01", "since") == 0
+    assert query_time("2024-01-01T00:00:00.000001", "since") == 1_704_067_200_000_001
+    # со смещением: 03:00 по Москве это полночь UTC
+    assert query_time("2024-01-01T03:00:00+03:00", "until") == query_time("2024-01-01", "until")
+    with pytest.raises(ValueError, match="until must be an ISO date"):
+        query_time("yesterday", "until")
+
+
+def test_operation_filters() -> None:
+    assert operation_filters({}) == {}
+    qs = parse_qs("from=usd&to=%20rub%20&since=2024-01-01&until=2024-01-02&min_amount=10.5&limit=5")
+    assert operation_filters(qs) == {
+        "from_currency": "USD",
+        "to_currency": "RUB",
+        "since": 1_704_067_200_000_000,
+        "until": 1_704_153_600_000_000,
+        "min_amount": 10.5,
+    }
+    # берётся первое значение повторённого параметра
+    assert operation_filters(parse_qs("from=EUR&from=USD")) == {"from_currency": "EUR"}
+
+
+@pytest.mark.parametrize(
+    ("query", "message"),
+    [
+        ("from=%20", "from must be a currency code"),
+        ("to=%20", "to must be a currency code"),
+        ("since=abc", "since must be an ISO date or datetime"),
+        ("min_amount=ten", "min_amount must be a number"),
+    ],
+)
+def test_operation_filters_invalid(query: str, message: str) -> None:
+    with pytest.raises(ValueError, match=message):
+        operation_filters(parse_qs(query))
@@ -0,0 +1,62 @@
+import pytest
+
+from app.http_cache import ResponseCache, cache_key, etag, etag_matches
+
+
+def test_cache_key_is_canonical() -> None:
+    assert cache_key("/operations", "") == "/operations"
+    assert cache_key("/operations", "to=RUB&limit=5&from=USD") == cache_key("/operations", "from=USD&limit=5&to=RUB")
+    assert cache_key("/operations", "limit=5&n") == "/operations?limit=5&n="
+    # у повторённого параметра важен порядок: сервер берёт первое значение
+    assert cache_key("/operations", "limit=1&limit=2") != cache_key("/operations", "limit=2&limit=1")
+
+
+def test_etag_depends_on_version_and_representation() -> None:
+    tag = etag(5, "/operations?limit=5")
+    assert tag.startswith('"5-') and tag.endswith('"')
+    assert etag(5, "/operations?limit=5") == tag
+    assert etag(6, "/operations?limit=5") != tag
+    assert etag(5, "/aggregates") != tag
+    assert etag(5, "/operations?format=json&limit=5") != tag
+
+
+@pytest.mark.parametrize(
+    ("header", "matches"),
+    [
+        (None, False),
+        ("", False),
+        (" * ", True),
+        ('"a-1"', True),
+        ('W/"a-1"', True),
+        ('"other", W/"a-1"', True),
+        ('"a-2"', False),
+    ],
+)
+def test_etag_matches(header: str | None, matches: bool) -> None:
+    assert etag_matches(header, '"a-1"') is matches
+
+
+def test_response_cache_versions_and_lru() -> None:
+    cache = ResponseCache(max_entries=2, max_bytes=1000)
+    cache.put("a", 1, b"A")
+    assert cache.get("a", 1) == b"A"
+    assert cache.get("a", 2) is None  # устаревшая версия
+    assert cache.get("b", 1) is None
+
+    cache.put("a", 2, b"AA")
+    cache.put("b", 2, b"B")
+    cache.get("a", 2)  # a используется, первым уходит b
+    cache.put("c", 2, b"C")
+    assert cache.get("b", 2) is None
+    assert cache.get("a", 2) == b"AA"
+    assert cache.get("c", 2) == b"C"
+
+
+def test_response_cache_bytes_limit() -> None:
+    cache = ResponseCache(max_entries=10, max_bytes=400)
+    cache.put("big", 1, b"x" * 101)  # больше четверти лимита не кэшируется
+    assert cache.get("big", 1) is None
+    for key in "abcde":
+        cache.put(key, 1, b"x" * 100)
+    assert cache.get("a", 1) is None
+    assert [cache.get(key, 1) is not None for key in "bcde"] == [True] * 4
@@ -0,0 +1,347 @@
+import os
+import time
+from pathlib import Path
+
+import pytest
+
+from app import journal as journal_mod
+from app.journal import (
+    SNAPSHOT_NAME,
+    Journal,
+    JournalError,
+    read_journal,
+    read_snapshot,
+    write_snapshot,
+)
+from app.operations import (
+    STORAGES,
+    ColumnarStore,
+    ListStore,
+    OperationLog,
+    micros_to_ts,
+    ts_to_micros,
+    uuid_bytes,
+)
+
+
+def _reopen(path: Path, storage: str = "list", **kwargs) -> OperationLog:
+    return OperationLog(Journal(path, **kwargs), storage=storage)
+
+
+def test_ts_micros_roundtrip() -> None:
+    for ts in ("2026-01-20T07:45:22.586611+00:00", "2026-01-20T07:45:22+00:00", "1969-12-31T23:59:59.000001+00:00"):
+        assert micros_to_ts(ts_to_micros(ts)) == ts
+
+
+@pytest.mark.parametrize("storage", sorted(STORAGES))
+def test_history_survives_restart(tmp_path: Path, storage: str) -> None:
+    log = _reopen(tmp_path, storage)
+    assert log.count() == 0
+    first = log.add("USD", "RUB", 10, 92.5, 925)
+    batch = log.add_many([("RUB", "USD", 100, 0.01, 1), ("ЮАНЬ", "RUB", 2, 12.8, 25.6)])
+    log.close()
+
+    log = _reopen(tmp_path, storage)
+    assert log.list() == [first, *batch]
+    assert log.get(batch[1].id) == batch[1]
+    log.close()
+
+    # хвост журнала перенесён в снимок, журнал снова пустой
+    generation, cols = read_snapshot(tmp_path / journal_mod.SNAPSHOT_NAME)
+    assert [cols.operation(i) for i in range(len(cols))] == [first, *batch]
+    assert (cols.slots is not None) == (storage == "columnar")
+    journal_gen, records, _ = read_journal(tmp_path / journal_mod.JOURNAL_NAME)
+    assert (journal_gen, records) == (generation + 1, [])
+
+
+def test_clear_is_journaled(tmp_path: Path) -> None:
+    log = _reopen(tmp_path)
+    log.add("USD", "RUB", 1, 1.0, 1.0)
+    log.clear()
+    kept = log.add("EUR", "RUB", 2, 1.0, 2.0)
+    log.close()
+
+    log = _reopen(tmp_path)
+    assert log.list() == [kept]
+    log.close()
+
+
+def test_torn_tail_is_dropped(tmp_path: Path) -> None:
+    log = _reopen(tmp_path)
+    log.close()  # пустой журнал текущего поколения
+
+    journal_path = tmp_path / journal_mod.JOURNAL_NAME
+    size = journal_path.stat().st_size
+    with journal_path.open("ab") as f:
+        f.write(b"\x10\x00\x00\x00garbage")  # запись оборвалась на середине
+
+    log = _reopen(tmp_path)
+    assert log.count() == 0
+    assert journal_path.stat().st_size == size
+    op = log.add("USD", "RUB", 1, 1.0, 1.0)
+    log.close()
+
+    log = _reopen(tmp_path)
+    assert log.list() == [op]
+    log.close()
+
+
+def test_corrupted_record_stops_replay(tmp_path: Path) -> None:
+    log = _reopen(tmp_path)
+    log.close()
+    log = _reopen(tmp_path)
+    first = log.add("USD", "RUB", 1, 1.0, 1.0)
+    log.add("USD", "RUB", 2, 1.0, 2.0)
+    log.close()
+
+    journal_path = tmp_path / journal_mod.JOURNAL_NAME
+    data = bytearray(journal_path.read_bytes())
+    data[-1] ^= 0xFF
+    journal_path.write_bytes(bytes(data))
+
+    _, records, _ = read_journal(journal_path)
+    assert [rec[0] for rec in records] == [first]
+
+    data[-1] ^= 0xFF
+    data += b"\x00" * 8  # запись нулевой длины
+    journal_path.write_bytes(bytes(data))
+    assert len(read_journal(journal_path)[1]) == 2
+
+
+def test_journal_already_in_snapshot_is_ignored(tmp_path: Path) -> None:
+    log = _reopen(tmp_path)
+    op = log.add("USD", "RUB", 1, 1.0, 1.0)
+    log.close()
+
+    # процесс упал после записи снимка, но до замены журнала
+    journal_gen, _, _ = read_journal(tmp_path / journal_mod.JOURNAL_NAME)
+    store = ListStore()
+    store.append(op, uuid_bytes(op.id), ts_to_micros(op.ts))
+    write_snapshot(tmp_path / journal_mod.SNAPSHOT_NAME, journal_gen, store.columns())
+
+    log = _reopen(tmp_path)
+    assert log.list() == [op]
+    log.close()
+
+
+def test_journal_newer_than_snapshot(tmp_path: Path) -> None:
+    log = _reopen(tmp_path)
+    log.add("USD", "RUB", 1, 1.0, 1.0)
+    log.close()
+    _reopen(tmp_path).close()  # снимок поколения 1, журнал поколения 2
+    (tmp_path / journal_mod.SNAPSHOT_NAME).unlink()
+
+    with pytest.raises(JournalError):
+        _reopen(tmp_path)
+
+
+def test_bad_files(tmp_path: Path) -> None:
+    snapshot = tmp_path / journal_mod.SNAPSHOT_NAME
+    journal_path = tmp_path / journal_mod.JOURNAL_NAME
+
+    snapshot.write_bytes(b"")
+    assert read_snapshot(snapshot) == (0, None)
+
+    snapshot.write_bytes(b"short")
+    with pytest.raises(JournalError, match="truncated"):
+        read_snapshot(snapshot)
+
+    snapshot.write_bytes(b"X" * 64)
+    with pytest.raises(JournalError, match="Not a snapshot"):
+        read_snapshot(snapshot)
+
+    write_snapshot(snapshot, 1, ListStore().columns())
+    data = bytearray(snapshot.read_bytes())
+    data[-1] ^= 0xFF
+    snapshot.write_bytes(bytes(data))
+    with pytest.raises(JournalError, match="checksum"):
+        read_snapshot(snapshot)
+
+    journal_path.write_bytes(b"X" * 16)
+    with pytest.raises(JournalError, match="Not a journal"):
+        read_journal(journal_path)
+
+    journal_path.write_bytes(b"X")
+    assert read_journal(journal_path) == (0, [], 0)
+
+
+def test_async_mode_and_commit_interval(tmp_path: Path) -> None:
+    log = _reopen(tmp_path, synchronous=False, commit_interval=0.001)
+    ops = [log.add("USD", "RUB", i + 1, 1.0, i + 1) for i in range(20)]
+    log.close()
+
+    log = _reopen(tmp_path)
+    assert log.list() == ops
+    log.close()
+
+
+def test_write_error_is_reported(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    journal = Journal(tmp_path)
+    log = OperationLog(journal)
+
+    def broken_fsync(fd: int) -> None:
+        raise OSError("disk is gone")
+
+    monkeypatch.setattr(journal_mod.os, "fsync", broken_fsync)
+    with pytest.raises(JournalError):
+        log.add("USD", "RUB", 1, 1.0, 1.0)
+    log.close()
+
+    with pytest.raises(JournalError, match="closed"):
+        journal.append_clear()
+
+
+def test_close_without_recover(tmp_path: Path) -> None:
+    journal = Journal(tmp_path)
+    journal.close()
+    journal.flush()
+    assert not os.listdir(tmp_path)
+
+
+def test_snapshot_switches_storage(tmp_path: Path) -> None:
+    log = _reopen(tmp_path, "columnar")
+    ops = log.add_many([("USD", "RUB", i + 1, 92.5, 92.5 * (i + 1)) for i in range(50)])
+    log.close()
+    _reopen(tmp_path, "columnar").close()  # снимок с индексом по id
+
+    # снимок колоночного хранилища читается списком и обратно
+    log = _reopen(tmp_path, "list")
+    assert log.list(limit=100) == ops
+    log.add("EUR", "RUB", 1, 100.0, 100.0)
+    log.close()
+    log = _reopen(tmp_path, "columnar")
+    assert log.get(ops[7].id) == ops[7]
+    assert log.count() == 51
+    log.close()
+
+    store = ColumnarStore()
+    _, cols = read_snapshot(tmp_path / journal_mod.SNAPSHOT_NAME)
+    cols.slots = cols.slots[:3]  # индекс не подходит, будет построен заново
+    store.load(cols)
+    assert store.find(ops[7].id) == 7
+
+
+def _wait_compacted(journal: Journal, count: int) -> None:
+    for _ in range(500):
+        if journal.compactions >= count or journal.compact_error is not None:
+            return
+        time.sleep(0.01)
+
+
+@pytest.mark.parametrize("storage", sorted(STORAGES))
+def test_journal_is_compacted_while_running(tmp_path: Path, storage: str) -> None:
+    journal = Journal(tmp_path, compact_bytes=2000)
+    log = OperationLog(journal, storage=storage)
+    ops = [log.add("USD", "RUB", i + 1, 1.0, i + 1) for i in range(30)]  # ~70 байт на запись
+    _wait_compacted(journal, 1)
+    assert journal.compactions == 1
+    ops += [log.add("EUR", "RUB", i + 1, 1.0, i + 1) for i in range(40)]
+    _wait_compacted(journal, 2)
+    assert journal.compactions == 2
+    ops += log.add_many([("CNY", "RUB", 1, 1.0, 1.0)])
+    log.close()
+
+    # снимок догоняет журнал, на старте читается только короткий хвост
+    assert not journal.prev_path.exists()
+    _, cols = read_snapshot(journal.snapshot_path)
+    assert 30 <= len(cols) < len(ops)
+    assert os.path.getsize(journal.journal_path) < 2000
+    log = _reopen(tmp_path, storage)
+    assert log.list() == ops
+    log.close()
+
+
+def test_crash_during_compaction(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    # свёртка не успела: остались снимок, .prev и новый журнал
+    monkeypatch.setattr(Journal, "_compact", lambda self: None)
+    log = _reopen(tmp_path, compact_bytes=500)
+    ops = [log.add("USD", "RUB", i + 1, 1.0, i + 1) for i in range(20)]
+    log.close()
+    assert (tmp_path / journal_mod.PREV_JOURNAL_NAME).exists()
+    monkeypatch.undo()
+
+    log = _reopen(tmp_path)
+    assert log.list() == ops
+    log.close()
+    assert not (tmp_path / journal_mod.PREV_JOURNAL_NAME).exists()
+
+    # упал между переименованием журнала в .prev и созданием нового
+    os.replace(tmp_path / journal_mod.JOURNAL_NAME, tmp_path / journal_mod.PREV_JOURNAL_NAME)
+    log = _reopen(tmp_path)
+    assert log.list() == ops
+    log.close()
+
+    # снимок записан, .prev удалить не успел: он уже в снимке и пропускается
+    generation, _ = read_snapshot(tmp_path / journal_mod.SNAPSHOT_NAME)
+    (tmp_path / journal_mod.PREV_JOURNAL_NAME).write_bytes(journal_mod._JOURNAL_HEAD.pack(b"CCJRNL01", generation))
+    log = _reopen(tmp_path)
+    assert log.list() == ops
+    log.close()
+    assert not (tmp_path / journal_mod.PREV_JOURNAL_NAME).exists()
+
+
+def test_compaction_error_keeps_prev(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    def broken_snapshot(*args) -> None:
+        raise OSError("disk is full")
+
+    journal = Journal(tmp_path, compact_bytes=500)
+    log = OperationLog(journal)
+    monkeypatch.setattr(journal_mod, "write_snapshot", broken_snapshot)
+    ops = [log.add("USD", "RUB", i + 1, 1.0, i + 1) for i in range(20)]
+    _wait_compacted(journal, 1)
+    assert isinstance(journal.compact_error, OSError)
+    ops += [log.add("USD", "RUB", i + 1, 1.0, i + 1) for i in range(20)]  # журнал пишется дальше
+    assert journal.prev_path.exists()
+
+    # место освободилось: следующий коммит повторяет свёртку того же .prev
+    monkeypatch.undo()
+    journal.compact_error = None
+    ops += [log.add("EUR", "RUB", 1, 1.0, 1.0)]
+    _wait_compacted(journal, 1)
+    assert journal.compact_error is None
+    assert journal.compactions == 1
+    assert not journal.prev_path.exists()
+    log.close()
+
+    log = _reopen(tmp_path)
+    assert log.list() == ops
+    log.close()
+
+
+@pytest.mark.parametrize("storage", sorted(STORAGES))
+def test_retention_applies_to_recovered_history(tmp_path: Path, storage: str) -> None:
+    log = _reopen(tmp_path, storage)
+    ops = log.add_many([("USD", "RUB", i + 1, 1.0, i + 1) for i in range(30)])
+    log.close()
+
+    log = OperationLog(Journal(tmp_path), storage=storage, max_records=10)
+    assert log.list() == ops[-10:]
+    more = log.add_many([("EUR", "RUB", i + 1, 1.0, i + 1) for i in range(5)])
+    log.close()
+
+    # вытеснение записано в журнал
+    log = OperationLog(Journal(tmp_path), storage=storage, max_records=10)
+    assert log.list() == ops[-5:] + more
+    # индексы для фильтров строятся заново по восстановленной истории
+    assert log.query("EUR", "RUB", limit=2) == (more[:2], more[1].id, 5)
+    newer = log.add("USD", "RUB", 6, 1.0, 6.0)
+    assert log.query("USD") == (ops[-4:] + [newer], None, 5)
+    log.close()
+
+
+@pytest.mark.parametrize("storage", sorted(STORAGES))
+def test_snapshot_stays_bounded_across_restarts(tmp_path: Path, storage: str) -> None:
+    log = _reopen(tmp_path, storage)
+    log.add_many([("USD", "RUB", i + 1, 1.0, i + 1) for i in range(30)])
+    log.close()
+    for _ in range(4):
+        log = OperationLog(Journal(tmp_path), storage=storage, max_records=10)
+        kept = log.list() + log.add_many([("EUR", "RUB", i + 1, 1.0, i + 1) for i in range(5)])
+        log.close()
+        _, cols = read_snapshot(tmp_path / SNAPSHOT_NAME)
+        assert len(cols.ts) == 10  # лимит применён до записи снимка
+
+    # без лимита видно то, что осталось после вытеснения, а не вся история
+    log = _reopen(tmp_path, storage)
+    assert log.list() == kept[-10:]
+    log.close()
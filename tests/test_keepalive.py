@@ -0,0 +1,92 @@
+import json
+import socket
+
+import pytest
+from conftest import read_response
+
+
+def _request(method: str, path: str, body: bytes = b"", version: str = "HTTP/1.1", headers: str = "") -> bytes:
+    head = f"{method} {path} {version}\r\nHost: test\r\n{headers}"
+    if body or method == "POST":
+        head += f"Content-Length: {len(body)}\r\n"
+    return (head + "\r\n").encode("ascii") + body
+
+
+def test_pipelined_requests_on_one_connection(served) -> None:
+    _, port = served
+    convert = json.dumps({"from": "USD", "to": "RUB", "amount": 1}).encode()
+    pipeline = b"".join([
+        _request("GET", "/health"),
+        _request("POST", "/nowhere", b'{"ignored": true}'),  # тело не читается обработчиком, его надо пропустить
+        _request("POST", "/operations", b"{not json"),
+        _request("POST", "/admin/rates/reload", b"x" * 5000),
+        _request("POST", "/operations", convert),
+        _request("GET", "/operations/unknown"),
+    ])
+    with socket.create_connection(("127.0.0.1", port), timeout=5) as sock:
+        sock.sendall(pipeline)
+        f = sock.makefile("rb")
+        statuses = [read_response(f)[0] for _ in range(6)]
+        assert statuses == [200, 404, 400, 200, 200, 404]
+
+        # соединение по-прежнему живо
+        sock.sendall(_request("GET", "/health"))
+        status, headers, body = read_response(f)
+        assert (status, body) == (200, b'{"status": "ok"}')
+        assert "connection" not in headers
+
+
+def test_unknown_body_length_closes_connection(served) -> None:
+    _, port = served
+    with socket.create_connection(("127.0.0.1", port), timeout=5) as sock:
+        sock.sendall(b"POST /operations HTTP/1.1\r\nHost: t\r\nContent-Length: abc\r\n\r\n")
+        f = sock.makefile("rb")
+        status, headers, _ = read_response(f)
+        assert status == 400
+        assert headers["connection"] == "close"
+        assert f.read() == b""
+
+
+def test_http10_keep_alive_and_idle_timeout(served) -> None:
+    _, port = served
+    with socket.create_connection(("127.0.0.1", port), timeout=5) as sock:
+        f = sock.makefile("rb")
+        sock.sendall(_request("GET", "/health", version="HTTP/1.0", headers="Connection: keep-alive\r\n"))
+        status, headers, _ = read_response(f)
+        assert (status, headers["connection"]) == (200, "keep-alive")
+
+        sock.sendall(_request("GET", "/health", version="HTTP/1.0"))
+        assert read_response(f)[0] == 200
+        assert f.read() == b""  # HTTP/1.0 без keep-alive: сервер закрыл соединение
+
+    with socket.create_connection(("127.0.0.1", port), timeout=5) as sock:
+        assert sock.recv(1) == b""  # простой дольше idle_timeout
+
+
+@pytest.mark.parametrize("served", ["single"], indirect=True)
+def test_single_mode_closes_after_response(served) -> None:
+    _, port = served
+    with socket.create_connection(("127.0.0.1", port), timeout=5) as sock:
+        sock.sendall(_request("GET", "/health"))
+        f = sock.makefile("rb")
+        status, headers, _ = read_response(f)
+        assert (status, headers["connection"]) == (200, "close")
+        assert f.read() == b""
+
+
+def test_reload_of_non_utf8_file(served, tmp_path) -> None:
+    state, port = served
+    rates = tmp_path / "rates.csv"
+    rates.write_bytes(b"currency,rate_to_rub\nUSD,\xff\n")
+    state.rates_path = str(rates)
+    with socket.create_connection(("127.0.0.1", port), timeout=5) as sock:
+        sock.sendall(_request("POST", "/admin/rates/reload"))
+        f = sock.makefile("rb")
+        status, _, body = read_response(f)
+        assert status == 500
+        assert json.loads(body)["error"] == "invalid_rates"
+
+        # прежние курсы остаются в силе
+        convert = json.dumps({"from": "USD", "to": "RUB", "amount": 1}).encode()
+        sock.sendall(_request("POST", "/operations", convert))
+        assert read_response(f)[0] == 200
@@ -0,0 +1,58 @@
+from app.metrics import Metrics
+from app.server import _route
+
+
+def _lines(metrics: Metrics) -> list[str]:
+    return metrics.render().splitlines()
+
+
+def test_requests_and_histogram() -> None:
+    m = Metrics(buckets=(0.001, 0.01))
+    m.observe("GET", "/health", 200, 500_000)  # 0.5 ms
+    m.observe("GET", "/health", 200, 1_000_000)  # ровно на границе корзины
+    m.observe("GET", "/health", 404, 20_000_000)
+    m.observe("POST", "/operations", 200, 5_000_000)
+
+    lines = _lines(m)
+    assert 'http_requests_total{method="GET",route="/health",status="200"} 2' in lines
+    assert 'http_requests_total{method="GET",route="/health",status="404"} 1' in lines
+    assert 'http_requests_total{method="POST",route="/operations",status="200"} 1' in lines
+
+    labels = 'method="GET",route="/health"'
+    assert f'http_request_duration_seconds_bucket{{{labels},le="0.001"}} 2' in lines
+    assert f'http_request_duration_seconds_bucket{{{labels},le="0.01"}} 2' in lines
+    assert f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}} 3' in lines
+    assert f"http_request_duration_seconds_sum{{{labels}}} 0.0215" in lines
+    assert f"http_request_duration_seconds_count{{{labels}}} 3" in lines
+    assert "# TYPE http_request_duration_seconds histogram" in lines
+
+
+def test_conversions_and_gauges() -> None:
+    m = Metrics()
+    m.count_conversions([("USD", "RUB"), ("USD", "RUB"), ("EUR", 'A"B')])
+    size = [3]
+    m.gauge("operations_log_size", "Operations in the history.", lambda: size[0])
+    m.gauge("ratio", "Some float.", lambda: 0.5)
+
+    lines = _lines(m)
+    assert 'conversions_total{from="USD",to="RUB"} 2' in lines
+    assert 'conversions_total{from="EUR",to="A\\"B"} 1' in lines
+    assert "operations_log_size 3" in lines
+    assert "ratio 0.5" in lines
+
+    size[0] = 10  # значение читается при каждом render
+    assert "operations_log_size 10" in _lines(m)
+
+
+def test_empty_render() -> None:
+    text = Metrics().render()
+    assert text.endswith("\n")
+    assert all(line.startswith("#") for line in text.splitlines())
+
+
+def test_route_labels() -> None:
+    assert _route("/operations?limit=5") == "/operations"
+    assert _route("/operations/batch") == "/operations/batch"
+    assert _route("/operations/123e4567") == "/operations/{id}"
+    assert _route("/metrics") == "/metrics"
+    assert _route("/nope/x") == "other"
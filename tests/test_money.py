@@ -0,0 +1,91 @@
+import random
+from decimal import (
+    ROUND_DOWN,
+    ROUND_HALF_DOWN,
+    ROUND_HALF_EVEN,
+    ROUND_HALF_UP,
+    ROUND_UP,
+    Decimal,
+)
+
+import pytest
+
+from app.money import ROUNDING, FixedPointEngine, decimal_parts, round_div
+
+DECIMAL_MODES = {
+    "half_up": ROUND_HALF_UP,
+    "half_even": ROUND_HALF_EVEN,
+    "half_down": ROUND_HALF_DOWN,
+    "down": ROUND_DOWN,
+    "up": ROUND_UP,
+}
+
+
+@pytest.mark.parametrize(
+    "n, d, expected",
+    [
+        (25, 10, {"half_up": 3, "half_even": 2, "half_down": 2, "down": 2, "up": 3}),
+        (35, 10, {"half_up": 4, "half_even": 4, "half_down": 3, "down": 3, "up": 4}),
+        (26, 10, {"half_up": 3, "half_even": 3, "half_down": 3, "down": 2, "up": 3}),
+        (24, 10, {"half_up": 2, "half_even": 2, "half_down": 2, "down": 2, "up": 3}),
+        (20, 10, {"half_up": 2, "half_even": 2, "half_down": 2, "down": 2, "up": 2}),
+        (-25, 10, {"half_up": -3, "half_even": -2, "half_down": -2, "down": -2, "up": -3}),
+    ],
+)
+def test_round_div(n: int, d: int, expected: dict) -> None:
+    assert {mode: round_div(n, d, mode) for mode in ROUNDING} == expected
+
+
+def test_decimal_parts() -> None:
+    assert decimal_parts(10.005) == (10005, 3)
+    assert decimal_parts(0.1) == (1, 1)
+    assert decimal_parts(-2.5) == (-25, 1)
+    assert decimal_parts(7) == (7, 0)
+    assert decimal_parts(1e-05) == (1, 5)
+    assert decimal_parts(-1.5e-07) == (-15, 8)
+    assert decimal_parts(1e16) == (10**16, 0)
+    assert decimal_parts(0.12345678) == (12345678, 8)
+    assert decimal_parts(1234567890.5) == (12345678905, 1)
+    for bad in (float("inf"), float("nan")):
+        with pytest.raises(ValueError):
+            decimal_parts(bad)
+
+
+@pytest.mark.parametrize("mode", sorted(ROUNDING))
+def test_engine_matches_decimal(mode: str) -> None:
+    rnd = random.Random(mode)
+    engine = FixedPointEngine(mode)
+    for _ in range(2000):
+        rate_from = round(rnd.uniform(0.001, 500), rnd.randint(0, 6))
+        rate_to = round(rnd.uniform(0.001, 500), rnd.randint(0, 6))
+        amount = round(rnd.uniform(0.01, 10**6), rnd.randint(0, 4))
+        rate = (Decimal(repr(rate_from)) / Decimal(repr(rate_to))).quantize(Decimal("1e-6"), DECIMAL_MODES[mode])
+        result = (Decimal(repr(amount)) * rate).quantize(Decimal("0.01"), DECIMAL_MODES[mode])
+
+        scaled = engine.rate(rate_from, rate_to)
+        assert scaled == int(rate * 10**6)
+        assert engine.convert(amount, scaled) == int(result * 100)
+
+
+def test_convert_many_matches_convert() -> None:
+    engine = FixedPointEngine("half_even")
+    amounts = [1.005, 2, 0.125, 1e-05, 1234.5678]
+    rate = engine.rate(1.0, 3.0)
+    assert engine.convert_many(amounts, rate) == [engine.convert(a, rate) for a in amounts]
+    assert engine.convert_many([-1.005, 2.5], 10**6) == [-100, 250]  # -1.005 по half_even -> -1.00
+    assert engine.convert_many([], rate) == []
+
+
+def test_fewer_rate_digits_than_minor() -> None:
+    engine = FixedPointEngine(minor_digits=4, rate_digits=2)
+    rate = engine.rate(3.0, 1.0)
+    assert rate == 300
+    assert engine.convert(1.5, rate) == 45_000
+    assert engine.convert_many([1.5, 2], rate) == [45_000, 60_000]
+    assert engine.convert(-1.5, rate) == -45_000
+    assert engine.convert_many([-1.5, 2], rate) == [-45_000, 60_000]
+
+
+def test_unknown_rounding() -> None:
+    with pytest.raises(ValueError):
+        FixedPointEngine("bankers")
@@ -1,4 +1,20 @@
-from app.operations import OperationLog
+import gc
+import random
+import threading
+import tracemalloc
+
+import pytest
+
+from app import operations as ops_mod
+from app.operations import (
+    STORAGES,
+    ColumnarStore,
+    OperationLog,
+    SubscriberDroppedError,
+    SubscriptionClosedError,
+    UnknownCursorError,
+    iter_pages,
+)
 
 
 def test_log_add_list_count_clear() -> None:
@@ -19,6 +35,7 @@ def test_log_add_list_count_clear() -> None:
     log.clear()
     assert log.count() == 0
     assert log.list() == []
+    log.close()  # без журнала ничего не делает
 
 
 def test_list_offset_limit() -> None:
@@ -66,3 +83,407 @@ def test_operation_to_dict_is_covered() -> None:
     assert d["to_currency"] == "RUB"
     assert d["amount"] == 10.0
 
+
+
+def test_clear_returns_deleted_count() -> None:
+    log = OperationLog()
+    log.add("USD", "RUB", 1, 1.0, 1.0)
+    log.add("USD", "RUB", 2, 1.0, 2.0)
+
+    assert log.clear() == 2
+    assert log.clear() == 0
+
+
+def test_parallel_add_list_clear_stay_consistent() -> None:
+    log = OperationLog()
+    per_thread = 500
+    deleted: list[int] = []
+
+    def writer() -> None:
+        for i in range(per_thread):
+            log.add("USD", "RUB", i + 1, 1.0, i + 1)
+
+    def reader() -> None:
+        for _ in range(200):
+            items = log.list(limit=10)
+            assert len(items) <= 10
+            assert log.count() >= 0
+
+    def cleaner() -> None:
+        for _ in range(20):
+            deleted.append(log.clear())
+
+    threads = [threading.Thread(target=writer) for _ in range(4)]
+    threads += [threading.Thread(target=reader), threading.Thread(target=cleaner)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    # каждая операция либо удалена одним из clear, либо осталась в логе
+    assert sum(deleted) + log.count() == 4 * per_thread
+
+
+def test_add_many_appends_in_order() -> None:
+    log = OperationLog()
+    log.add("USD", "RUB", 1, 1.0, 1.0)
+
+    ops = log.add_many([("USD", "RUB", 2, 92.5, 185), ("RUB", "USD", 100, 0.01, 1)])
+    assert [op.amount for op in ops] == [2.0, 100.0]
+    assert len({op.id for op in ops}) == 2
+    assert log.count() == 3
+    assert [op.id for op in log.list(offset=1)] == [op.id for op in ops]
+
+    assert log.add_many([]) == []
+    assert log.count() == 3
+
+
+def test_get_by_id() -> None:
+    log = OperationLog()
+    first = log.add("USD", "RUB", 1, 92.5, 92.5)
+    batch = log.add_many([("RUB", "USD", 100, 0.01, 1), ("EUR", "RUB", 2, 100.0, 200)])
+
+    assert log.get(first.id) == first
+    assert log.get(batch[1].id) == batch[1]
+    assert log.get("missing") is None
+
+    log.clear()
+    assert log.get(first.id) is None
+
+    # позиции после clear не переиспользуются, индекс остаётся согласованным
+    again = log.add("USD", "RUB", 3, 92.5, 277.5)
+    assert log.get(again.id) == again
+    assert log.list() == [again]
+
+
+def test_page_with_cursor() -> None:
+    log = OperationLog()
+    ops = [log.add("USD", "RUB", i + 1, 1.0, i + 1) for i in range(5)]
+
+    items, next_cursor, total = log.page(limit=2)
+    assert items == ops[:2]
+    assert next_cursor == ops[1].id
+    assert total == 5
+
+    items, next_cursor, _ = log.page(limit=2, after=next_cursor)
+    assert items == ops[2:4]
+
+    items, next_cursor, _ = log.page(limit=2, after=next_cursor)
+    assert items == ops[4:]
+    assert next_cursor is None
+
+    assert log.page(after=ops[0].id)[0] == ops[1:]
+    assert log.page(limit=-1, after=ops[0].id) == ([], None, 5)
+    assert log.page(limit=3, offset=4) == ([ops[4]], None, 5)
+    assert log.page(limit=3, offset=10) == ([], None, 5)
+
+    with pytest.raises(UnknownCursorError):
+        log.page(after="missing")
+
+    # после clear старый курсор больше не действует
+    log.clear()
+    with pytest.raises(UnknownCursorError):
+        log.page(after=ops[0].id)
+
+
+@pytest.mark.parametrize("storage", sorted(STORAGES))
+def test_storages_behave_the_same(storage: str) -> None:
+    log = OperationLog(storage=storage)
+    ops = [log.add("USD", "RUB", i + 1, 92.5, 92.5 * (i + 1)) for i in range(40)]  # с перестройкой индекса
+    ops += log.add_many([("ЮАНЬ", "EUR", 3, 0.1, 0.3)])
+
+    assert log.list() == ops
+    assert log.list(limit=5, offset=38) == ops[38:]
+    assert all(log.get(op.id) == op for op in ops)
+    assert log.get("not-a-uuid") is None
+    assert log.get("00") is None
+    assert log.get("00000000-0000-4000-8000-000000000000") is None
+
+    assert log.clear() == 41
+    assert log.get(ops[0].id) is None
+    op = log.add("EUR", "USD", 1, 1.1, 1.1)
+    assert log.list() == [op]
+
+
+def test_unknown_storage() -> None:
+    with pytest.raises(ValueError, match="Unknown storage"):
+        OperationLog(storage="btree")
+
+
+def test_version_changes_on_every_write() -> None:
+    log = OperationLog()
+    versions = [log.version()]
+    log.add("USD", "RUB", 1, 1.0, 1.0)
+    versions.append(log.version())
+    log.add_many([("USD", "RUB", 1, 1.0, 1.0)])
+    versions.append(log.version())
+    log.list()
+    log.get("missing")
+    assert log.version() == versions[-1]  # чтение версию не меняет
+    log.clear()
+    versions.append(log.version())
+    assert len(set(versions)) == 4
+    assert OperationLog().version() != OperationLog().version()
+
+
+@pytest.mark.parametrize("storage", sorted(STORAGES))
+def test_iter_pages_walks_history(storage: str) -> None:
+    log = OperationLog(storage=storage)
+    ops = log.add_many([("USD", "RUB", i + 1, 1.0, i + 1) for i in range(25)])
+
+    pages = list(iter_pages(log, page_size=10))
+    assert [len(p) for p in pages] == [10, 10, 5]
+    assert [op for p in pages for op in p] == ops
+    assert [op for p in iter_pages(log, after=ops[19].id, page_size=10) for op in p] == ops[20:]
+    assert list(iter_pages(OperationLog())) == []
+
+
+def test_iter_pages_restarts_when_cleared() -> None:
+    log = OperationLog()
+    log.add_many([("USD", "RUB", i + 1, 1.0, i + 1) for i in range(5)])
+    pages = iter_pages(log, page_size=2)
+    assert len(next(pages)) == 2
+    log.clear()
+    assert list(pages) == []
+
+
+def test_iter_pages_survives_eviction() -> None:
+    log = OperationLog(max_records=4)
+    log.add_many([("USD", "RUB", i + 1, 1.0, i + 1) for i in range(4)])
+    pages = iter_pages(log, page_size=2)
+    assert len(next(pages)) == 2
+    # курсор вытеснен: обход продолжается с самой старой оставшейся записи
+    newer = log.add_many([("EUR", "RUB", i + 1, 1.0, i + 1) for i in range(4)])
+    assert [op for p in pages for op in p] == newer
+
+
+@pytest.mark.parametrize("storage", sorted(STORAGES))
+def test_max_records_keeps_newest(storage: str) -> None:
+    log = OperationLog(storage=storage, max_records=10)
+    ops = [log.add("USD", "RUB", i + 1, 1.0, i + 1) for i in range(25)]
+    ops += log.add_many([("EUR", "RUB", i + 1, 1.0, i + 1) for i in range(7)])
+
+    assert log.count() == 10
+    assert log.list() == ops[-10:]
+    assert log.list(limit=3, offset=2) == ops[-8:-5]
+    assert log.get(ops[0].id) is None
+    assert log.get(ops[21].id) is None
+    assert log.get(ops[22].id) == ops[22]
+    with pytest.raises(UnknownCursorError):
+        log.page(after=ops[5].id)
+    assert log.page(limit=2, after=ops[-3].id) == (ops[-2:], None, 10)
+
+    # пакет больше лимита: остаются его последние записи
+    batch = log.add_many([("CNY", "RUB", i + 1, 1.0, i + 1) for i in range(15)])
+    assert log.list() == batch[-10:]
+    assert log.clear() == 10
+
+
+@pytest.mark.parametrize("storage", sorted(STORAGES))
+def test_max_age_drops_old_records(storage: str, monkeypatch: pytest.MonkeyPatch) -> None:
+    now = [1_700_000_000 * 10**9]
+    monkeypatch.setattr(ops_mod.time, "time_ns", lambda: now[0])
+    log = OperationLog(storage=storage, max_age=60)
+
+    old = log.add("USD", "RUB", 1, 1.0, 1.0)
+    now[0] += 30 * 10**9
+    newer = log.add_many([("EUR", "RUB", 2, 1.0, 2.0)])[0]
+    version = log.version()
+
+    now[0] += 31 * 10**9  # old старше минуты, newer ещё нет
+    assert log.version() != version  # вытеснение меняет версию (и ETag)
+    assert log.count() == 1
+    assert log.get(old.id) is None
+    assert log.list() == [newer]
+
+    now[0] += 60 * 10**9
+    assert log.page() == ([], None, 0)
+    assert log.get(newer.id) is None
+
+
+def test_columnar_find_skips_evicted_before_compaction() -> None:
+    log = OperationLog(storage="columnar", max_records=8)
+    store = log._store
+    assert isinstance(store, ColumnarStore)
+    ops = log.add_many([("USD", "RUB", i + 1, 1.0, i + 1) for i in range(10)])
+    # вытеснены две записи из десяти, массивы ещё не сжаты
+    assert len(store._ts) == 10
+    assert store.find(ops[1].id) is None
+    assert store.find(ops[2].id) == 0
+    cols = store.columns()  # снимок сжимает массивы
+    assert len(cols) == 8
+    assert store.find(ops[2].id) == 0
+    assert cols.operation(0) == ops[2]
+
+
+def test_bad_retention() -> None:
+    with pytest.raises(ValueError):
+        OperationLog(max_records=0)
+    with pytest.raises(ValueError):
+        OperationLog(max_age=0)
+
+
+def _traced_after(log: OperationLog, adds: int) -> int:
+    for i in range(adds):
+        log.add("USD", "RUB", i + 1, 78.05, 78.05 * (i + 1))
+    gc.collect()
+    return tracemalloc.get_traced_memory()[0]
+
+
+@pytest.mark.parametrize("storage", sorted(STORAGES))
+def test_memory_plateaus_with_max_records(storage: str) -> None:
+    tracemalloc.start()
+    try:
+        log = OperationLog(storage=storage, max_records=1000)
+        warm = _traced_after(log, 5000)
+        after = _traced_after(log, 20_000)
+        unbounded = OperationLog(storage=storage)
+        base = tracemalloc.get_traced_memory()[0]
+        grown = _traced_after(unbounded, 5000) - base
+    finally:
+        tracemalloc.stop()
+
+    assert log.count() == 1000
+    # ещё 20000 операций почти не добавили памяти, а без лимита 5000 заметно больше
+    assert after - warm < grown / 10
+
+
+def _matching(ops: list, f=None, t=None, since=None, until=None, min_amount=None) -> list:
+    return [
+        op for op in ops
+        if f in (None, op.from_currency) and t in (None, op.to_currency)
+        and (since is None or ops_mod.ts_to_micros(op.ts) >= since)
+        and (until is None or ops_mod.ts_to_micros(op.ts) < until)
+        and (min_amount is None or op.amount >= min_amount)
+    ]
+
+
+@pytest.mark.parametrize("storage", sorted(STORAGES))
+def test_query_matches_full_scan(storage: str) -> None:
+    rnd = random.Random(21)
+    log = OperationLog(storage=storage, max_records=300)
+    pairs = [("USD", "RUB"), ("EUR", "RUB"), ("USD", "EUR")]
+    for i in range(700):
+        f, t = rnd.choice(pairs)
+        log.add(f, t, rnd.uniform(1, 100), 1.0, 1.0)
+    ops = log.list()
+    stamps = [ops_mod.ts_to_micros(op.ts) for op in ops]
+
+    for _ in range(300):
+        filters = {
+            "f": rnd.choice([None, "USD", "EUR", "CNY"]),
+            "t": rnd.choice([None, "RUB", "EUR"]),
+            "since": rnd.choice([None, rnd.choice(stamps)]),
+            "until": rnd.choice([None, rnd.choice(stamps)]),
+            "min_amount": rnd.choice([None, 50.0]),
+        }
+        expected = _matching(ops, **filters)
+        args = list(filters.values())
+        limit, offset = rnd.choice([None, -1, 0, 5]), rnd.choice([0, 3, -1])
+        start = max(offset, 0)
+        page = expected[start:] if limit is None else expected[start:start + max(limit, 0)]
+        more = start + len(page) < len(expected)
+        assert log.query(*args, limit=limit, offset=offset) == (page, page[-1].id if page and more else None, len(expected))
+
+        walked, after = [], None
+        while True:
+            items, after, total = log.query(*args, limit=7, after=after)
+            walked += items
+            if after is None:
+                break
+        assert walked == expected
+        assert total == len(expected)
+
+
+def test_query_unknown_cursor_and_clear() -> None:
+    log = OperationLog()
+    op = log.add("USD", "RUB", 1, 1.0, 1.0)
+    log.clear()
+    with pytest.raises(UnknownCursorError):
+        log.query("USD", after=op.id)
+    newer = log.add("USD", "RUB", 2, 1.0, 2.0)
+    assert log.query("USD", "RUB") == ([newer], None, 1)
+    assert log.query(to_currency="EUR") == ([], None, 0)
+
+
+def test_timestamps_never_go_back(monkeypatch: pytest.MonkeyPatch) -> None:
+    now = [1_700_000_000 * 10**9]
+    monkeypatch.setattr(ops_mod.time, "time_ns", lambda: now[0])
+    log = OperationLog()
+    first = log.add("USD", "RUB", 1, 1.0, 1.0)
+    now[0] -= 10**9  # часы шагнули назад
+    second = log.add("USD", "RUB", 1, 1.0, 1.0)
+    batch = log.add_many([("EUR", "RUB", 1, 1.0, 1.0)])
+    assert second.ts == first.ts == batch[0].ts
+    assert log.list() == [first, second, batch[0]]
+    assert log.query(since=ops_mod.ts_to_micros(first.ts)) == ([first, second, batch[0]], None, 3)
+
+
+def test_posting_lists_are_trimmed() -> None:
+    log = OperationLog(max_records=100)
+    log.add("EUR", "RUB", 1, 1.0, 1.0)
+    for i in range(3000):
+        log.add("USD", "RUB", i + 1, 1.0, i + 1)
+    assert len(log._postings[("USD", "RUB")]) <= 100 + 1025
+    items, _, total = log.query("USD", "RUB", limit=1)
+    assert total == 100
+    assert items[0].amount == 2901
+    assert ("EUR", "RUB") not in log._postings
+
+
+def test_subscribers_get_new_operations_in_order() -> None:
+    log = OperationLog()
+    idle = log.subscribe()
+    assert idle.last_id is None
+    old = log.add("USD", "RUB", 1, 1.0, 1.0)
+    sub = log.subscribe(max_pending=10)
+    assert sub.last_id == old.id
+    assert sub.get(timeout=0) == []
+
+    op = log.add("USD", "RUB", 2, 1.0, 2.0)
+    batch = log.add_many([("EUR", "RUB", i + 1, 1.0, i + 1) for i in range(3)])
+    log.add_many([])
+    assert sub.get() == [op] + batch
+
+    result = []
+    reader = threading.Thread(target=lambda: result.extend(sub.get(timeout=5)))
+    reader.start()
+    later = log.add("CNY", "RUB", 1, 1.0, 1.0)
+    reader.join()
+    assert result == [later]
+
+    log.unsubscribe(sub)
+    log.unsubscribe(sub)
+    with pytest.raises(SubscriptionClosedError):
+        sub.get()
+    log.add("USD", "RUB", 3, 1.0, 3.0)
+    assert log._subscribers == [idle]
+
+
+def test_slow_subscriber_is_dropped() -> None:
+    log = OperationLog()
+    slow, fast = log.subscribe(max_pending=5), log.subscribe(max_pending=100)
+    for i in range(4):
+        log.add("USD", "RUB", i + 1, 1.0, i + 1)
+    assert len(fast.get()) == 4
+    log.add_many([("EUR", "RUB", 1, 1.0, 1.0)] * 2)  # у slow в буфере стало бы 6
+    with pytest.raises(SubscriberDroppedError):
+        slow.get()
+    assert log._subscribers == [fast]
+    assert len(fast.get()) == 2
+    slow.close()  # уже закрыта, ничего не меняет
+    with pytest.raises(SubscriberDroppedError):
+        slow.get()
+    fast.close()  # закрытый подписчик снимается при следующем add
+    log.add("USD", "RUB", 4, 1.0, 4)
+    assert log._subscribers == []
+    with pytest.raises(ValueError):
+        log.subscribe(max_pending=0)
+
+
+def test_close_ends_subscriptions() -> None:
+    log = OperationLog()
+    sub = log.subscribe()
+    log.close()
+    with pytest.raises(SubscriptionClosedError):
+        sub.get(timeout=5)
@@ -0,0 +1,126 @@
+import http.client
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import pytest
+from conftest import free_port
+
+from app.journal import Journal
+from app.operations import OperationLog, UnknownCursorError
+
+ROOT = Path(__file__).resolve().parent.parent
+
+pytestmark = pytest.mark.skipif(
+    sys.platform == "win32" or not hasattr(socket, "SO_REUSEPORT"), reason="pre-fork mode needs fork and SO_REUSEPORT"
+)
+
+
+def test_shared_log_through_manager(tmp_path: Path) -> None:
+    from app.prefork import start_log_manager
+
+    manager, log = start_log_manager(str(tmp_path), journal_sync=False)
+    try:
+        version = log.version()
+        op = log.add("USD", "RUB", 10, 92.5, 925)
+        batch = log.add_many([("EUR", "RUB", 1, 100.0, 100.0)])
+        assert log.version() != version
+        assert log.get(op.id) == op
+        assert log.page(limit=10) == ([op, *batch], None, 2)
+
+        # исключения приходят из процесса лога с тем же типом
+        with pytest.raises(UnknownCursorError):
+            log.page(after="no-such-id")
+        assert log.clear() == 2
+        kept = log.add("USD", "RUB", 1, 92.5, 92.5)
+        log.close()
+    finally:
+        manager.shutdown()
+
+    # лог писал журнал в своём процессе
+    manager, log = start_log_manager(str(tmp_path))
+    try:
+        assert log.list() == [kept]
+    finally:
+        log.close()
+        manager.shutdown()
+
+
+def test_two_servers_share_a_port() -> None:
+    from app.server import AppState, make_server
+
+    state = AppState(str(ROOT / "data" / "rates.csv"))
+    first = make_server(state, "127.0.0.1", 0, reuse_port=True)
+    try:
+        port = first.server_address[1]
+        second = make_server(state, "127.0.0.1", port, mode="pool", workers=2, reuse_port=True)
+        second.server_close()
+        with pytest.raises(OSError):
+            make_server(state, "127.0.0.1", port).server_close()
+    finally:
+        first.server_close()
+        state.close()
+
+
+def _children(pid: int) -> list[int]:
+    found = []
+    for entry in os.listdir("/proc"):
+        if entry.isdigit():
+            try:
+                stat = Path(f"/proc/{entry}/stat").read_text()
+            except OSError:
+                continue
+            if int(stat.rpartition(")")[2].split()[1]) == pid:
+                found.append(int(entry))
+    return found
+
+
+def _call(port: int, method: str, path: str, body: object | None = None) -> tuple[int, object]:
+    # новое соединение на каждый запрос: ядро раздаёт их разным воркерам
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+    try:
+        conn.request(method, path, body=None if body is None else json.dumps(body))
+        resp = conn.getresponse()
+        return resp.status, json.loads(resp.read())
+    finally:
+        conn.close()
+
+
+@pytest.mark.skipif(not Path("/proc").is_dir(), reason="counts worker processes through /proc")
+def test_prefork_server_smoke(tmp_path: Path) -> None:
+    port = free_port()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "app.server", "--host", "127.0.0.1", "--port", str(port), "--processes", "2",
+         "--mode", "threaded", "--journal", str(tmp_path)],
+        cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        for _ in range(500):
+            try:
+                if _call(port, "GET", "/health")[0] == 200:
+                    break
+            except OSError:
+                time.sleep(0.02)
+        assert len(_children(proc.pid)) == 3  # процесс лога и два воркера
+
+        added = [_call(port, "POST", "/operations", {"from": "USD", "to": "RUB", "amount": i + 1}) for i in range(6)]
+        assert {status for status, _ in added} == {200}
+        ids = [payload["operation"]["id"] for _, payload in added]
+        # любой воркер видит все операции: история общая
+        for _ in range(6):
+            status, page = _call(port, "GET", "/operations")
+            assert status == 200
+            assert [op["id"] for op in page["items"]] == ids
+    finally:
+        proc.send_signal(signal.SIGTERM)
+        assert proc.wait(10) == 0
+
+    # при остановке журнал закрыт, всё записанное на месте
+    log = OperationLog(Journal(tmp_path))
+    assert [op.id for op in log.list()] == ids
+    log.close()
@@ -1,10 +1,22 @@
+import os
+import threading
+import time
+from datetime import date, datetime, timedelta, timezone
 from pathlib import Path
 
 import pytest
 
-from app.rates import CsvRatesLoader, InvalidRatesFileError
-
-from app.rates import Rates, UnknownCurrencyError
+from app import rates as rates_mod
+from app.rates import (
+    CsvRateHistoryLoader,
+    CsvRatesLoader,
+    InvalidRatesFileError,
+    RateNotAvailableError,
+    Rates,
+    RatesWatcher,
+    UnknownCurrencyError,
+    read_rates_cache,
+)
 
 
 def _write(tmp_path: Path, name: str, content: str) -> Path:
@@ -90,3 +102,225 @@ def test_normalize_non_string_raises() -> None:
     rates = Rates(rate_to_rub={"RUB": 1.0})
     with pytest.raises(UnknownCurrencyError):
         rates.normalize(123)  # type: ignore[arg-type]
+
+
+def test_rate_table_pairs() -> None:
+    rates = Rates(rate_to_rub={"RUB": 1.0, "USD": 92.5, "EUR": 100.2})
+    table = rates.table
+    assert rates.table is table  # строится один раз
+
+    usd, eur = table.id_of("USD"), table.id_of("EUR")
+    assert table.codes[usd] == "USD"
+    assert table.pair(usd, eur) == ("USD", "EUR", 92.5 / 100.2, round(92.5 / 100.2, 6))
+    assert table.pair(eur, eur)[2] == 1.0
+
+    with pytest.raises(UnknownCurrencyError):
+        table.id_of("usd")
+
+
+def test_watcher_reloads_changed_file(tmp_path: Path) -> None:
+    path = _write(tmp_path, "rates.csv", "currency,rate_to_rub\nUSD,92.5\n")
+    seen: list[Rates] = []
+    watcher = RatesWatcher(path, seen.append)
+    assert watcher.check() is False  # файл не менялся
+
+    _write(tmp_path, "rates.csv", "currency,rate_to_rub\nUSD,95.25\n")
+    assert watcher.check() is True
+    assert seen[-1].get_rate_to_rub("USD") == 95.25
+
+    # битый файл не применяется, старые курсы остаются
+    _write(tmp_path, "rates.csv", "currency,rate_to_rub\nUSD,abc\n")
+    assert watcher.check() is False
+    assert isinstance(watcher.last_error, InvalidRatesFileError)
+    assert watcher.check() is False
+    assert len(seen) == 1
+
+    path.unlink()
+    assert watcher.check() is False
+
+    _write(tmp_path, "rates.csv", "currency,rate_to_rub\nUSD,96\nEUR,101\n")
+    assert watcher.check() is True
+    assert watcher.last_error is None
+    assert seen[-1].get_rate_to_rub("EUR") == 101.0
+
+
+def test_watcher_thread(tmp_path: Path) -> None:
+    path = _write(tmp_path, "rates.csv", "currency,rate_to_rub\nUSD,92.5\n")
+    changed = threading.Event()
+    watcher = RatesWatcher(path, lambda rates: changed.set(), interval=0.01)
+    watcher.stop()  # ещё не запущен
+    watcher = RatesWatcher(path, lambda rates: changed.set(), interval=0.01)
+    watcher.start()
+    _write(tmp_path, "rates.csv", "currency,rate_to_rub\nUSD,92.6\n")
+    assert changed.wait(5)
+    watcher.stop()
+
+
+def test_unreadable_file_is_invalid(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    path = tmp_path / "rates.csv"
+    path.write_bytes(b"currency,rate_to_rub\nUSD,92.5\n\xff\xfe,1\n")
+    with pytest.raises(InvalidRatesFileError, match="not valid UTF-8"):
+        CsvRatesLoader(path).load()
+
+    _write(tmp_path, "rates.csv", "currency,rate_to_rub\nUSD,92.5\n")
+
+    def broken_open(*args, **kwargs):
+        raise PermissionError("file is being replaced")
+
+    monkeypatch.setattr(Path, "open", broken_open)
+    with pytest.raises(InvalidRatesFileError, match="Cannot read rates file"):
+        CsvRatesLoader(path).load()
+
+
+def test_watcher_survives_non_utf8_file(tmp_path: Path) -> None:
+    path = _write(tmp_path, "rates.csv", "currency,rate_to_rub\nUSD,92.5\n")
+    seen: list[Rates] = []
+    watcher = RatesWatcher(path, seen.append, interval=0.01)
+    watcher.start()
+    try:
+        path.write_bytes(b"currency,rate_to_rub\nUSD,\xff\n")
+        for _ in range(500):
+            if watcher.last_error is not None:
+                break
+            time.sleep(0.01)
+        assert isinstance(watcher.last_error, InvalidRatesFileError)
+        assert watcher._thread.is_alive()
+
+        # следующая правильная правка подхватывается
+        _write(tmp_path, "rates.csv", "currency,rate_to_rub\nUSD,97.0\n")
+        for _ in range(500):
+            if seen:
+                break
+            time.sleep(0.01)
+        assert seen[-1].get_rate_to_rub("USD") == 97.0
+    finally:
+        watcher.stop()
+
+
+HISTORY = (
+    "date,currency,rate_to_rub\n"
+    "2024-01-09,USD,89.7\n"
+    "2024-01-09,EUR,98.2\n"
+    "2024-01-10,USD,89.9\n"
+    "2024-01-10,EUR,98.4\n"
+    "2024-01-12,USD,88.6\n"
+    "2024-01-12,EUR,97.0\n"
+)
+
+
+def test_history_as_of(tmp_path: Path) -> None:
+    history = CsvRateHistoryLoader(_write(tmp_path, "history.csv", HISTORY)).load()
+
+    assert history.currencies == ["EUR", "RUB", "USD"]
+    assert history.rate_to_rub("USD", date(2024, 1, 10)) == 89.9
+    assert history.rate_to_rub("usd", date(2024, 1, 11)) == 89.9  # курс последнего опубликованного дня
+    assert history.rate_to_rub("EUR", date(2030, 1, 1)) == 97.0
+    assert history.rate_to_rub("RUB", date(2000, 1, 1)) == 1.0
+    # время переводится в UTC: в Москве уже 12-е, в UTC ещё 11-е
+    msk = timezone(timedelta(hours=3))
+    assert history.rate_to_rub("USD", datetime(2024, 1, 12, 1, 0, tzinfo=msk)) == 89.9
+    assert history.rate_to_rub("USD", datetime(2024, 1, 12, 1, 0)) == 88.6
+
+    with pytest.raises(RateNotAvailableError):
+        history.rate_to_rub("USD", date(2024, 1, 8))
+    with pytest.raises(UnknownCurrencyError):
+        history.rate_to_rub("GBP", date(2024, 1, 10))
+
+
+def test_history_any_row_order(tmp_path: Path) -> None:
+    header, *rows = HISTORY.splitlines()
+    shuffled = "\r\n".join([header, "", *rows[:3], "", "2024-01-11, usd ,90.1", *rows[3:], ""])
+    history = CsvRateHistoryLoader(_write(tmp_path, "history.csv", shuffled)).load()
+
+    assert history.rate_to_rub("USD", date(2024, 1, 11)) == 90.1
+    assert history.rate_to_rub("USD", date(2024, 1, 12)) == 88.6
+    assert history.rate_to_rub("EUR", date(2024, 1, 9)) == 98.2
+
+    # валюты чередуются, но даты идут по убыванию или у валют разные
+    shifted = "\n".join([header, *rows]).replace("2024-01-10,EUR", "2024-01-11,EUR")
+    for content in ("\n".join([header, *reversed(rows)]), shifted):
+        history = CsvRateHistoryLoader(_write(tmp_path, "history.csv", content)).load()
+        assert history.rate_to_rub("USD", date(2024, 1, 12)) == 88.6
+
+
+def test_history_empty(tmp_path: Path) -> None:
+    history = CsvRateHistoryLoader(_write(tmp_path, "history.csv", "date,currency,rate_to_rub\n\n")).load()
+    assert history.currencies == ["RUB"]
+
+
+@pytest.mark.parametrize(
+    ("content", "message"),
+    [
+        ("", "no header"),
+        ("currency,rate_to_rub\nUSD,1\n", "header must be"),
+        ("date,currency,rate_to_rub\n2024-01-08,USD,1\n\n2024-01-09,USD\n", "3 columns at line 4"),
+        ("date,currency,rate_to_rub\n2024-01-01,USD\n90,2024-01-02,EUR,100\n", "3 columns at line 2"),
+        ("date,currency,rate_to_rub\n2024-01-09,USD,1\n2024-13-01,USD,1\n", "Invalid date at line 3"),
+        ("date,currency,rate_to_rub\n2024-01-09,USD,1\n2024-01-10, ,1\n", "Empty currency code at line 3"),
+        ("date,currency,rate_to_rub\n2024-01-09,USD,1\n2024-01-10,USD,x\n", "Invalid rate at line 3"),
+        ("date,currency,rate_to_rub\n2024-01-09,USD,1\n2024-01-10,USD,0\n", "must be > 0 at line 3"),
+        ("date,currency,rate_to_rub\n2024-01-09,USD,1\n2024-01-09,usd,2\n", "Duplicate date for USD"),
+    ],
+)
+def test_history_invalid(tmp_path: Path, content: str, message: str) -> None:
+    with pytest.raises(InvalidRatesFileError, match=message):
+        CsvRateHistoryLoader(_write(tmp_path, "history.csv", content)).load()
+
+
+def test_history_missing_file(tmp_path: Path) -> None:
+    with pytest.raises(InvalidRatesFileError, match="not found"):
+        CsvRateHistoryLoader(tmp_path / "nope.csv").load()
+
+
+def test_binary_cache(tmp_path: Path) -> None:
+    path = _write(tmp_path, "rates.csv", "currency,rate_to_rub\nUSD,92.5\n\nЮАНЬ,12.8\n")
+    cache = tmp_path / "rates.cache"
+    loader = CsvRatesLoader(path, cache_path=cache)
+
+    rates = loader.load()
+    assert rates.rate_to_rub == {"USD": 92.5, "ЮАНЬ": 12.8, "RUB": 1.0}
+    assert read_rates_cache(cache, path, path.stat()) == rates.rate_to_rub
+    assert loader.load() == rates
+
+    # mtime другой, содержимое то же: кэш подтверждается хешем
+    os.utime(path, ns=(0, 0))
+    assert read_rates_cache(cache, path, path.stat()) == rates.rate_to_rub
+
+    # файл изменился: кэш не подходит, CSV разбирается заново и кэш перезаписывается
+    _write(tmp_path, "rates.csv", "currency,rate_to_rub\nUSD,95\n")
+    assert read_rates_cache(cache, path, path.stat()) is None
+    assert loader.load().rate_to_rub == {"USD": 95.0, "RUB": 1.0}
+    assert read_rates_cache(cache, path, path.stat()) == {"USD": 95.0, "RUB": 1.0}
+
+    # кэш не отменяет проверки CSV
+    _write(tmp_path, "rates.csv", "currency,rate_to_rub\nUSD,-1\n")
+    with pytest.raises(InvalidRatesFileError, match="must be > 0"):
+        loader.load()
+
+
+def test_binary_cache_damaged(tmp_path: Path) -> None:
+    path = _write(tmp_path, "rates.csv", "currency,rate_to_rub\nUSD,92.5\n")
+    cache = tmp_path / "rates.cache"
+    loader = CsvRatesLoader(path, cache_path=cache)
+    loader.load()
+    good = cache.read_bytes()
+
+    for damaged in (b"", good[:10], b"X" * len(good), good[:-1] + bytes([good[-1] ^ 0xFF])):
+        cache.write_bytes(damaged)
+        assert read_rates_cache(cache, path, path.stat()) is None
+        assert loader.load().get_rate_to_rub("USD") == 92.5
+        assert cache.read_bytes() == good
+
+
+def test_binary_cache_skipped(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    path = _write(tmp_path, "rates.csv", "currency,rate_to_rub\nA\0B,2\n")
+    cache = tmp_path / "rates.cache"
+    assert CsvRatesLoader(path, cache_path=cache).load().get_rate_to_rub("A\0B") == 2.0
+    assert not cache.exists()  # NUL в коде не помещается в формат кэша
+
+    def broken_replace(src: object, dst: object) -> None:
+        raise PermissionError("read-only")
+
+    _write(tmp_path, "rates.csv", "currency,rate_to_rub\nUSD,92.5\n")
+    monkeypatch.setattr(rates_mod.os, "replace", broken_replace)
+    assert CsvRatesLoader(path, cache_path=cache).load().get_rate_to_rub("USD") == 92.5
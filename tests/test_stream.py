@@ -0,0 +1,106 @@
+import json
+import socket
+import threading
+
+import pytest
+
+from app import server as server_mod
+from app.server import AppState
+
+
+def _open_stream(port: int, last_event_id: str | None = None):
+    # сервер подписывается до ответа: после заголовков новые операции уже не теряются
+    sock = socket.create_connection(("127.0.0.1", port), timeout=5)
+    extra = f"Last-Event-ID: {last_event_id}\r\n" if last_event_id else ""
+    sock.sendall(f"GET /operations/stream HTTP/1.1\r\nHost: test\r\n{extra}\r\n".encode("ascii"))
+    f = sock.makefile("rb")
+    status = int(f.readline().split()[1])
+    headers = {}
+    while (line := f.readline()) != b"\r\n":
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    return sock, f, status, headers
+
+
+def _next_event(f) -> dict[str, str]:
+    event: dict[str, str] = {}
+    while (line := f.readline().decode("utf-8")) != "\n":
+        assert line, "stream closed"
+        if line.startswith(":"):
+            continue
+        name, _, value = line.rstrip("\n").partition(": ")
+        event[name] = value
+    return event
+
+
+def _add(state: AppState, amount: float):
+    return state.log.add("USD", "RUB", amount, 78.05, 78.05 * amount)
+
+
+def test_stream_pushes_new_operations(served) -> None:
+    state, port = served
+    sock, f, status, headers = _open_stream(port)
+    assert status == 200
+    assert headers["content-type"].startswith("text/event-stream")
+    assert state.streams == 1
+
+    ops = [_add(state, 1), *state.log.add_many([("EUR", "RUB", 2, 90.0, 180.0)])]
+    for op in ops:
+        event = _next_event(f)
+        assert event["id"] == op.id
+        assert json.loads(event["data"])["amount"] == op.amount
+    f.close()
+    sock.close()
+
+    # отключение замечается, когда запись в сокет получает ошибку (со второй-третьей записи)
+    for _ in range(500):
+        if state.streams == 0:
+            break
+        _add(state, 3)
+        threading.Event().wait(0.01)
+    assert state.streams == 0  # отписка раньше, чем счётчик уменьшается
+
+
+def test_resume_from_last_event_id(served) -> None:
+    state, port = served
+    ops = [_add(state, i + 1) for i in range(5)]
+    sock, f, status, _ = _open_stream(port, last_event_id=ops[1].id)
+    assert status == 200
+    newer = _add(state, 6)
+    assert [_next_event(f)["id"] for _ in range(4)] == [op.id for op in ops[2:]] + [newer.id]
+    sock.close()
+
+    sock, f, _, _ = _open_stream(port, last_event_id="no-such-id")
+    assert _next_event(f) == {"event": "reset", "data": "{}"}
+    sock.close()
+
+
+def test_slow_subscriber_is_dropped(served, monkeypatch: pytest.MonkeyPatch) -> None:
+    state, port = served
+    monkeypatch.setattr(server_mod, "STREAM_BUFFER", 3)
+    sock, f, _, _ = _open_stream(port)
+    state.log.add_many([("USD", "RUB", i + 1, 1.0, i + 1) for i in range(4)])  # больше буфера за раз
+    event = _next_event(f)
+    assert event["event"] == "dropped"
+    assert f.readline() == b""  # соединение закрыто
+    sock.close()
+
+
+@pytest.mark.parametrize("served", ["single"], indirect=True)
+def test_stream_needs_threads(served) -> None:
+    _, port = served
+    sock, _, status, _ = _open_stream(port)
+    assert status == 503
+    sock.close()
+
+
+@pytest.mark.parametrize("served", ["pool"], indirect=True)
+def test_stream_limit_in_pool(served) -> None:
+    state, port = served
+    sock, _, status, _ = _open_stream(port)  # пул из двух потоков: один подписчик
+    assert status == 200
+    assert state.streams == 1
+    other, _, status, _ = _open_stream(port)
+    assert status == 503
+    other.close()
+    sock.close()
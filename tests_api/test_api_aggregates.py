@@ -0,0 +1,41 @@
+import os
+
+import requests
+
+BASE_URL = os.environ.get("API_BASE_URL", "http://localhost:8008")
+
+
+def _usd_rub(rows: list[dict]) -> dict:
+    return next((r for r in rows if (r["from"], r["to"]) == ("USD", "RUB")), {"count": 0, "sum_amount": 0})
+
+
+def test_aggregates_follow_adds() -> None:
+    before = _usd_rub(requests.get(f"{BASE_URL}/aggregates", timeout=5).json()["pairs"])
+    items = [{"from": "USD", "to": "RUB", "amount": a} for a in (1, 2, 3)]
+    assert requests.post(f"{BASE_URL}/operations/batch", json=items, timeout=5).status_code == 200
+
+    r = requests.get(f"{BASE_URL}/aggregates", timeout=5)
+    assert r.status_code == 200
+    after = _usd_rub(r.json()["pairs"])
+    assert after["count"] == before["count"] + 3
+    assert abs(after["sum_amount"] - before["sum_amount"] - 6) < 1e-9
+    assert after["min_rate"] <= after["max_rate"]
+
+
+def test_aggregates_buckets() -> None:
+    requests.post(f"{BASE_URL}/operations", json={"from": "USD", "to": "RUB", "amount": 1}, timeout=5)
+    for bucket in ("minute", "hour", "day"):
+        r = requests.get(f"{BASE_URL}/aggregates?bucket={bucket}", timeout=5)
+        assert r.status_code == 200
+        body = r.json()
+        assert body["bucket"] == bucket
+        assert _usd_rub(body["buckets"][-1]["pairs"])["count"] >= 1
+
+    r = requests.get(f"{BASE_URL}/aggregates?bucket=week", timeout=5)
+    assert r.status_code == 400
+
+
+def test_aggregates_reset_by_clear() -> None:
+    requests.post(f"{BASE_URL}/operations", json={"from": "USD", "to": "RUB", "amount": 1}, timeout=5)
+    assert requests.delete(f"{BASE_URL}/operations", timeout=5).status_code == 200
+    assert requests.get(f"{BASE_URL}/aggregates", timeout=5).json() == {"pairs": []}
@@ -0,0 +1,21 @@
+import os
+
+import requests
+
+BASE_URL = os.environ.get("API_BASE_URL", "http://localhost:8008")
+
+
+def test_as_of_invalid() -> None:
+    # 400 и без файла истории (--rates-history), и с ним
+    r = requests.post(
+        f"{BASE_URL}/operations", json={"from": "USD", "to": "RUB", "amount": 1, "as_of": "yesterday"}, timeout=5
+    )
+    assert r.status_code == 400
+    assert r.json()["error"] == "bad_request"
+
+
+def test_as_of_null_means_current_rates() -> None:
+    r = requests.post(
+        f"{BASE_URL}/operations", json={"from": "USD", "to": "RUB", "amount": 1, "as_of": None}, timeout=5
+    )
+    assert r.status_code == 200
@@ -0,0 +1,39 @@
+import os
+
+import requests
+
+BASE_URL = os.environ.get("API_BASE_URL", "http://localhost:8008")
+
+
+def test_batch_convert_ok_and_errors() -> None:
+    payload = [
+        {"from": "USD", "to": "RUB", "amount": 10},
+        {"from": "AAA", "to": "RUB", "amount": 10},
+        {"from": "USD", "to": "RUB", "amount": 0},
+        {"from": "USD", "amount": 1},
+        "nope",
+    ]
+    r = requests.post(f"{BASE_URL}/operations/batch", json=payload, timeout=2)
+    assert r.status_code == 200
+
+    data = r.json()
+    assert data["converted"] == 1
+    assert data["failed"] == 4
+
+    items = data["items"]
+    assert len(items) == 5
+    assert items[0]["operation"]["from"] == "USD"
+    assert items[0]["operation"]["result"] == items[0]["result"]
+    assert items[1]["error"] == "not_found"
+    assert items[2]["error"] == "bad_request"
+    assert items[3] == {"error": "bad_request", "message": "missing field: to"}
+    assert items[4]["error"] == "bad_request"
+
+    single = requests.post(f"{BASE_URL}/operations", json=payload[0], timeout=2).json()
+    assert single["rate"] == items[0]["rate"]
+    assert single["result"] == items[0]["result"]
+
+
+def test_batch_body_must_be_array() -> None:
+    r = requests.post(f"{BASE_URL}/operations/batch", json={"from": "USD"}, timeout=2)
+    assert r.status_code == 400
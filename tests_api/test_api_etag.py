@@ -0,0 +1,77 @@
+import os
+
+import requests
+
+BASE_URL = os.environ.get("API_BASE_URL", "http://localhost:8008")
+
+
+def _add() -> dict:
+    r = requests.post(f"{BASE_URL}/operations", json={"from": "USD", "to": "RUB", "amount": 1}, timeout=5)
+    assert r.status_code == 200
+    return r.json()["operation"]
+
+
+def test_operations_etag_and_304() -> None:
+    _add()
+    url = f"{BASE_URL}/operations?limit=5"
+    r1 = requests.get(url, timeout=5)
+    assert r1.status_code == 200
+    etag = r1.headers["ETag"]
+
+    # повторный запрос из кэша: те же байты и тот же ETag
+    r2 = requests.get(url, timeout=5)
+    assert (r2.content, r2.headers["ETag"]) == (r1.content, etag)
+
+    r3 = requests.get(url, headers={"If-None-Match": etag}, timeout=5)
+    assert r3.status_code == 304
+    assert r3.content == b""
+    assert r3.headers["ETag"] == etag
+
+
+def test_etag_changes_on_add_and_clear() -> None:
+    url = f"{BASE_URL}/operations?limit=1"
+    etag = requests.get(url, timeout=5).headers["ETag"]
+
+    _add()
+    r = requests.get(url, headers={"If-None-Match": etag}, timeout=5)
+    assert r.status_code == 200
+    assert r.headers["ETag"] != etag
+    etag = r.headers["ETag"]
+
+    assert requests.delete(f"{BASE_URL}/operations", timeout=5).status_code == 200
+    r = requests.get(url, headers={"If-None-Match": etag}, timeout=5)
+    assert r.status_code == 200
+    assert r.json()["count"] == 0
+
+
+def test_operation_by_id_etag() -> None:
+    op = _add()
+    url = f"{BASE_URL}/operations/{op['id']}"
+    r = requests.get(url, timeout=5)
+    assert r.status_code == 200
+    r = requests.get(url, headers={"If-None-Match": f'W/{r.headers["ETag"]}, "other"'}, timeout=5)
+    assert r.status_code == 304
+
+
+def test_conditional_get_is_validated_first() -> None:
+    # 304 только для запроса, который иначе получил бы 200
+    any_tag = {"If-None-Match": "*"}
+    assert requests.get(f"{BASE_URL}/operations/does-not-exist", headers=any_tag, timeout=5).status_code == 404
+    assert requests.get(f"{BASE_URL}/operations?limit=abc", headers=any_tag, timeout=5).status_code == 400
+    assert requests.get(f"{BASE_URL}/operations?after=no-such-id", headers=any_tag, timeout=5).status_code == 400
+    assert requests.get(f"{BASE_URL}/aggregates?bucket=week", headers=any_tag, timeout=5).status_code == 400
+    assert requests.get(f"{BASE_URL}/aggregates", headers=any_tag, timeout=5).status_code == 304
+
+
+def test_etag_is_per_representation() -> None:
+    _add()
+    etag = requests.get(f"{BASE_URL}/operations?limit=5&offset=0", timeout=5).headers["ETag"]
+
+    r = requests.get(f"{BASE_URL}/aggregates", headers={"If-None-Match": etag}, timeout=5)
+    assert r.status_code == 200
+    assert r.headers["ETag"] != etag
+    r = requests.get(f"{BASE_URL}/operations?limit=6", headers={"If-None-Match": etag}, timeout=5)
+    assert r.status_code == 200
+    # порядок параметров не меняет ответ
+    r = requests.get(f"{BASE_URL}/operations?offset=0&limit=5", headers={"If-None-Match": etag}, timeout=5)
+    assert r.status_code == 304
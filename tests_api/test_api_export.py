@@ -0,0 +1,51 @@
+import csv
+import io
+import json
+import os
+
+import requests
+
+BASE_URL = os.environ.get("API_BASE_URL", "http://localhost:8008")
+
+
+def _add_some(n: int = 3) -> list[dict]:
+    items = [{"from": "USD", "to": "RUB", "amount": i + 1} for i in range(n)]
+    r = requests.post(f"{BASE_URL}/operations/batch", json=items, timeout=5)
+    assert r.status_code == 200
+    return [item["operation"] for item in r.json()["items"]]
+
+
+def test_export_ndjson_matches_history() -> None:
+    _add_some()
+    history = requests.get(f"{BASE_URL}/operations", timeout=5).json()["items"]
+
+    r = requests.get(f"{BASE_URL}/operations?format=ndjson", timeout=10)
+    assert r.status_code == 200
+    assert r.headers["Content-Type"].startswith("application/x-ndjson")
+    assert r.headers["Transfer-Encoding"] == "chunked"
+    rows = [json.loads(line) for line in r.text.splitlines()]
+    # операции могли добавиться между двумя запросами
+    assert rows[: len(history)] == history
+
+
+def test_export_csv_after_cursor() -> None:
+    added = _add_some()
+    r = requests.get(f"{BASE_URL}/operations?format=csv&after={added[0]['id']}", timeout=10)
+    assert r.status_code == 200
+    assert r.headers["Content-Type"].startswith("text/csv")
+
+    rows = list(csv.DictReader(io.StringIO(r.text)))
+    assert [row["id"] for row in rows[:2]] == [added[1]["id"], added[2]["id"]]
+    assert float(rows[0]["amount"]) == added[1]["amount"]
+    assert rows[0]["from_currency"] == "USD"
+
+
+def test_export_bad_params() -> None:
+    for query in ("format=xml", "format=csv&limit=5", "format=ndjson&after=no-such-id"):
+        r = requests.get(f"{BASE_URL}/operations?{query}", timeout=5)
+        assert r.status_code == 400
+        assert r.json()["error"] == "bad_request"
+
+    r = requests.get(f"{BASE_URL}/operations?format=json&limit=1", timeout=5)
+    assert r.status_code == 200
+    assert "items" in r.json()
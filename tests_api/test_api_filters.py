@@ -0,0 +1,50 @@
+import os
+
+import requests
+
+BASE_URL = os.environ.get("API_BASE_URL", "http://localhost:8008")
+
+
+def test_filter_by_pair_and_amount() -> None:
+    assert requests.delete(f"{BASE_URL}/operations", timeout=5).status_code == 200
+    items = [
+        {"from": "USD", "to": "RUB", "amount": 5},
+        {"from": "EUR", "to": "RUB", "amount": 50},
+        {"from": "USD", "to": "RUB", "amount": 500},
+        {"from": "USD", "to": "EUR", "amount": 7},
+    ]
+    assert requests.post(f"{BASE_URL}/operations/batch", json=items, timeout=5).status_code == 200
+
+    r = requests.get(f"{BASE_URL}/operations?from=usd&to=RUB", timeout=5)
+    assert r.status_code == 200
+    body = r.json()
+    assert body["count"] == 2
+    assert [op["amount"] for op in body["items"]] == [5.0, 500.0]
+
+    body = requests.get(f"{BASE_URL}/operations?to=RUB&min_amount=10", timeout=5).json()
+    assert [op["amount"] for op in body["items"]] == [50.0, 500.0]
+
+    body = requests.get(f"{BASE_URL}/operations?from=USD&limit=1&offset=1", timeout=5).json()
+    assert body["count"] == 3
+    assert [op["amount"] for op in body["items"]] == [500.0]
+    assert body["next"] == body["items"][0]["id"]
+
+    body = requests.get(f"{BASE_URL}/operations?from=USD&after={body['next']}", timeout=5).json()
+    assert [op["amount"] for op in body["items"]] == [7.0]
+    assert body["next"] is None
+
+
+def test_filter_by_time() -> None:
+    r = requests.post(f"{BASE_URL}/operations", json={"from": "USD", "to": "RUB", "amount": 1}, timeout=5)
+    ts = r.json()["operation"]["ts"]
+
+    body = requests.get(f"{BASE_URL}/operations", params={"since": ts}, timeout=5).json()
+    assert body["items"][0]["ts"] >= ts
+    body = requests.get(f"{BASE_URL}/operations", params={"until": "2000-01-01"}, timeout=5).json()
+    assert body == {"count": 0, "items": [], "next": None}
+
+
+def test_bad_filters() -> None:
+    for query in ("since=yesterday", "until=2026-13-01", "min_amount=abc", "from=%20", "format=csv&from=USD"):
+        r = requests.get(f"{BASE_URL}/operations?{query}", timeout=5)
+        assert r.status_code == 400, query
@@ -1,6 +1,8 @@
+import os
+
 import requests
 
-BASE_URL = "http://localhost:8008"
+BASE_URL = os.environ.get("API_BASE_URL", "http://localhost:8008")
 
 
 def test_health_ok() -> None:
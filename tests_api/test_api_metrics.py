@@ -0,0 +1,33 @@
+import os
+
+import requests
+
+BASE_URL = os.environ.get("API_BASE_URL", "http://localhost:8008")
+
+
+def _value(text: str, prefix: str) -> float:
+    for line in text.splitlines():
+        if line.startswith(prefix + " "):
+            return float(line.rsplit(" ", 1)[1])
+    return 0.0
+
+
+def test_metrics_count_requests_and_conversions() -> None:
+    before = requests.get(f"{BASE_URL}/metrics", timeout=5)
+    assert before.status_code == 200
+    assert before.headers["Content-Type"].startswith("text/plain")
+
+    requests.get(f"{BASE_URL}/health", timeout=5)
+    requests.get(f"{BASE_URL}/operations/no-such-id", timeout=5)
+    r = requests.post(f"{BASE_URL}/operations", json={"from": "USD", "to": "RUB", "amount": 1}, timeout=5)
+    assert r.status_code == 200
+
+    after = requests.get(f"{BASE_URL}/metrics", timeout=5).text
+    health = 'http_requests_total{method="GET",route="/health",status="200"}'
+    missing = 'http_requests_total{method="GET",route="/operations/{id}",status="404"}'
+    pair = 'conversions_total{from="USD",to="RUB"}'
+    for name in (health, missing, pair):
+        assert _value(after, name) == _value(before.text, name) + 1
+
+    assert 'http_request_duration_seconds_bucket{method="POST",route="/operations",le="+Inf"}' in after
+    assert _value(after, "operations_log_size") >= 1
@@ -1,6 +1,8 @@
+import os
+
 import requests
 
-BASE_URL = "http://localhost:8008"
+BASE_URL = os.environ.get("API_BASE_URL", "http://localhost:8008")
 
 
 def test_operations_list_structure() -> None:
@@ -21,3 +23,33 @@ def test_operations_delete_returns_deleted_count() -> None:
     data = r.json()
     assert "deleted" in data
     assert isinstance(data["deleted"], int)
+
+
+def test_operation_get_by_id() -> None:
+    payload = {"from": "USD", "to": "RUB", "amount": 10}
+    created = requests.post(f"{BASE_URL}/operations", json=payload, timeout=2).json()["operation"]
+
+    r = requests.get(f"{BASE_URL}/operations/{created['id']}", timeout=2)
+    assert r.status_code == 200
+    data = r.json()
+    assert data["id"] == created["id"]
+    assert data["from_currency"] == "USD"
+
+    r = requests.get(f"{BASE_URL}/operations/00000000-0000-0000-0000-000000000000", timeout=2)
+    assert r.status_code == 404
+
+
+def test_operations_cursor_pagination() -> None:
+    payload = {"from": "USD", "to": "RUB", "amount": 10}
+    for _ in range(3):
+        requests.post(f"{BASE_URL}/operations", json=payload, timeout=2)
+
+    first = requests.get(f"{BASE_URL}/operations", params={"limit": 1}, timeout=2).json()
+    assert len(first["items"]) == 1
+    assert first["next"] == first["items"][0]["id"]
+
+    second = requests.get(f"{BASE_URL}/operations", params={"limit": 1, "after": first["next"]}, timeout=2).json()
+    assert second["items"][0]["id"] != first["items"][0]["id"]
+
+    r = requests.get(f"{BASE_URL}/operations", params={"after": "nope"}, timeout=2)
+    assert r.status_code == 400
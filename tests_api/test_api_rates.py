@@ -0,0 +1,17 @@
+import os
+
+import requests
+
+BASE_URL = os.environ.get("API_BASE_URL", "http://localhost:8008")
+
+
+def test_reload_rates() -> None:
+    r = requests.post(f"{BASE_URL}/admin/rates/reload", timeout=5)
+    assert r.status_code == 200
+    data = r.json()
+    assert data["status"] == "reloaded"
+    assert data["currencies"] > 0
+
+    # после перезагрузки конвертация работает как раньше
+    r = requests.post(f"{BASE_URL}/operations", json={"from": "USD", "to": "RUB", "amount": 1}, timeout=5)
+    assert r.status_code == 200